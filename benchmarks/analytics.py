@@ -0,0 +1,105 @@
+"""
+Inventory analytics at 1M items.
+
+The scan behind /api/items/analytics/ (one SQL query with window
+functions, see items/analytics.py) versus reading the same columns into
+Python and computing the totals, percentiles and per-month values there,
+for the whole inventory, per category, and for a search. For the first two
+the scan is the background snapshot refresh and the request reads the
+summary and the snapshot; the search runs the scan in the request, and the
+last line is that request again with the response cache on.
+
+    python -m benchmarks.analytics [--size 1m] [--database /tmp/bench-1m.sqlite3] [--repeat 3]
+
+The dataset is generated on the first run and reused from `--database`.
+"""
+import argparse
+import statistics
+import time
+from collections import defaultdict
+
+from benchmarks import setup, api_client
+from benchmarks.data import generate, parse_size
+
+QUERIES = [{}, {'group_by': 'category'}, {'group_by': 'location', 'search': 'kalo'}]
+
+
+def median_ms(run, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def filtered_queryset(params):
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+    from items.views import ItemViewSet
+    view = ItemViewSet(request=Request(APIRequestFactory().get('/api/items/', params)), format_kwarg=None, action='list')
+    return view.filter_queryset(view.get_queryset())
+
+
+def in_python(queryset, group_by):
+    from items.analytics import PERCENTILES, rank
+    field = f'{group_by}_id' if group_by else 'pk'
+    groups = defaultdict(list)
+    for row in queryset.order_by().values_list(field, 'price', 'quantity', 'date_added').iterator(chunk_size=10000):
+        groups[row[0] if group_by else None].append(row[1:])
+    result = {}
+    for key, rows in groups.items():
+        prices = sorted(price for price, _, _ in rows if price is not None)
+        quantities = sorted(quantity for _, quantity, _ in rows)
+        months = defaultdict(int)
+        for price, quantity, added in rows:
+            months[added.strftime('%Y-%m')] += round(quantity * price * 100) if price is not None else 0
+        cumulative, total = [], 0
+        for month in sorted(months):
+            total += months[month]
+            cumulative.append((month, months[month], total))
+        result[key] = {
+            'count': len(rows),
+            'price': {name: prices[rank(p, len(prices)) - 1] for name, p in PERCENTILES.items()} if prices else {},
+            'quantity': {name: quantities[rank(p, len(quantities)) - 1] for name, p in PERCENTILES.items()},
+            'value_added': cumulative,
+        }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=parse_size, default='1m', help="10k, 100k, 1m or a row count")
+    parser.add_argument('--database', help="SQLite file for the dataset, reused by later runs")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    database = args.database or f'/tmp/item-tracker-bench-{args.size}-0.sqlite3'
+    setup(database, keepdb=True)
+    from items import analytics
+    from items.views import ItemViewSet
+
+    ItemViewSet.throttle_classes = []
+    ItemViewSet.response_cache_timeout = 0
+    generate(args.size, image_ratio=0)
+    client = api_client()
+
+    for params in QUERIES:
+        print(' '.join(f'{k}={v}' for k, v in params.items()) or 'whole inventory')
+        queryset = filtered_queryset({k: v for k, v in params.items() if k != 'group_by'})
+        if not queryset.query.where:
+            refresh = median_ms(lambda: analytics.refresh(params.get('group_by')), args.repeat)
+            print(f"  snapshot refresh            {refresh:8.1f} ms")
+        request = median_ms(lambda: client.get('/api/items/analytics/', params), args.repeat)
+        python = median_ms(lambda: in_python(queryset, params.get('group_by')), args.repeat)
+        print(f"  analytics/ request          {request:8.1f} ms")
+        print(f"  rows into Python            {python:8.1f} ms")
+        ItemViewSet.response_cache_timeout = 300
+        client.get('/api/items/analytics/', params)
+        cached = median_ms(lambda: client.get('/api/items/analytics/', params), args.repeat)
+        ItemViewSet.response_cache_timeout = 0
+        print(f"  cached analytics/ request   {cached:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Concurrent GET /api/items/ through ASGI: the sync viewsets under Django's
+stock handler versus the async read views behind item_tracker.asgi.
+
+    python -m benchmarks.async_reads [--items 10000] [--concurrency 1 16 64] [--requests 20]
+
+Each of `concurrency` clients issues `requests` reads one after another
+against the ASGI application in-process; the response cache is disabled
+so every request reaches the database.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks import setup
+
+
+async def call(application, path, query, headers):
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+        'headers': headers, 'server': ('testserver', 80), 'client': ('127.0.0.1', 0),
+    }
+    messages = iter([{'type': 'http.request', 'body': b'', 'more_body': False}])
+    status = []
+
+    async def receive():
+        try:
+            return next(messages)
+        except StopIteration:
+            await asyncio.Event().wait()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    await application(scope, receive, send)
+    assert status == [200], status
+
+
+async def run(application, concurrency, requests, headers):
+    latencies = []
+
+    async def client(n):
+        for i in range(requests):
+            start = time.perf_counter()
+            await call(application, '/api/items/', f'page={(n + i) % 50 + 1}', headers)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(n) for n in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return len(latencies) / elapsed, statistics.median(latencies) * 1000, latencies[int(len(latencies) * 0.95)] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=10000)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 16, 64])
+    parser.add_argument('--requests', type=int, default=20)
+    args = parser.parse_args()
+
+    setup()
+    from django.contrib.auth.models import User
+    from django.core.handlers.asgi import ASGIHandler
+    from rest_framework_simplejwt.tokens import RefreshToken
+    from item_tracker.asgi import ItemTrackerASGIHandler
+    from items.models import Category, Location, Item
+    from items.views import ItemViewSet
+
+    ItemViewSet.throttle_classes = []
+    ItemViewSet.response_cache_timeout = 0
+    category = Category.objects.create(name="Bench Category")
+    location = Location.objects.create(name="Bench Location")
+    Item.objects.bulk_create(
+        Item(name=f"Item {i}", category=category, location=location) for i in range(args.items)
+    )
+    token = RefreshToken.for_user(User.objects.create(username='bench')).access_token
+    headers = [(b'host', b'testserver'), (b'authorization', f'Bearer {token}'.encode())]
+
+    for concurrency in args.concurrency:
+        for label, application in (('sync views ', ASGIHandler()), ('async views', ItemTrackerASGIHandler())):
+            qps, p50, p95 = asyncio.run(run(application, concurrency, args.requests, headers))
+            print(f"concurrency {concurrency:>4}  {label}  {qps:8.1f} req/s  p50 {p50:8.2f} ms  p95 {p95:8.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
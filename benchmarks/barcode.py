@@ -0,0 +1,54 @@
+"""
+Barcode resolution time, cold (indexed query) versus warm (in-process cache).
+
+    python -m benchmarks.barcode [--items 100000] [--scans 1000]
+"""
+import argparse
+import random
+import statistics
+import time
+
+from benchmarks import setup, api_client
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=100000)
+    parser.add_argument('--scans', type=int, default=1000)
+    args = parser.parse_args()
+
+    setup()
+    from items import barcodes
+    from items.models import Category, Location, Item
+    from items.views import ItemViewSet
+
+    ItemViewSet.throttle_classes = []
+    category = Category.objects.create(name="Bench Category")
+    location = Location.objects.create(name="Bench Location")
+    Item.objects.bulk_create(
+        Item(name=f"Item {i}", barcode=f"{i:013}", category=category, location=location)
+        for i in range(args.items)
+    )
+    codes = [f"{random.randrange(args.items):013}" for _ in range(args.scans)]
+
+    for label in ('cold', 'warm'):
+        if label == 'cold':
+            barcodes.cache.clear()
+        timings = []
+        for code in codes:
+            start = time.perf_counter()
+            barcodes.lookup([code])
+            timings.append(time.perf_counter() - start)
+        print(f"lookup {label}  median {statistics.median(timings) * 1e6:8.1f} us")
+
+    client = api_client()
+    timings = []
+    for code in codes:
+        start = time.perf_counter()
+        client.get(f'/api/items/by-barcode/{code}/')
+        timings.append(time.perf_counter() - start)
+    print(f"request warm  median {statistics.median(timings) * 1e3:8.2f} ms (whole DRF request incl. JWT auth)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Per-item POST /api/items/ versus the bulk endpoint at 1k and 10k items.
+
+    python -m benchmarks.bulk_items [--sizes 1000 10000]
+"""
+import argparse
+
+from benchmarks import setup, api_client, timer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+    args = parser.parse_args()
+
+    setup()
+    from django.urls import reverse
+    from items.models import Category, Location, Item
+    from items.views import ItemViewSet
+
+    # Throttling would cut the per-item run off at the daily user rate
+    ItemViewSet.throttle_classes = []
+    client = api_client()
+    category = Category.objects.create(name="Bench Category")
+    location = Location.objects.create(name="Bench Location")
+
+    def rows(prefix, count):
+        return [
+            {'name': f"{prefix} {i}", 'quantity': i, 'price': '1.00',
+             'category': category.id, 'location': location.id}
+            for i in range(count)
+        ]
+
+    for size in args.sizes:
+        results = {}
+        Item.objects.all().delete()
+        with timer(results, 'per-item'):
+            for row in rows('single', size):
+                client.post(reverse('item-list'), row, format='json')
+        Item.objects.all().delete()
+        with timer(results, 'bulk'):
+            response = client.post(reverse('item-bulk'), rows('bulk', size), format='json')
+        assert response.status_code == 201, response.data
+        per_item, bulk = results['per-item'], results['bulk']
+        print(f"{size:>6} items  per-item {per_item:8.2f}s  bulk {bulk:8.2f}s  speedup {per_item / bulk:6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Peak memory of attaching a large image to an item: one multipart PATCH of
+the whole file versus a chunked upload (items/uploads.py). Measured with
+tracemalloc around the requests; the in-process test client holds each
+request body in memory too, so the figures are an upper bound for both.
+
+    python -m benchmarks.chunked_upload [--megapixels 12] [--chunk-size 1048576]
+"""
+import argparse
+import hashlib
+import os
+import time
+import tracemalloc
+from io import BytesIO
+
+from benchmarks import setup, api_client
+
+
+def noise_png(megapixels):
+    from PIL import Image
+    side = int((megapixels * 1_000_000) ** 0.5)
+    buffer = BytesIO()
+    Image.frombytes('RGB', (side, side), os.urandom(side * side * 3)).save(buffer, 'PNG', compress_level=1)
+    return buffer.getvalue()
+
+
+def measure(upload):
+    tracemalloc.start()
+    start = time.perf_counter()
+    upload()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--megapixels', type=float, default=12)
+    parser.add_argument('--chunk-size', type=int, default=1024 * 1024)
+    args = parser.parse_args()
+
+    setup()
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from items import images
+    from items.models import Category, Location, Item
+    from items.views import ItemViewSet
+
+    ItemViewSet.throttle_classes = []
+    # Renditions are rendered in the background either way; leave them out
+    images.schedule = lambda name: None
+    category = Category.objects.create(name="Bench Category")
+    location = Location.objects.create(name="Bench Location")
+    item = Item.objects.create(name="Bench Item", category=category, location=location)
+    client = api_client()
+    data = noise_png(args.megapixels)
+    url = f'/api/items/{item.pk}/'
+
+    def multipart():
+        response = client.patch(url, {'image': SimpleUploadedFile('bench.png', data, 'image/png')}, format='multipart')
+        assert response.status_code == 200, response.data
+
+    def chunked():
+        upload_url = url + 'image-uploads/' + client.post(
+            url + 'image-uploads/', {'filename': 'bench.png', 'size': len(data)}, format='json',
+        ).data['id'] + '/'
+        for offset in range(0, len(data), args.chunk_size):
+            response = client.patch(
+                upload_url, data[offset:offset + args.chunk_size],
+                content_type='application/offset+octet-stream', HTTP_UPLOAD_OFFSET=str(offset),
+            )
+            assert response.status_code == 200, response.data
+        response = client.post(upload_url + 'complete/', {'sha256': hashlib.sha256(data).hexdigest()}, format='json')
+        assert response.status_code == 200, response.data
+
+    print(f"{len(data) / 2 ** 20:.1f} MiB PNG, {args.megapixels} megapixels")
+    for label, upload in (('multipart PATCH', multipart), ('chunked upload ', chunked)):
+        elapsed, peak = measure(upload)
+        print(f"{label}  {elapsed * 1000:8.1f} ms  peak {peak / 2 ** 20:7.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Deterministic synthetic inventory for the benchmarks.
+
+    python -m benchmarks.data --size 100k [--database /tmp/bench.sqlite3]
+
+The same size and seed always produce the same categories, locations and
+items (names, descriptions, prices, barcodes, image assignments); only
+date_added follows the clock. Images come from a pool of generated JPEGs
+shared between items, with their renditions rendered up front.
+"""
+import argparse
+import random
+import time
+from decimal import Decimal
+from io import BytesIO
+
+from benchmarks import setup
+
+SIZES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+
+SYLLABLES = ['ka', 'lo', 'mi', 'ne', 'ru', 'sa', 'ti', 'vo', 'pe', 'da', 'go', 'fu', 'zi', 'bo', 'che']
+# ~3k distinct words, so a query hits a realistic fraction of the inventory
+WORDS = [a + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES]
+
+
+def parse_size(value):
+    return SIZES[value.lower()] if value.lower() in SIZES else int(value)
+
+
+def jpeg_bytes(seed, size=(640, 480)):
+    """A small deterministic JPEG: a solid colour with a contrasting band."""
+    from PIL import Image, ImageDraw
+    rng = random.Random(seed)
+    image = Image.new('RGB', size, tuple(rng.randrange(256) for _ in range(3)))
+    ImageDraw.Draw(image).rectangle(
+        (0, size[1] // 3, size[0], 2 * size[1] // 3), fill=tuple(rng.randrange(256) for _ in range(3)),
+    )
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=85)
+    return buffer.getvalue()
+
+
+def create_image_pool(count, seed=0):
+    from django.core.files.base import ContentFile
+    from django.core.files.storage import default_storage
+    from items import images
+    names = []
+    for n in range(count):
+        name = f'item_images/bench-{seed}-{n}.jpg'
+        if not default_storage.exists(name):
+            default_storage.save(name, ContentFile(jpeg_bytes(seed * 100003 + n)))
+            images.generate(name)
+        names.append(name)
+    return names
+
+
+def generate(items, seed=0, image_ratio=0.1, image_pool=100, batch_size=5000, stdout=None):
+    """
+    Create the dataset for `items` rows unless the database already holds it.
+
+    Category and location counts scale with the item count. Items are
+    inserted with bulk_create in `batch_size` batches, so the search index,
+    inventory summaries and model versions are maintained as usual.
+    """
+    from items.models import Category, Location, Item
+
+    if Item.objects.count() == items:
+        return
+    if Item.objects.exists():
+        raise RuntimeError(f"Database already holds {Item.objects.count()} items, not {items}")
+
+    rng = random.Random(seed)
+    categories = Category.objects.bulk_create(
+        Category(name=f"Category {n} {rng.choice(WORDS)}", description=' '.join(rng.sample(WORDS, 4)))
+        for n in range(min(500, max(10, items // 2000)))
+    )
+    locations = Location.objects.bulk_create(
+        Location(name=f"Location {n} {rng.choice(WORDS)}", description=' '.join(rng.sample(WORDS, 4)))
+        for n in range(min(2000, max(20, items // 500)))
+    )
+    pool = create_image_pool(image_pool, seed) if image_ratio else []
+
+    def rows(start, stop):
+        for i in range(start, stop):
+            yield Item(
+                name=f"{' '.join(rng.sample(WORDS, 2))} {i}",
+                description=' '.join(rng.sample(WORDS, 6)),
+                quantity=rng.randrange(500),
+                price=None if rng.random() < 0.1 else Decimal(rng.randrange(50, 100000)) / 100,
+                category=rng.choice(categories),
+                location=rng.choice(locations),
+                is_available=rng.random() < 0.9,
+                image=rng.choice(pool) if pool and rng.random() < image_ratio else None,
+                barcode=f"{i:013}",
+            )
+
+    start = time.perf_counter()
+    for offset in range(0, items, batch_size):
+        Item.objects.bulk_create(rows(offset, min(offset + batch_size, items)))
+        if stdout is not None and (offset // batch_size) % 20 == 19:
+            stdout.write(f"  {offset + batch_size} items, {time.perf_counter() - start:.0f} s\n")
+
+
+def main():
+    import sys
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=parse_size, default='10k', help="10k, 100k, 1m or a row count")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--image-ratio', type=float, default=0.1)
+    parser.add_argument('--database', help="SQLite file to keep the dataset in (reused by later runs)")
+    args = parser.parse_args()
+
+    setup(args.database, keepdb=args.database is not None)
+    start = time.perf_counter()
+    generate(args.size, seed=args.seed, image_ratio=args.image_ratio, stdout=sys.stdout)
+    print(f"{args.size} items ready in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
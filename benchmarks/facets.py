@@ -0,0 +1,82 @@
+"""
+A filter sidebar's data at 100k items.
+
+Requests: the list page plus grouped_by_category and grouped_by_location
+(three round trips, counts over the whole inventory regardless of the
+filters) versus /api/items/facets/ (one round trip, counts over the
+matches). Queries: the facet counts as a COUNT plus one GROUP BY per facet
+versus the single query of items/facets.py.
+
+    python -m benchmarks.facets [--items 100000] [--repeat 10]
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks import setup, api_client
+from benchmarks.data import generate
+
+QUERIES = [{}, {'search': 'kalo'}, {'is_available': 'true', 'search': 'mine rusa'}]
+
+
+def median_ms(run, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def filtered_queryset(params):
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+    from items.views import ItemViewSet
+    view = ItemViewSet(request=Request(APIRequestFactory().get('/api/items/', params)), format_kwarg=None, action='list')
+    return view.filter_queryset(view.get_queryset())
+
+
+def per_facet_queries(queryset):
+    from django.db.models import Case, Count, IntegerField, When
+    from items import facets
+    queryset = queryset.order_by()
+    bounds = facets.price_buckets()
+    bucket = Case(*(When(price__lt=bound, then=n) for n, bound in enumerate(bounds)),
+                  default=len(bounds), output_field=IntegerField())
+    queryset.count()
+    for field in ('category__name', 'location__name', 'is_available'):
+        list(queryset.values(field).annotate(count=Count('id')))
+    list(queryset.filter(price__isnull=False).annotate(bucket=bucket).values('bucket').annotate(count=Count('id')))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    setup()
+    from items import facets
+    from items.views import ItemViewSet
+
+    ItemViewSet.throttle_classes = []
+    ItemViewSet.response_cache_timeout = 0
+    generate(args.items, image_ratio=0)
+    client = api_client()
+
+    def separate(params):
+        client.get('/api/items/', params)
+        client.get('/api/items/grouped_by_category/')
+        client.get('/api/items/grouped_by_location/')
+
+    for params in QUERIES:
+        print(' '.join(f'{k}={v}' for k, v in params.items()) or 'no filters')
+        queryset = filtered_queryset(params)
+        print(f"  list + grouped x2 requests  {median_ms(lambda: separate(params), args.repeat):8.1f} ms")
+        print(f"  facets/ request             {median_ms(lambda: client.get('/api/items/facets/', params), args.repeat):8.1f} ms")
+        print(f"  count + query per facet     {median_ms(lambda: per_facet_queries(queryset), args.repeat):8.1f} ms")
+        print(f"  single facet query          {median_ms(lambda: facets.counts(queryset), args.repeat):8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Disk used by item images uploaded through the API with and without
+content-addressed storage (items/storage.py), when many items share a few
+distinct pictures, and how long `collect_images` takes over the result.
+
+    python -m benchmarks.image_storage [--items 500] [--distinct 20] [--workers 4]
+"""
+import argparse
+import os
+import random
+import time
+from io import StringIO
+
+from benchmarks import setup, api_client
+from benchmarks.data import jpeg_bytes
+
+
+def disk_usage(directory):
+    return sum(
+        os.path.getsize(os.path.join(dirpath, filename))
+        for dirpath, _, filenames in os.walk(directory) for filename in filenames
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=500)
+    parser.add_argument('--distinct', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    setup()
+    from django.conf import settings
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from django.core.management import call_command
+    from django.test import override_settings
+    from items import images
+    from items.models import Category, Location
+    from items.views import ItemViewSet
+
+    ItemViewSet.throttle_classes = []
+    # Renditions double the figures for both modes; leave them out
+    images.schedule = lambda name: None
+    category = Category.objects.create(name="Bench Category")
+    location = Location.objects.create(name="Bench Location")
+    client = api_client()
+    pool = [jpeg_bytes(seed) for seed in range(args.distinct)]
+    rng = random.Random(0)
+    picks = [rng.choice(pool) for _ in range(args.items)]
+
+    for label, enabled in (('slug names      ', False), ('content-addressed', True)):
+        media_root = os.path.join(settings.MEDIA_ROOT, 'content' if enabled else 'slug')
+        with override_settings(ITEMS_CONTENT_ADDRESSED_IMAGES=enabled, MEDIA_ROOT=media_root):
+            start = time.perf_counter()
+            for n, data in enumerate(picks):
+                response = client.post('/api/items/', {
+                    'name': f"{label.strip()} {n}", 'category': category.pk, 'location': location.pk,
+                    'image': SimpleUploadedFile('photo.jpg', data, 'image/jpeg'),
+                }, format='multipart')
+                assert response.status_code == 201, response.data
+            upload = time.perf_counter() - start
+            start = time.perf_counter()
+            call_command('collect_images', workers=args.workers, grace_minutes=0, dry_run=True, stdout=StringIO())
+            collect = time.perf_counter() - start
+            print(f"{label}  upload {upload * 1000:8.1f} ms  disk {disk_usage(media_root) / 2 ** 20:7.2f} MiB"
+                  f"  collect_images {collect * 1000:7.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
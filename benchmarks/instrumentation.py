@@ -0,0 +1,79 @@
+"""
+Cost of the request instrumentation (items/instrumentation.py): item list
+requests with and without RequestTimingMiddleware, and the per-query cost of
+the execute wrapper inside and outside a request.
+
+    python -m benchmarks.instrumentation [--items 1000] [--requests 500] [--rounds 3] [--queries 20000]
+
+The two middleware stacks run in alternating rounds; the best round counts.
+"""
+import argparse
+import time
+
+from benchmarks import setup, api_client
+
+
+def requests_per_second(middleware, count):
+    from django.test import override_settings
+    with override_settings(MIDDLEWARE=middleware):
+        client = api_client()
+        client.get('/api/items/')
+        start = time.perf_counter()
+        for i in range(count):
+            client.get('/api/items/', {'page': i % 20 + 1})
+        return count / (time.perf_counter() - start)
+
+
+def per_query_us(count):
+    from items.models import Item
+    queryset = Item.objects.filter(pk=1)
+    start = time.perf_counter()
+    for _ in range(count):
+        queryset.exists()
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--queries', type=int, default=20000)
+    args = parser.parse_args()
+
+    setup()
+    from django.conf import settings
+    from django.db import connection
+    from items import instrumentation
+    from items.models import Category, Location, Item
+    from items.views import ItemViewSet
+
+    ItemViewSet.throttle_classes = []
+    ItemViewSet.response_cache_timeout = 0
+    category = Category.objects.create(name="Bench Category")
+    location = Location.objects.create(name="Bench Location")
+    Item.objects.bulk_create(
+        Item(name=f"Item {i}", category=category, location=location, price='9.99') for i in range(args.items)
+    )
+
+    instrumented = list(settings.MIDDLEWARE)
+    plain = [name for name in instrumented if name != 'items.instrumentation.RequestTimingMiddleware']
+    best = {'without middleware': 0, 'with middleware   ': 0}
+    for _ in range(args.rounds):
+        for label, middleware in (('without middleware', plain), ('with middleware   ', instrumented)):
+            best[label] = max(best[label], requests_per_second(middleware, args.requests))
+    for label, rate in best.items():
+        print(f"{label}  {rate:8.1f} list requests/s")
+
+    connection.ensure_connection()
+    outside = per_query_us(args.queries)
+    token = instrumentation._current.set(instrumentation.RequestTimings())
+    inside = per_query_us(args.queries)
+    instrumentation._current.reset(token)
+    connection.execute_wrappers.remove(instrumentation.record_query)
+    bare = per_query_us(args.queries)
+    print(f"query  no wrapper {bare:6.1f} us  idle wrapper {outside:6.1f} us  recording {inside:6.1f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Nested locations: reading and moving a subtree.
+
+A tree of buildings > rooms > shelves > bins holds the items, all of them
+in bins. Reading a room's items the flat way pages through
+/api/locations/ and then asks for ?location= once per location in the
+room; ?location__subtree= is one request. Moving a building under another
+is one PATCH that rewrites the subtree's paths in bulk, versus saving every
+location of the subtree one by one.
+
+    python -m benchmarks.location_tree [--items 20000] [--repeat 5]
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks import setup, api_client
+
+SHAPE = (5, 10, 10, 4)  # buildings, rooms per building, shelves per room, bins per shelf
+
+
+def median_ms(run, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def build_tree():
+    from items.models import Location
+    levels = [[None]]
+    for depth, fanout in enumerate(SHAPE):
+        levels.append(Location.objects.bulk_create(
+            Location(name=f"Level {depth} {n}", parent=parent) for parent in levels[-1] for n in range(fanout)
+        ))
+    return levels[1:]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup()
+    from items.models import SYNC_REVISION, Category, Item, Location, ModelVersion
+    from items.views import ItemViewSet, LocationViewSet
+
+    for viewset in (ItemViewSet, LocationViewSet):
+        viewset.throttle_classes = []
+        viewset.response_cache_timeout = 0
+    buildings, rooms, shelves, bins = build_tree()
+    category = Category.objects.create(name="Bench Category")
+    for offset in range(0, args.items, 5000):
+        Item.objects.bulk_create(
+            Item(name=f"Item {i}", category=category, location=bins[i % len(bins)])
+            for i in range(offset, min(offset + 5000, args.items))
+        )
+    client = api_client()
+    room = rooms[0]
+    print(f"{Location.objects.count()} locations, {args.items} items, "
+          f"{Item.objects.filter(location__in=Location.objects.subtree(room.pk).values('pk')).count()} in one room")
+
+    def per_location():
+        locations, url = [], '/api/locations/'
+        while url:
+            page = client.get(url).data
+            locations.extend(page['results'])
+            url = page['next']
+        parents = {location['id']: location['parent'] for location in locations}
+        under_room = [pk for pk in parents if pk == room.pk or any_ancestor(pk, parents, room.pk)]
+        for pk in under_room:
+            client.get('/api/items/', {'location': pk})
+
+    def any_ancestor(pk, parents, ancestor):
+        while pk is not None:
+            pk = parents[pk]
+            if pk == ancestor:
+                return True
+        return False
+
+    print(f"  list locations + ?location= per location  {median_ms(per_location, 1):9.1f} ms")
+    subtree = median_ms(lambda: client.get('/api/items/', {'location__subtree': room.pk}), args.repeat)
+    print(f"  ?location__subtree= request               {subtree:9.1f} ms")
+
+    def move_bulk(building, target):
+        client.patch(f'/api/locations/{building.pk}/', {'parent': target.pk}, format='json')
+
+    def move_row_by_row(building, target):
+        # What moving cost without the bulk update: one UPDATE and one revision per location
+        building.refresh_from_db()
+        target.refresh_from_db()
+        old, new = building.path, f'{target.path}{building.pk}/'
+        Location.objects.filter(pk=building.pk).update(parent=target)
+        for location in list(Location.objects.subtree(building.pk).only('id', 'path')):
+            Location.objects.filter(pk=location.pk).update(
+                path=new + location.path[len(old):], revision=ModelVersion.advance(SYNC_REVISION),
+            )
+
+    size = Location.objects.subtree(buildings[0].pk).count()
+    start = time.perf_counter()
+    move_bulk(buildings[0], buildings[1])
+    bulk = time.perf_counter() - start
+    start = time.perf_counter()
+    move_row_by_row(buildings[0], buildings[2])
+    row_by_row = time.perf_counter() - start
+    assert Location.objects.subtree(buildings[2].pk).count() == 2 * size
+    print(f"  move a {size}-location building, bulk PATCH  {bulk * 1000:9.1f} ms")
+    print(f"  same move, saved row by row               {row_by_row * 1000:9.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
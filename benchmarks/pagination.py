@@ -0,0 +1,63 @@
+"""
+Page latency by depth: page-number (COUNT + OFFSET) versus ?pagination=cursor.
+
+    python -m benchmarks.pagination [--items 100000] [--depths 1 100 1000 9000]
+"""
+import argparse
+import statistics
+import time
+from urllib.parse import parse_qs, urlsplit
+
+from benchmarks import setup, api_client
+
+
+def median_ms(client, url, params, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(url, params)
+        timings.append(time.perf_counter() - start)
+    assert response.status_code == 200, response.status_code
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=100000)
+    parser.add_argument('--depths', type=int, nargs='+', default=[1, 100, 1000, 9000])
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    setup()
+    from django.conf import settings
+    from items.models import Category, Location, Item
+    from items.pagination import ItemCursorPagination
+    from items.views import ItemViewSet
+
+    ItemViewSet.throttle_classes = []
+    client = api_client()
+    category = Category.objects.create(name="Bench Category")
+    location = Location.objects.create(name="Bench Location")
+    Item.objects.bulk_create(
+        Item(name=f"Item {i}", category=category, location=location) for i in range(args.items)
+    )
+
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    ordered = Item.objects.order_by('-date_added', '-id')
+    for depth in args.depths:
+        offset_ms = median_ms(client, '/api/items/', {'page': depth}, args.repeat)
+        # Build the cursor a client would hold after reading depth - 1 pages
+        cursor_params = {'pagination': 'cursor'}
+        if depth > 1:
+            paginator = ItemCursorPagination()
+            paginator.order_by, paginator.field_name = '-date_added', 'date_added'
+            paginator.field = Item._meta.get_field('date_added')
+            paginator.base_url = 'http://testserver/api/items/'
+            last = ordered[(depth - 1) * page_size - 1]
+            cursor_params['cursor'] = parse_qs(urlsplit(paginator.encode_cursor(last)).query)['cursor'][0]
+        cursor_ms = median_ms(client, '/api/items/', cursor_params, args.repeat)
+        print(f"page {depth:>6}  page-number {offset_ms:8.2f} ms  cursor {cursor_ms:8.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
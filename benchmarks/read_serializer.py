@@ -0,0 +1,58 @@
+"""
+Page rendering cost: ItemSerializer over model instances versus
+ItemValuesSerializer over values() rows, as used by the item read endpoints.
+
+    python -m benchmarks.read_serializer [--page-sizes 10 100 1000] [--repeat 20]
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks import setup
+
+
+def median_ms(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--page-sizes', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    setup()
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+    from items.models import Category, Location, Item
+    from items.serializers import ItemSerializer, ItemValuesSerializer
+
+    category = Category.objects.create(name="Bench Category")
+    location = Location.objects.create(name="Bench Location")
+    Item.objects.bulk_create(
+        Item(name=f"Item {i}", description="Bench item", quantity=i, price=f"{i % 100}.25",
+             category=category, location=location, barcode=f"{i:012}")
+        for i in range(max(args.page_sizes))
+    )
+    request = Request(APIRequestFactory().get('/api/items/'))
+    queryset = Item.objects.order_by('-date_added')
+
+    for size in args.page_sizes:
+        def full():
+            return ItemSerializer(list(queryset[:size]), many=True, context={'request': request}).data
+
+        def values():
+            serializer = ItemValuesSerializer(request=request)
+            return [serializer.to_representation(row) for row in queryset.values(*serializer.columns)[:size]]
+
+        full_ms, values_ms = median_ms(full, args.repeat), median_ms(values, args.repeat)
+        print(f"page size {size:>5}  ItemSerializer {full_ms:8.2f} ms  ItemValuesSerializer {values_ms:8.2f} ms  ({full_ms / values_ms:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+"""
+Scenario runner: drives the real item endpoints in-process with concurrent
+clients and writes machine-readable results.
+
+    python -m benchmarks.scenarios --size 100k --database /tmp/bench-100k.sqlite3 \\
+        [--concurrency 4] [--seconds 10] [--only list search] [--output results.json]
+    python -m benchmarks.scenarios --compare before.json after.json
+
+Each scenario runs on its own for `--seconds` with `--concurrency` threads,
+each holding its own authenticated APIClient. Throttles are off, and so is
+the response cache unless --response-cache is given, so requests reach the
+database. For every scenario the results record the request count, errors,
+QPS, p50/p95/p99 latency and mean queries per request (on both database
+aliases). Compare two result files with --compare.
+"""
+import argparse
+import itertools
+import json
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks import setup, api_client
+from benchmarks.data import WORDS, generate, jpeg_bytes, parse_size
+
+
+class Context:
+    """Dataset facts the scenarios draw request parameters from."""
+
+    def __init__(self):
+        from items.models import Category, Location, Item
+        self.category_ids = list(Category.objects.values_list('id', flat=True))
+        self.location_ids = list(Location.objects.values_list('id', flat=True))
+        self.item_ids = list(Item.objects.order_by('id').values_list('id', flat=True)[:10000])
+        self.image = jpeg_bytes(42)
+        self.counter = itertools.count()
+
+
+def upload(context):
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    return SimpleUploadedFile('bench.jpg', context.image, content_type='image/jpeg')
+
+
+CREATED_PREFIX = 'bench created '
+
+
+def remove_created_items():
+    """Drop items written by the create/update scenarios, so a kept dataset stays as generated."""
+    from items.models import Item
+    Item.objects.filter(name__startswith=CREATED_PREFIX).delete()
+
+
+def create_item(client, context, rng):
+    return client.post('/api/items/', {
+        'name': f"{CREATED_PREFIX}{next(context.counter)} {rng.random()}", 'quantity': rng.randrange(100),
+        'price': '9.99', 'category': rng.choice(context.category_ids),
+        'location': rng.choice(context.location_ids), 'image': upload(context),
+    }, format='multipart')
+
+
+def update_item(client, context, rng):
+    # Update items this run created, so generated items keep their shared images
+    response = create_item(client, context, rng)
+    return client.patch(f"/api/items/{response.data['id']}/", {
+        'quantity': rng.randrange(100), 'image': upload(context),
+    }, format='multipart')
+
+
+SCENARIOS = {
+    'list': lambda client, context, rng: client.get('/api/items/', {'page': rng.randrange(1, 50)}),
+    'detail': lambda client, context, rng: client.get(f"/api/items/{rng.choice(context.item_ids)}/"),
+    'filter': lambda client, context, rng: client.get('/api/items/', {
+        'category': rng.choice(context.category_ids), 'is_available': 'true',
+    }),
+    'search': lambda client, context, rng: client.get('/api/items/', {'search': ' '.join(rng.sample(WORDS, rng.randint(1, 2)))}),
+    'ordering': lambda client, context, rng: client.get('/api/items/', {'ordering': rng.choice(['price', '-price', 'name'])}),
+    'cursor': lambda client, context, rng: client.get('/api/items/', {'pagination': 'cursor', 'ordering': '-date_added'}),
+    'grouped_by_category': lambda client, context, rng: client.get('/api/items/grouped_by_category/'),
+    'grouped_by_location': lambda client, context, rng: client.get('/api/items/grouped_by_location/'),
+    'category_location_matrix': lambda client, context, rng: client.get('/api/items/category_location_matrix/'),
+    'create_with_image': create_item,
+    'update_with_image': update_item,
+}
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run_scenario(name, context, concurrency, seconds):
+    from django.db import connections
+    scenario = SCENARIOS[name]
+    latencies, queries, errors = [], [], []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def count_queries(counter):
+        def wrapper(execute, sql, params, many, context):
+            counter[0] += 1
+            return execute(sql, params, many, context)
+        return wrapper
+
+    def client_thread(n, client):
+        rng = random.Random(n)
+        counter = [0]
+        wrapper = count_queries(counter)
+        with connections['default'].execute_wrapper(wrapper), connections['readonly'].execute_wrapper(wrapper):
+            while time.perf_counter() < deadline:
+                counter[0] = 0
+                start = time.perf_counter()
+                try:
+                    status = scenario(client, context, rng).status_code
+                except Exception as exc:
+                    # e.g. "database is locked"; count it and keep the client going
+                    status = type(exc).__name__
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies.append(elapsed)
+                    queries.append(counter[0])
+                    if not isinstance(status, int) or status >= 400:
+                        errors.append(status)
+        connections.close_all()
+
+    clients = [api_client(f'bench{n}') for n in range(concurrency)]
+    threads = [threading.Thread(target=client_thread, args=(n, client)) for n, client in enumerate(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'error_kinds': sorted({str(status) for status in errors}),
+        'qps': round(len(latencies) / wall, 2),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'queries_per_request': round(sum(queries) / len(queries), 2),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(before_path, after_path):
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    print(f"{'scenario':<26} {'qps':>20} {'p95 ms':>22} {'queries/req':>16}")
+    for name, new in after['scenarios'].items():
+        old = before['scenarios'].get(name)
+        if old is None:
+            continue
+        change = (new['qps'] - old['qps']) / old['qps'] * 100 if old['qps'] else 0
+        print(
+            f"{name:<26} {old['qps']:8.1f} -> {new['qps']:8.1f} {change:+5.0f}%"
+            f" {old['p95_ms']:9.2f} -> {new['p95_ms']:9.2f}"
+            f" {old['queries_per_request']:6.1f} -> {new['queries_per_request']:6.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=parse_size, default='10k', help="10k, 100k, 1m or a row count")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--database', help="SQLite file for the dataset, reused by later runs")
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--only', nargs='+', choices=sorted(SCENARIOS), help="run only these scenarios")
+    parser.add_argument('--response-cache', action='store_true', help="keep the ETag response cache on")
+    parser.add_argument('--output', help="write results as JSON to this file")
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help="compare two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    # Concurrent writers need a real file; an in-memory database locks whole tables
+    database = args.database or f'/tmp/item-tracker-bench-{args.size}-{args.seed}.sqlite3'
+    setup(database, keepdb=True)
+    from items.views import ItemViewSet, CategoryViewSet, LocationViewSet
+
+    for viewset in (ItemViewSet, CategoryViewSet, LocationViewSet):
+        viewset.throttle_classes = []
+        if not args.response_cache:
+            viewset.response_cache_timeout = 0
+    remove_created_items()
+    generate(args.size, seed=args.seed, stdout=sys.stdout)
+    context = Context()
+
+    results = {
+        'meta': {
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'items': args.size,
+            'seed': args.seed,
+            'concurrency': args.concurrency,
+            'seconds': args.seconds,
+            'response_cache': args.response_cache,
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        },
+        'scenarios': {},
+    }
+    for name in args.only or SCENARIOS:
+        result = results['scenarios'][name] = run_scenario(name, context, args.concurrency, args.seconds)
+        print(
+            f"{name:<26} {result['qps']:8.1f} req/s  p50 {result['p50_ms']:8.2f}  p95 {result['p95_ms']:8.2f}"
+            f"  p99 {result['p99_ms']:8.2f} ms  {result['queries_per_request']:5.1f} queries  {result['errors']} errors"
+        )
+    remove_created_items()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+?search= latency on /api/items/ with the FTS5 backend versus SearchFilter's LIKE scan.
+
+    python -m benchmarks.search [--sizes 10000 100000] [--repeat 20]
+"""
+import argparse
+import random
+import statistics
+import time
+
+from benchmarks import setup, api_client
+from benchmarks.data import WORDS
+
+QUERIES = ['kalo', 'mine rusa', 'tivope', 'dago', 'fuzi bochemi']
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    setup()
+    from rest_framework.filters import SearchFilter
+    from items.models import Category, Location, Item
+    from items.views import ItemViewSet
+
+    ItemViewSet.throttle_classes = []
+    client = api_client()
+    category = Category.objects.create(name="Bench Category")
+    location = Location.objects.create(name="Bench Location")
+    rng = random.Random(0)
+    fts_backends = list(ItemViewSet.filter_backends)
+    like_backends = [SearchFilter if b.__name__ == 'FullTextSearchFilter' else b for b in fts_backends]
+
+    created = 0
+    for size in args.sizes:
+        Item.objects.bulk_create(
+            Item(name=f"{' '.join(rng.sample(WORDS, 2))} {i}", description=' '.join(rng.sample(WORDS, 5)),
+                 category=category, location=location)
+            for i in range(created, size)
+        )
+        created = size
+        for label, backends in (('like', like_backends), ('fts5', fts_backends)):
+            ItemViewSet.filter_backends = backends
+            timings = []
+            for _ in range(args.repeat):
+                for query in QUERIES:
+                    start = time.perf_counter()
+                    client.get('/api/items/', {'search': query})
+                    timings.append(time.perf_counter() - start)
+            print(f"{size:>8} items  {label:<5} median {statistics.median(timings) * 1000:8.2f} ms")
+        ItemViewSet.filter_backends = fts_backends
+
+
+if __name__ == '__main__':
+    main()
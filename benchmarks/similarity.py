@@ -0,0 +1,76 @@
+"""
+Near-duplicate lookups (items/similarity.py): the LSH index versus scoring
+every item name, at growing inventory sizes. Queries are existing names
+with a typo, so each has a true near-duplicate; recall is the share of the
+linear scan's matches the index also returns.
+
+    python -m benchmarks.similarity [--sizes 10000 100000] [--queries 50]
+"""
+import argparse
+import random
+import statistics
+import time
+
+from benchmarks import setup
+from benchmarks.data import WORDS
+
+
+def typo(name, rng):
+    i = rng.randrange(len(name))
+    return name[:i] + rng.choice('aeiou') + name[i + 1:]
+
+
+def linear_scan(name, threshold):
+    from items import similarity
+    from items.models import Item
+    grams = similarity.trigrams(similarity.normalize(name))
+    return {
+        pk for pk, other in Item.objects.values_list('id', 'name').iterator(chunk_size=5000)
+        if similarity.similarity(grams, similarity.trigrams(similarity.normalize(other))) >= threshold
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--queries', type=int, default=50)
+    args = parser.parse_args()
+
+    setup()
+    from items import similarity
+    from items.models import Category, Location, Item
+
+    category = Category.objects.create(name="Bench Category")
+    location = Location.objects.create(name="Bench Location")
+    rng = random.Random(0)
+    threshold = similarity.default_threshold()
+
+    created = 0
+    for size in args.sizes:
+        start = time.perf_counter()
+        Item.objects.bulk_create(
+            Item(name=f"{' '.join(rng.sample(WORDS, 2))} {i}", category=category, location=location)
+            for i in range(created, size)
+        )
+        insert = time.perf_counter() - start
+        names = [typo(name, rng) for name in Item.objects.order_by('?').values_list('name', flat=True)[:args.queries]]
+        index_times, scan_times, found, expected = [], [], 0, 0
+        for name in names:
+            start = time.perf_counter()
+            matches = {row['id'] for row in similarity.find(name, limit=100)}
+            index_times.append(time.perf_counter() - start)
+            if len(scan_times) < 5:
+                start = time.perf_counter()
+                exact = linear_scan(name, threshold)
+                scan_times.append(time.perf_counter() - start)
+                found += len(matches & exact)
+                expected += len(exact)
+        print(f"{size:>8} items  insert {(insert / (size - created)) * 1e6:6.0f} us/item"
+              f"  index {statistics.median(index_times) * 1000:7.2f} ms"
+              f"  scan {statistics.median(scan_times) * 1000:9.2f} ms"
+              f"  recall {found / expected if expected else 1:.2f}")
+        created = size
+
+
+if __name__ == '__main__':
+    main()
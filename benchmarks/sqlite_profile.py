@@ -0,0 +1,99 @@
+"""
+Concurrent read/write load on a SQLite file: stock settings (rollback
+journal, no pragmas, every query on 'default') versus the performance
+profile (ITEMS_SQLITE_PRAGMAS plus ReadWriteRouter).
+
+    python -m benchmarks.sqlite_profile [--seconds 5] [--readers 4] [--writers 2] [--items 10000]
+
+Each run uses a fresh database file in a temporary directory.
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+import django
+
+
+def run(path, profile, args):
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.db import OperationalError, connections, router
+    from items.db import ReadWriteRouter
+    from items.models import Category, Location, Item
+
+    settings.DATABASES['default']['NAME'] = path
+    settings.DATABASES['readonly']['NAME'] = f'file:{path}?mode=ro'
+    settings.ITEMS_SQLITE_PRAGMAS = args.pragmas if profile else {}
+    router.routers = [ReadWriteRouter()] if profile else []
+    connections.close_all()
+    call_command('migrate', verbosity=0)
+    category = Category.objects.create(name="Bench Category")
+    location = Location.objects.create(name="Bench Location")
+    Item.objects.bulk_create(
+        Item(name=f"Item {i}", category=category, location=location) for i in range(args.items)
+    )
+
+    counts = {'reads': 0, 'writes': 0, 'locked': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+
+    def reader():
+        while time.perf_counter() < deadline:
+            Item.objects.filter(category=category).count()
+            list(Item.objects.filter(is_available=True).order_by('-date_added')[:50])
+            with lock:
+                counts['reads'] += 1
+        connections.close_all()
+
+    def writer(n):
+        i = 0
+        while time.perf_counter() < deadline:
+            i += 1
+            try:
+                item = Item.objects.create(name=f"Writer {n} item {i}", category=category, location=location)
+                item.quantity = 2
+                item.save()
+            except OperationalError:
+                with lock:
+                    counts['locked'] += 1
+                continue
+            with lock:
+                counts['writes'] += 1
+        connections.close_all()
+
+    threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+    threads += [threading.Thread(target=writer, args=(n,)) for n in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    connections.close_all()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--items', type=int, default=10000)
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'item_tracker.settings')
+    django.setup()
+    from django.conf import settings
+    args.pragmas = settings.ITEMS_SQLITE_PRAGMAS
+
+    directory = tempfile.mkdtemp()
+    for label, profile in (('stock  ', False), ('profile', True)):
+        counts = run(os.path.join(directory, f'{label.strip()}.sqlite3'), profile, args)
+        print(
+            f"{label}  reads {counts['reads'] / args.seconds:8.1f}/s  writes {counts['writes'] / args.seconds:7.1f}/s"
+            f"  'database is locked' {counts['locked']}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Process start-up: `manage.py check` and loading the WSGI application with
+its URLconf, as a worker does before its first request, each in a fresh
+interpreter. "eager" also imports the drf_yasg schema modules up front, as
+item_tracker/urls.py did before items/schema.py deferred them. Then the
+cost of /openapi.json: first request (generates), later ones, and a 304.
+
+    python -m benchmarks.startup [--repeat 5]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WSGI_LOAD = """
+import time
+start = time.perf_counter()
+from item_tracker.wsgi import application
+{eager}
+from django.urls import get_resolver
+get_resolver().url_patterns
+print(time.perf_counter() - start)
+"""
+EAGER = "import drf_yasg.views, drf_yasg.generators"
+
+
+def run(args):
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'item_tracker.settings'}
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, *args], cwd=ROOT, env=env, check=True, capture_output=True, text=True).stdout
+    return time.perf_counter() - start, output
+
+
+def median_ms(values):
+    return statistics.median(values) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    check = [run(['manage.py', 'check'])[0] for _ in range(args.repeat)]
+    print(f"manage.py check          {median_ms(check):8.1f} ms (process)")
+    for label, eager in (('lazy ', ''), ('eager', EAGER)):
+        loads = [float(run(['-c', WSGI_LOAD.format(eager=eager)])[1]) for _ in range(args.repeat)]
+        print(f"WSGI app + URLconf {label} {median_ms(loads):8.1f} ms")
+
+    from benchmarks import setup
+    setup()
+    from django.test import Client
+    from items import schema
+    client = Client()
+    schema.reset()
+    start = time.perf_counter()
+    response = client.get('/openapi.json')
+    first = time.perf_counter() - start
+    timings, revalidations = [], []
+    for _ in range(20):
+        start = time.perf_counter()
+        client.get('/openapi.json')
+        timings.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        client.get('/openapi.json', HTTP_IF_NONE_MATCH=response['ETag'])
+        revalidations.append(time.perf_counter() - start)
+    print(f"/openapi.json first      {first * 1000:8.1f} ms  ({len(response.content)} bytes)")
+    print(f"/openapi.json cached     {median_ms(timings):8.1f} ms")
+    print(f"/openapi.json 304        {median_ms(revalidations):8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Keeping a client in sync: re-downloading every page of /api/items/ versus
+fetching the changes since its checkpoint from /api/sync/.
+
+    python -m benchmarks.sync [--items 100000] [--changes 100]
+"""
+import argparse
+import time
+
+from benchmarks import setup, api_client
+from benchmarks.data import generate
+
+
+def full_download(client):
+    start = time.perf_counter()
+    url, requests = '/api/items/?pagination=cursor', 0
+    while url:
+        url = client.get(url).data['next']
+        requests += 1
+    return time.perf_counter() - start, requests
+
+
+def delta(client, checkpoint):
+    start = time.perf_counter()
+    requests = 0
+    while True:
+        data = client.get('/api/sync/', {'since': checkpoint}).data
+        checkpoint = data['checkpoint']
+        requests += 1
+        if not data['has_more']:
+            break
+    return time.perf_counter() - start, requests
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=100000)
+    parser.add_argument('--changes', type=int, default=100)
+    args = parser.parse_args()
+
+    setup()
+    from items.models import Item
+    from items.views import ItemViewSet, SyncView
+    ItemViewSet.throttle_classes = SyncView.throttle_classes = []
+    ItemViewSet.response_cache_timeout = 0
+    generate(args.items, image_ratio=0)
+    client = api_client()
+
+    # Where a client that synced before the changes stands
+    checkpoint = Item.objects.order_by('-revision').values_list('revision', flat=True).first()
+    items = list(Item.objects.order_by('?')[:args.changes])
+    for n, item in enumerate(items):
+        if n % 10 == 0:
+            item.delete()
+        else:
+            item.quantity += 1
+            item.save()
+
+    seconds, requests = full_download(client)
+    print(f"full download   {seconds * 1000:9.1f} ms  {requests:5} requests")
+    seconds, requests = delta(client, checkpoint)
+    print(f"delta sync      {seconds * 1000:9.1f} ms  {requests:5} requests  ({args.changes} changes)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Throttle check overhead: DRF's UserRateThrottle on the local-memory cache
+versus SharedUserRateThrottle on the SQLite token-bucket store, plus a check
+that the shared limit holds across worker processes.
+
+    python -m benchmarks.throttle [--checks 20000] [--clients 1 1000] [--workers 4]
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+from benchmarks import setup
+
+
+def per_check_us(throttle_class, checks, clients):
+    from django.contrib.auth.models import User
+    from rest_framework.test import APIRequestFactory
+    requests = []
+    for pk in range(clients):
+        request = APIRequestFactory().get('/api/items/')
+        request.user = User(pk=pk + 1)
+        requests.append(request)
+    throttle = throttle_class()
+    throttle.rate, throttle.num_requests, throttle.duration = '1000000000/day', 10 ** 9, 86400
+    start = time.perf_counter()
+    for i in range(checks):
+        assert throttle.allow_request(requests[i % clients], None)
+    return (time.perf_counter() - start) / checks * 1e6
+
+
+def worker(limit, attempts, results):
+    from items.throttling import get_store
+    store = get_store()
+    results.put(sum(store.consume('throttle_user_1', limit, 86400, time.time())[0] for _ in range(attempts)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--checks', type=int, default=20000)
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 1000])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--limit', type=int, default=1000)
+    args = parser.parse_args()
+
+    setup()
+    from django.conf import settings
+    from rest_framework.throttling import UserRateThrottle
+    from items.throttling import SharedUserRateThrottle
+
+    settings.ITEMS_THROTTLE_DB = os.path.join(tempfile.mkdtemp(), 'throttle.sqlite3')
+
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=worker, args=(args.limit, args.limit, results)) for _ in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    allowed = sum(results.get() for _ in processes)
+    for process in processes:
+        process.join()
+    print(f"{args.workers} workers x {args.limit} requests at {args.limit}/day: {allowed} allowed in total")
+
+    for clients in args.clients:
+        local_us = per_check_us(UserRateThrottle, args.checks, clients)
+        shared_us = per_check_us(SharedUserRateThrottle, args.checks, clients)
+        print(f"{clients:>6} clients  UserRateThrottle (locmem) {local_us:7.1f} us/check  SharedUserRateThrottle {shared_us:7.1f} us/check")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,14 +3,31 @@ ASGI config for item_tracker project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+GET and HEAD requests are resolved against item_tracker.async_urls, which
+serves item, category and location reads from async views; all other
+requests use ROOT_URLCONF as usual.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 """
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from django.core.handlers.asgi import ASGIHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'item_tracker.settings')
 
-application = get_asgi_application()
+
+class ItemTrackerASGIHandler(ASGIHandler):
+    read_urlconf = 'item_tracker.async_urls'
+
+    def create_request(self, scope, body_file):
+        request, error_response = super().create_request(scope, body_file)
+        if request is not None and request.method in ('GET', 'HEAD'):
+            request.urlconf = self.read_urlconf
+        return request, error_response
+
+
+django.setup(set_prefix=False)
+application = ItemTrackerASGIHandler()
@@ -0,0 +1,20 @@
+"""
+URLconf for GET and HEAD requests served through item_tracker/asgi.py.
+
+List and detail reads of items, categories and locations go to the async
+views in items.async_views; every other URL falls through to item_tracker.urls.
+"""
+from django.urls import include, path
+
+from items.async_views import async_view
+from items.views import ItemViewSet, CategoryViewSet, LocationViewSet
+
+urlpatterns = [
+    path('api/items/', async_view(ItemViewSet, 'list')),
+    path('api/items/<int:pk>/', async_view(ItemViewSet, 'retrieve')),
+    path('api/categories/', async_view(CategoryViewSet, 'list')),
+    path('api/categories/<int:pk>/', async_view(CategoryViewSet, 'retrieve')),
+    path('api/locations/', async_view(LocationViewSet, 'list')),
+    path('api/locations/<int:pk>/', async_view(LocationViewSet, 'retrieve')),
+    path('', include('item_tracker.urls')),
+]
@@ -48,6 +48,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its timings cover the rest; see items/instrumentation.py
+    'items.instrumentation.RequestTimingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -115,9 +117,35 @@ WSGI_APPLICATION = 'item_tracker.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        # django.db.backends.sqlite3 with BEGIN IMMEDIATE transactions, see the module
+        'ENGINE': 'items.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        # Persistent connections; pragmas are applied once per connection (ITEMS_SQLITE_PRAGMAS)
+        'CONN_MAX_AGE': None,
+        'CONN_HEALTH_CHECKS': True,
+    },
+    # Read-only connection to the same file, see ITEMS_DB_READ_ALIAS
+    'readonly': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f"file:{BASE_DIR / 'db.sqlite3'}?mode=ro",
+        'OPTIONS': {'uri': True},
+        'CONN_MAX_AGE': None,
+        'CONN_HEALTH_CHECKS': True,
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+# Reads go to ITEMS_DB_READ_ALIAS outside transactions, writes to 'default'; see items/db.py
+DATABASE_ROUTERS = ['items.db.ReadWriteRouter']
+ITEMS_DB_READ_ALIAS = 'readonly'
+
+# Applied to every SQLite connection when it is opened
+ITEMS_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,  # KiB
+    'busy_timeout': 5000,  # ms
 }
 
 
@@ -168,7 +196,7 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 10,
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend', 'rest_framework.filters.SearchFilter', 'rest_framework.filters.OrderingFilter'],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'items.authentication.CachedJWTAuthentication',
         # 'rest_framework.authentication.TokenAuthentication',
         # 'rest_framework.authentication.SessionAuthentication',  # Add this line
 
@@ -182,8 +210,8 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 10,
 
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle'
+        'items.throttling.SharedAnonRateThrottle',
+        'items.throttling.SharedUserRateThrottle'
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '100/day',
@@ -214,4 +242,53 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM': 'user_id',
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
-}
\ No newline at end of file
+}
+# In-process cache for items/by-barcode/ lookups
+ITEMS_BARCODE_CACHE_SIZE = 10000
+ITEMS_BARCODE_CACHE_TTL = 300  # seconds
+
+# In-process cache of authenticated users, see items/authentication.py
+ITEMS_AUTH_USER_CACHE_SIZE = 10000
+ITEMS_AUTH_USER_CACHE_TTL = 60  # seconds
+
+# SQLite file holding the throttle counters shared by all workers, see items/throttling.py
+ITEMS_THROTTLE_DB = BASE_DIR / 'throttle.sqlite3'
+
+# Image renditions (see items/images.py); longest edge in pixels
+ITEMS_IMAGE_RENDITION_SIZES = {'thumbnail': 200, 'medium': 800}
+ITEMS_IMAGE_RENDITION_QUALITY = 80
+ITEMS_IMAGE_WORKERS = 2  # background threads; 0 renders inline
+
+# Chunked image uploads, see items/uploads.py; partial files default to MEDIA_ROOT/incomplete_uploads
+ITEMS_IMAGE_UPLOAD_DIR = None
+ITEMS_IMAGE_UPLOAD_MAX_SIZE = 50 * 1024 * 1024  # bytes
+ITEMS_IMAGE_UPLOAD_MAX_CHUNK_SIZE = 8 * 1024 * 1024  # bytes
+
+# Prebuilt OpenAPI schema (`manage.py generate_openapi_schema`); None generates it on first request
+ITEMS_OPENAPI_SCHEMA_FILE = None
+# The Swagger UI and ReDoc pages read the cached schema instead of generating their own
+SWAGGER_SETTINGS = {'SPEC_URL': 'schema-json'}
+REDOC_SETTINGS = {'SPEC_URL': 'schema-json'}
+
+# Price facet boundaries for items/facets/, ascending; see items/facets.py
+ITEMS_FACET_PRICE_BUCKETS = [10, 50, 100, 500]
+
+# Minimum trigram similarity (0-1) for items/similar/ and create warnings, see items/similarity.py
+ITEMS_SIMILAR_NAME_THRESHOLD = 0.6
+
+# Name stored images after their SHA-256 so identical uploads share one file, see items/storage.py
+ITEMS_CONTENT_ADDRESSED_IMAGES = False
+
+# Whole-inventory analytics snapshots, see items/analytics.py: background threads
+# refreshing them (0 refreshes inline) and the seconds one is served after an item write
+ITEMS_ANALYTICS_WORKERS = 1
+ITEMS_ANALYTICS_REFRESH_INTERVAL = 60
+
+# Seconds a read response stays in the cache; entries are keyed on model versions, see items/versions.py
+ITEMS_RESPONSE_CACHE_TIMEOUT = 300
+
+# Per-request timings (items/instrumentation.py): Server-Timing header, which
+# exposes query counts and timings to clients, and a warning on the
+# items.instrumentation logger for requests at least this slow
+ITEMS_SERVER_TIMING = DEBUG
+ITEMS_SLOW_REQUEST_MS = 1000  # None disables the log
@@ -2,27 +2,15 @@ from django.contrib import admin
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework.authtoken.views import obtain_auth_token
-from items.views import ItemViewSet, CategoryViewSet, LocationViewSet
+from items.views import ItemViewSet, CategoryViewSet, LocationViewSet, SyncView
+from items import schema
 from django.conf import settings
 from django.conf.urls.static import static
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-from rest_framework import permissions
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
 
-schema_view = get_schema_view(
-   openapi.Info(
-      title="Items API",
-      default_version='v1',
-      description="API for managing items, categories, and locations",
-   ),
-   public=True,
-   permission_classes=[permissions.AllowAny],
-)
-
 # item_tracker/urls.py
 router = DefaultRouter()
 router.register(r'items', ItemViewSet)
@@ -32,11 +20,14 @@ router.register(r'locations', LocationViewSet)
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include(router.urls)),
+    path('api/sync/', SyncView.as_view(), name='sync'),
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),    
     #path('api-token-auth/', obtain_auth_token, name='api_token_auth'),
-    path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
-    path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+    # Generated once, see items/schema.py; the UI pages load it from here
+    path('openapi.json', schema.schema_view, name='schema-json'),
+    path('swagger/', schema.ui_view('swagger'), name='schema-swagger-ui'),
+    path('redoc/', schema.ui_view('redoc'), name='schema-redoc'),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,230 @@
+"""
+Inventory valuation and distribution statistics.
+
+For the items matching the list filters, optionally per category or per
+location: the item count, total quantity and total value, price and
+quantity percentiles, and the value added per period of `date_added` with
+its running total.
+
+The whole inventory is served without scanning the items: the totals come
+from InventorySummary, which every write keeps current, and the percentiles
+and value added from a snapshot that refresh() computes in a background
+thread (ITEMS_ANALYTICS_WORKERS) and stores in the cache. A request that
+finds its snapshot missing, or older than the last item write and at least
+ITEMS_ANALYTICS_REFRESH_INTERVAL seconds old, schedules a refresh and
+answers with what is there; `computed_at` in the response says how current
+the distributions are. `manage.py refresh_analytics` fills the snapshots
+ahead of the first request.
+
+compute() does the scan, for the refresh and for filtered requests, in one
+query over a CTE of the five columns involved, so no item rows reach
+Python. Percentiles are nearest-rank, picked out of ROW_NUMBER() and
+COUNT(*) windows partitioned by group, and the running total is a SUM()
+window over the per-period sums. Values are summed in whole cents, as
+InventorySummary does. As in items.facets, a filtered CTE is materialized
+so the filter runs once; an unfiltered one reads items_item directly.
+
+The indexes on (category, price, quantity, date_added) and (location,
+price, quantity, date_added) hold every column read here, so an unfiltered
+query scans one of them instead of the table, already in per-group price
+order. The windows still sort: with `python -m benchmarks.analytics` at 1M
+items on one core, a whole-inventory scan takes about 9.7 s (10.5 s without
+the indexes) and one per category about 8 s (14.8 s), which is why they run
+off the request path; a search narrowing it to a few thousand items takes
+about 0.6 s.
+"""
+import logging
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.utils import timezone
+
+from . import summaries, versions
+from .models import Category, Item, Location
+from .summaries import as_value
+
+logger = logging.getLogger(__name__)
+PERCENTILES = {'min': 0, 'p25': 25, 'median': 50, 'p75': 75, 'p90': 90, 'max': 100}
+
+# strftime() formats for the value-added periods; date_added is stored in UTC
+PERIODS = {
+    'day': '%Y-%m-%d',
+    'week': '%Y-W%W',
+    'month': '%Y-%m',
+    'year': '%Y',
+}
+
+GROUPS = {'category': Category, 'location': Location}
+
+# Fields of a group that come from the snapshot rather than InventorySummary
+DISTRIBUTIONS = ('price', 'quantity', 'value_added')
+
+_executor = None
+_executor_lock = threading.Lock()
+_refreshing = set()
+
+
+def rank(percentile, count):
+    """Nearest-rank position of `percentile` among `count` sorted values."""
+    return max(1, -(-percentile * count // 100))
+
+
+def percentile_sql(column, group):
+    # Only the rows at one of the PERCENTILES ranks leave the database
+    ranks = ' OR '.join(f'rn = ({percentile} * n + 99) / 100' for percentile in PERCENTILES.values() if percentile)
+    return f"""
+        SELECT '{column}', g, rn, n, value, NULL, NULL FROM (
+            SELECT {group} AS g, {column} AS value,
+                   ROW_NUMBER() OVER (PARTITION BY {group} ORDER BY {column}) AS rn,
+                   COUNT(*) OVER (PARTITION BY {group}) AS n
+            FROM hits WHERE {column} IS NOT NULL
+        ) WHERE rn = 1 OR {ranks}
+    """
+
+
+def compute(queryset, group_by=None, period='month'):
+    """Statistics for the items in `queryset`; see the module docstring."""
+    group = f'{group_by}_id' if group_by else 'NULL'
+    columns = queryset.order_by().values('category_id', 'location_id', 'price', 'quantity', 'date_added')
+    sql, params = columns.query.get_compiler(queryset.db).as_sql()
+    connection = connections[queryset.db]
+    materialized = ''
+    if connection.vendor == 'sqlite':
+        materialized = 'MATERIALIZED' if queryset.query.where else 'NOT MATERIALIZED'
+    query = f"""
+        WITH hits AS {materialized} ({sql})
+        {percentile_sql('price', group)}
+        UNION ALL
+        {percentile_sql('quantity', group)}
+        UNION ALL
+        SELECT 'period', g, period, items, quantity, value,
+               SUM(value) OVER (PARTITION BY g ORDER BY period) FROM (
+            SELECT {group} AS g, strftime(%s, date_added) AS period, COUNT(*) AS items, SUM(quantity) AS quantity,
+                   COALESCE(SUM(CAST(ROUND(quantity * price * 100) AS INTEGER)), 0) AS value
+            FROM hits GROUP BY 1, 2
+        )
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(query, [*params, PERIODS[period]])
+        rows = cursor.fetchall()
+
+    groups = defaultdict(lambda: {
+        'count': 0, 'total_quantity': 0, 'total_value_cents': 0,
+        'price': dict.fromkeys(PERCENTILES), 'quantity': dict.fromkeys(PERCENTILES), 'value_added': [],
+    })
+    for kind, key, *values in rows:
+        stats = groups[key]
+        if kind == 'period':
+            period, count, quantity, cents, cumulative = values
+            stats['value_added'].append({
+                'period': period, 'count': count, 'value': as_value(cents), 'cumulative_value': as_value(cumulative),
+            })
+            stats['count'] += count
+            stats['total_quantity'] += quantity
+            stats['total_value_cents'] += cents
+        else:
+            position, count, value = values[:3]
+            for name, percentile in PERCENTILES.items():
+                if rank(percentile, count) == position:
+                    stats[kind][name] = f'{value:.2f}' if kind == 'price' else value
+
+    names = dict(GROUPS[group_by].objects.using(queryset.db).filter(pk__in=groups).values_list('id', 'name')) if group_by else {}
+    result = []
+    for key, stats in groups.items():
+        stats['value_added'].sort(key=lambda row: row['period'])
+        stats['total_value'] = as_value(stats.pop('total_value_cents'))
+        result.append({'id': key, 'name': names.get(key), **stats})
+    result.sort(key=lambda row: (row['name'] or '', row['id'] or 0))
+    return result
+
+
+def snapshot_key(group_by, period):
+    return f'items:analytics:{group_by}:{period}'
+
+
+def refresh(group_by=None, period='month'):
+    """Recompute the whole-inventory distributions for `group_by` and `period` and store the snapshot."""
+    # Taken first, so a write during the scan leaves the snapshot stale
+    [version] = versions.current(Item)
+    groups = compute(Item.objects.all(), group_by, period)
+    cache.set(snapshot_key(group_by, period), {
+        'version': version,
+        'computed_at': timezone.now(),
+        'groups': {row['id']: {name: row[name] for name in DISTRIBUTIONS} for row in groups},
+    }, None)
+
+
+def refresh_in_worker(group_by, period):
+    try:
+        refresh(group_by, period)
+    except Exception:
+        logger.exception("Could not refresh the %s analytics by %s", period, group_by or 'inventory')
+    finally:
+        with _executor_lock:
+            _refreshing.discard((group_by, period))
+        # Worker threads get their own database connections; don't leak them
+        connections.close_all()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'ITEMS_ANALYTICS_WORKERS', 1),
+                thread_name_prefix='item-analytics',
+            )
+        return _executor
+
+
+def schedule(group_by=None, period='month'):
+    """Refresh a snapshot off the request thread (inline when ITEMS_ANALYTICS_WORKERS is 0), once at a time."""
+    if getattr(settings, 'ITEMS_ANALYTICS_WORKERS', 1) == 0:
+        refresh(group_by, period)
+        return
+    with _executor_lock:
+        if (group_by, period) in _refreshing:
+            return
+        _refreshing.add((group_by, period))
+    get_executor().submit(refresh_in_worker, group_by, period)
+
+
+def is_stale(snapshot):
+    if snapshot['version'] == versions.current(Item)[0]:
+        return False
+    interval = timedelta(seconds=getattr(settings, 'ITEMS_ANALYTICS_REFRESH_INTERVAL', 60))
+    return timezone.now() - snapshot['computed_at'] >= interval
+
+
+def inventory(group_by=None, period='month'):
+    """
+    Statistics for the whole inventory, without scanning it: totals from
+    InventorySummary, distributions from the last snapshot. Returns the
+    groups and when their distributions were computed, None before the first
+    refresh.
+    """
+    key = snapshot_key(group_by, period)
+    snapshot = cache.get(key)
+    if snapshot is None or is_stale(snapshot):
+        schedule(group_by, period)
+        # Inline refreshes have stored a new one
+        snapshot = cache.get(key) or snapshot
+    if group_by:
+        totals = [
+            {'id': row[group_by], 'name': row[f'{group_by}__name'], 'count': row['count'],
+             'total_quantity': row['total_quantity'], 'total_value': row['total_value']}
+            for row in summaries.grouped(group_by)
+        ]
+    else:
+        overall = summaries.overall()
+        totals = [{'id': None, 'name': None, **overall}] if overall['count'] else []
+    distributions = snapshot['groups'] if snapshot else {}
+    empty = {'price': dict.fromkeys(PERCENTILES), 'quantity': dict.fromkeys(PERCENTILES), 'value_added': []}
+    groups = [{**row, **distributions.get(row['id'], empty)} for row in totals]
+    return groups, snapshot['computed_at'] if snapshot else None
+
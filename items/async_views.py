@@ -0,0 +1,133 @@
+"""
+Async list/retrieve for the item, category and location viewsets.
+
+item_tracker/asgi.py resolves GET requests against item_tracker/async_urls.py,
+which points these reads here, so waiting on the database does not hold a
+worker thread. Writes, custom actions and the browsable API keep using the
+regular sync viewsets.
+"""
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ObjectDoesNotExist
+from django.http import Http404
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from .instrumentation import timed
+from .pagination import apaginate_queryset
+
+
+class AsyncRequest(Request):
+    """Request whose authenticators are awaited up front, see `aauthenticate()`."""
+
+    async def aauthenticate(self):
+        # Request._authenticate() with awaited authenticators
+        for authenticator in self.authenticators:
+            try:
+                user_auth = await authenticator.aauthenticate(self)
+            except exceptions.APIException:
+                self._not_authenticated()
+                raise
+
+            if user_auth is not None:
+                self._authenticator = authenticator
+                self.user, self.auth = user_auth
+                return
+
+        self._not_authenticated()
+
+
+class AsyncReadMixin:
+    """
+    `alist` and `aretrieve` handlers for a viewset, served by `async_view()`.
+
+    They mirror ListModelMixin/RetrieveModelMixin: same queryset, filter
+    backends, pagination and serializer, with the queries awaited.
+    """
+
+    async def afilter_queryset(self, queryset):
+        # Filter backends may validate parameters against the database
+        # (django-filter's ModelChoiceFilter does), so give them a thread
+        if not self.request.query_params:
+            return self.filter_queryset(queryset)
+        return await sync_to_async(self.filter_queryset)(queryset)
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = await self.afilter_queryset(self.get_queryset())
+        page = await apaginate_queryset(self.paginator, queryset, request, self)
+        if page is not None:
+            with timed('serialize'):
+                data = self.get_serializer(page, many=True).data
+            return self.get_paginated_response(data)
+        objs = [obj async for obj in queryset]
+        with timed('serialize'):
+            return Response(self.get_serializer(objs, many=True).data)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object(self.get_queryset())
+        with timed('serialize'):
+            return Response(self.get_serializer(instance).data)
+
+    async def aget_object(self, queryset):
+        queryset = await self.afilter_queryset(queryset)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = await queryset.aget(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except ObjectDoesNotExist:
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+
+def async_view(viewset_class, action):
+    """
+    An async Django view running `action` ('list' or 'retrieve') of a viewset
+    using AsyncReadMixin.
+
+    Does what APIView.dispatch() does for a GET, with authentication awaited
+    through the authenticators' `aauthenticate()` (CachedJWTAuthentication).
+    Requests it cannot serve without blocking, such as browsable API renders
+    or viewsets with other authentication classes, are handed to the sync
+    view in a thread.
+    """
+    sync_view = sync_to_async(viewset_class.as_view({'get': action}))
+    handler_name = 'a' + action
+
+    async def view(request, *args, **kwargs):
+        self = viewset_class(action_map={'get': action}, action=action)
+        self.args, self.kwargs = args, kwargs
+        self.format_kwarg = None
+        self.headers = self.default_response_headers
+        authenticators = self.get_authenticators()
+        if request.method not in ('GET', 'HEAD') or not all(
+            hasattr(authenticator, 'aauthenticate') for authenticator in authenticators
+        ):
+            return await sync_view(request, *args, **kwargs)
+
+        drf_request = self.request = AsyncRequest(
+            request, parsers=self.get_parsers(), authenticators=authenticators,
+            negotiator=self.get_content_negotiator(),
+        )
+        try:
+            renderer, media_type = self.perform_content_negotiation(drf_request)
+            if not isinstance(renderer, JSONRenderer):
+                return await sync_view(request, *args, **kwargs)
+            drf_request.accepted_renderer, drf_request.accepted_media_type = renderer, media_type
+
+            with timed('auth'):
+                await drf_request.aauthenticate()
+            self.check_permissions(drf_request)
+            if self.throttle_classes:
+                # The shared throttle store is SQLite and may wait on busy_timeout
+                await sync_to_async(self.check_throttles)(drf_request)
+            response = await getattr(self, handler_name)(drf_request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        response = self.finalize_response(drf_request, response, *args, **kwargs)
+        # Render here rather than let Django render it in a thread
+        return response.render()
+
+    view.viewset_class, view.action = viewset_class, action
+    return view
@@ -0,0 +1,92 @@
+"""
+JWT authentication that resolves users from an in-process cache.
+
+simplejwt's JWTAuthentication loads the user row on every request. Here the
+row is cached per user id for ITEMS_AUTH_USER_CACHE_TTL seconds; saving or
+deleting a user (which covers deactivation and password changes) evicts it,
+see items/receivers.py. Writes made elsewhere, such as queryset.update() or
+another process, are picked up once the entry expires.
+"""
+import copy
+
+from django.conf import settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .cache import LRUCache
+
+cache = LRUCache(
+    maxsize=getattr(settings, 'ITEMS_AUTH_USER_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'ITEMS_AUTH_USER_CACHE_TTL', 60),
+)
+
+
+def invalidate(users):
+    user_ids = [getattr(user, api_settings.USER_ID_FIELD) for user in users]
+    if user_ids:
+        cache.delete(*user_ids)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication with cached user lookups.
+
+    The active and password-changed checks still run on every request. Each
+    request gets its own copy of the cached user, so per-request state such
+    as the permission cache is not shared. `aauthenticate()` is the awaitable
+    variant used by the async read views.
+    """
+
+    def get_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        user = cache.get(user_id)
+        if user is None:
+            generation = cache.generation
+            try:
+                user = self.user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed("User not found", code='user_not_found')
+            cache.set(user_id, user, generation=generation)
+        return self.check_user(copy.copy(user), validated_token)
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        user = cache.get(user_id)
+        if user is None:
+            generation = cache.generation
+            try:
+                user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed("User not found", code='user_not_found')
+            cache.set(user_id, user, generation=generation)
+        return self.check_user(copy.copy(user), validated_token)
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
+
+    def check_user(self, user, validated_token):
+        if not user.is_active:
+            raise AuthenticationFailed("User is inactive", code='user_inactive')
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed("The user's password has been changed.", code='password_changed')
+
+        return user
@@ -0,0 +1,16 @@
+"""
+SQLite backend whose transactions take the write lock when they start.
+
+Django 4.2 opens transactions with a deferred BEGIN. A transaction that reads
+before writing, like Item.save(), must then upgrade its lock, and SQLite
+fails that upgrade at once with "database is locked" when another writer got
+there first; busy_timeout does not apply. With BEGIN IMMEDIATE writers queue
+on busy_timeout instead. Django 5.1 offers the same as
+OPTIONS['transaction_mode'] = 'IMMEDIATE'.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
@@ -0,0 +1,54 @@
+from django.conf import settings
+
+from .cache import LRUCache
+from .models import Item
+
+cache = LRUCache(
+    maxsize=getattr(settings, 'ITEMS_BARCODE_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'ITEMS_BARCODE_CACHE_TTL', 300),
+)
+
+_MISSING = object()
+
+
+def lookup(codes):
+    """
+    Resolve barcodes to items, returning a dict of code -> Item (or None).
+
+    Cache misses are fetched with one indexed query. Barcodes are not unique,
+    so when several items share one the most recently added wins. Unknown
+    codes are cached as None so repeated scans of them stay off the database.
+    """
+    found = {}
+    missing = []
+    for code in codes:
+        item = cache.get(code, _MISSING)
+        if item is _MISSING:
+            missing.append(code)
+        else:
+            found[code] = item
+
+    if missing:
+        generation = cache.generation
+        items = {}
+        for item in Item.objects.filter(barcode__in=set(missing)).order_by('date_added', 'id'):
+            items[item.barcode] = item
+        for code in missing:
+            found[code] = items.get(code)
+            cache.set(code, found[code], generation=generation)
+    return found
+
+
+def changed_codes(items):
+    """The barcodes of `items`, as saved and as last loaded."""
+    codes = set()
+    for item in items:
+        codes.add(item.barcode)
+        codes.add(getattr(item, '_loaded_values', {}).get('barcode'))
+    codes.discard(None)
+    return codes
+
+
+def invalidate_codes(codes):
+    if codes:
+        cache.delete(*codes)
@@ -0,0 +1,61 @@
+"""
+SQLite tuning and read/write routing.
+
+`apply_sqlite_pragmas` runs on every new SQLite connection (see
+items/receivers.py) and applies ITEMS_SQLITE_PRAGMAS: WAL lets readers run
+alongside a writer, and busy_timeout makes writers queue instead of failing
+with "database is locked". Read-only connections (a `mode=ro` URI) skip the
+pragmas that write to the database file; switching a file to WAL from one
+fails with "attempt to write a readonly database".
+
+ReadWriteRouter sends reads to a read-only alias of the same file
+(ITEMS_DB_READ_ALIAS) and everything else to 'default'. Reads issued while
+'default' is inside a transaction stay on 'default' so a transaction sees
+its own writes; that includes every test in a TestCase.
+"""
+from urllib.parse import parse_qs, urlsplit
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+# journal_mode changes the database file itself; synchronous only affects writes
+WRITE_PRAGMAS = {'journal_mode', 'synchronous'}
+
+
+def is_read_only(connection):
+    if not connection.settings_dict.get('OPTIONS', {}).get('uri'):
+        return False
+    return parse_qs(urlsplit(str(connection.settings_dict['NAME'])).query).get('mode') == ['ro']
+
+
+def apply_sqlite_pragmas(connection):
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'ITEMS_SQLITE_PRAGMAS', {})
+    if is_read_only(connection):
+        pragmas = {name: value for name, value in pragmas.items() if name not in WRITE_PRAGMAS}
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+class ReadWriteRouter:
+    @property
+    def read_alias(self):
+        return getattr(settings, 'ITEMS_DB_READ_ALIAS', DEFAULT_DB_ALIAS)
+
+    def db_for_read(self, model, **hints):
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return self.read_alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases are the same database
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
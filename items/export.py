@@ -0,0 +1,36 @@
+"""
+Line encoders for the streaming inventory export (ItemViewSet.export).
+
+Rows are rendered by ItemValuesSerializer, so exported data matches the API.
+"""
+import csv
+import json
+
+# Every ItemSerializer field except the rendition URLs, which need a file check per row
+FIELDS = ['id', 'name', 'description', 'quantity', 'date_added', 'price', 'category', 'location', 'is_available', 'image', 'barcode']
+
+
+class Echo:
+    """File-like object whose write() hands back the line, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows, serializer):
+    writer = csv.writer(Echo())
+    yield writer.writerow(FIELDS)
+    for row in rows:
+        item = serializer.to_representation(row)
+        yield writer.writerow(['' if item[field] is None else item[field] for field in FIELDS])
+
+
+def ndjson_lines(rows, serializer):
+    for row in rows:
+        yield json.dumps(serializer.to_representation(row), ensure_ascii=False) + '\n'
+
+
+FORMATS = {
+    'csv': (csv_lines, 'text/csv; charset=utf-8'),
+    'ndjson': (ndjson_lines, 'application/x-ndjson; charset=utf-8'),
+}
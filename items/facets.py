@@ -0,0 +1,86 @@
+"""
+Facet counts for a filtered item queryset: matches per category, location,
+availability and price bucket, for a search sidebar.
+
+All of them come from one query. The filtered rows (filterset fields and
+`?search=` already applied) are read once into a materialized CTE of the
+four facet columns, and each facet is a GROUP BY over that CTE, glued
+together with UNION ALL; availability and price share one GROUP BY, whose
+counts also add up to the total the paginator would otherwise run a COUNT
+for. Without filters the category and location counts are the ones
+InventorySummary keeps, and only availability and price read the table.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connections
+
+from . import summaries
+from .models import Category, Location
+
+CATEGORY_TABLE = Category._meta.db_table
+LOCATION_TABLE = Location._meta.db_table
+
+
+def price_buckets():
+    """Ascending bucket boundaries; prices fall in [bound, next bound)."""
+    return [Decimal(str(bound)) for bound in getattr(settings, 'ITEMS_FACET_PRICE_BUCKETS', [10, 50, 100, 500])]
+
+
+def bucket_sql(bounds):
+    cases = ' '.join(f'WHEN price < %s THEN {n}' for n in range(len(bounds)))
+    return f'CASE WHEN price IS NULL THEN NULL {cases} ELSE {len(bounds)} END'
+
+
+def counts(queryset):
+    """
+    Facets of `queryset` as a dict: the total, lists of {'id', 'name',
+    'count'} per category and location (largest first), counts per
+    availability, and every price bucket as {'min', 'max', 'count'} with
+    unpriced items last under min and max None.
+    """
+    bounds = price_buckets()
+    connection = connections[queryset.db]
+    columns = queryset.order_by().values('category_id', 'location_id', 'is_available', 'price')
+    sql, params = columns.query.get_compiler(queryset.db).as_sql()
+    # Availability and price bucket together, summed up per facet below
+    split = f"SELECT 'split', is_available, {bucket_sql(bounds)}, COUNT(*) FROM hits GROUP BY 2, 3"
+    if queryset.query.where:
+        # SQLite would otherwise rerun the filter for every facet
+        materialized = 'MATERIALIZED' if connection.vendor == 'sqlite' else ''
+        query = f"""
+            WITH hits AS {materialized} ({sql})
+            SELECT 'category', hits.category_id, {CATEGORY_TABLE}.name, COUNT(*)
+            FROM hits JOIN {CATEGORY_TABLE} ON {CATEGORY_TABLE}.id = hits.category_id GROUP BY hits.category_id
+            UNION ALL
+            SELECT 'location', hits.location_id, {LOCATION_TABLE}.name, COUNT(*)
+            FROM hits JOIN {LOCATION_TABLE} ON {LOCATION_TABLE}.id = hits.location_id GROUP BY hits.location_id
+            UNION ALL
+            {split}
+        """
+        rows = []
+    else:
+        # Over the whole inventory InventorySummary has the category and location counts
+        query = f"WITH hits AS ({sql}) {split}"
+        rows = [
+            (field, row[field], row[f'{field}__name'], row['count'])
+            for field in ('category', 'location') for row in summaries.grouped(field)
+        ]
+    with connection.cursor() as cursor:
+        cursor.execute(query, [*params, *bounds])
+        rows.extend(cursor.fetchall())
+
+    edges = [Decimal(0), *bounds, None]
+    price = [{'min': str(edges[n]), 'max': edges[n + 1] and str(edges[n + 1]), 'count': 0} for n in range(len(bounds) + 1)]
+    unpriced = {'min': None, 'max': None, 'count': 0}
+    result = {'count': 0, 'category': [], 'location': [], 'is_available': {'true': 0, 'false': 0}, 'price': price + [unpriced]}
+    for facet, key, name, count in rows:
+        if facet == 'split':
+            result['count'] += count
+            result['is_available']['true' if key else 'false'] += count
+            (unpriced if name is None else price[name])['count'] += count
+        else:
+            result[facet].append({'id': key, 'name': name, 'count': count})
+    for facet in ('category', 'location'):
+        result[facet].sort(key=lambda row: (-row['count'], row['name'], row['id']))
+    return result
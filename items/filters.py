@@ -0,0 +1,50 @@
+import django_filters
+from django.db import connections
+from rest_framework.filters import SearchFilter
+
+from . import search
+from .models import Item, Location
+
+
+class FullTextSearchFilter(SearchFilter):
+    """
+    Drop-in replacement for SearchFilter backed by the FTS5 index in items.search.
+
+    Keeps the `?search=` parameter, matches every word as a prefix and orders
+    results by relevance unless the client asks for an explicit `?ordering=`.
+    Falls back to SearchFilter's `icontains` lookups on other databases.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search_terms = self.get_search_terms(request)
+        if not search_terms or not search.is_supported(connections[queryset.db]):
+            return super().filter_queryset(request, queryset, view)
+
+        match = search.build_match_query(search_terms)
+        if not match:
+            return super().filter_queryset(request, queryset, view)
+
+        # Join the FTS table so MATCH drives the query and bm25() is computed
+        # once per hit; Django has no public API for joining a virtual table.
+        return queryset.extra(
+            tables=[search.FTS_TABLE],
+            where=[search.JOIN_SQL, search.MATCH_SQL],
+            params=[match],
+            select={'search_rank': search.RANK_SQL},
+        ).order_by('search_rank', '-date_added')
+
+
+class ItemFilterSet(django_filters.FilterSet):
+    """
+    The item list filters: the model fields plus `?location__subtree=<id>`,
+    every item in that location or any location nested under it.
+    """
+    location__subtree = django_filters.NumberFilter(method='filter_location_subtree')
+
+    class Meta:
+        model = Item
+        fields = ['category', 'location', 'is_available']
+
+    def filter_location_subtree(self, queryset, name, value):
+        # A subquery, so the path range scan and the items lookup are one query
+        return queryset.filter(location__in=Location.objects.subtree(value).values('pk'))
@@ -0,0 +1,136 @@
+"""
+Resized WebP renditions of Item.image.
+
+Renditions sit under a `renditions/` folder next to their source and are
+named after it, so their URLs follow from Item.image alone:
+item_images/mentos-gum.jpg -> item_images/renditions/mentos-gum.thumbnail.webp
+"""
+import logging
+import os
+import posixpath
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connections
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+RENDITION_SIZES = getattr(settings, 'ITEMS_IMAGE_RENDITION_SIZES', {'thumbnail': 200, 'medium': 800})
+RENDITION_QUALITY = getattr(settings, 'ITEMS_IMAGE_RENDITION_QUALITY', 80)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def rendition_name(name, rendition):
+    directory, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(directory, 'renditions', f'{stem}.{rendition}.webp')
+
+
+def rendition_targets(name):
+    """(path, max size) for every rendition of the stored image `name`."""
+    return [
+        (default_storage.path(rendition_name(name, rendition)), size)
+        for rendition, size in RENDITION_SIZES.items()
+    ]
+
+
+def render(source_path, targets, quality=RENDITION_QUALITY):
+    """
+    Write WebP renditions of the image at `source_path`.
+
+    Plain paths in, no Django involved, so management commands can run this
+    in worker processes. The source is decoded once at reduced size and
+    renditions are produced largest first, each from the previous one.
+    """
+    targets = sorted(targets, key=lambda target: target[1], reverse=True)
+    with Image.open(source_path) as image:
+        # Let the JPEG decoder downscale while decoding instead of after
+        image.draft('RGB', (targets[0][1], targets[0][1]))
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+        for path, size in targets:
+            image.thumbnail((size, size), Image.LANCZOS, reducing_gap=3.0)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary file first so readers never see a partial image
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as tmp:
+                    image.save(tmp, 'WEBP', quality=quality, method=4)
+                # mkstemp creates 0600 files, match FileSystemStorage's default instead
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+
+
+def needs_renditions(name):
+    try:
+        source_mtime = os.path.getmtime(default_storage.path(name))
+    except FileNotFoundError:
+        return False
+    for path, _ in rendition_targets(name):
+        if not os.path.exists(path) or os.path.getmtime(path) < source_mtime:
+            return True
+    return False
+
+
+def generate(name):
+    try:
+        render(default_storage.path(name), rendition_targets(name))
+    except Exception:
+        logger.exception("Could not render image renditions for %s", name)
+        return
+    # Rendition URLs appear in item responses, so cached ones are now stale
+    from .models import Item
+    from . import versions
+    versions.bump(Item)
+
+
+def generate_in_worker(name):
+    try:
+        generate(name)
+    finally:
+        # Worker threads get their own database connections; don't leak them
+        connections.close_all()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'ITEMS_IMAGE_WORKERS', 2),
+                thread_name_prefix='item-images',
+            )
+        return _executor
+
+
+def schedule(name):
+    """Render the renditions of `name` off the request thread (inline when ITEMS_IMAGE_WORKERS is 0)."""
+    if getattr(settings, 'ITEMS_IMAGE_WORKERS', 2) == 0:
+        generate(name)
+    else:
+        get_executor().submit(generate_in_worker, name)
+
+
+def delete_renditions(name):
+    for rendition in RENDITION_SIZES:
+        default_storage.delete(rendition_name(name, rendition))
+
+
+def rendition_url(name, rendition):
+    """Relative URL of a rendition of the stored image `name`, None until it has been rendered."""
+    if not name:
+        return None
+    path = rendition_name(name, rendition)
+    if not default_storage.exists(path):
+        return None
+    return default_storage.url(path)
@@ -0,0 +1,191 @@
+"""
+Per-request performance instrumentation.
+
+RequestTimingMiddleware starts a RequestTimings record for every request and
+makes it current for the request's context (a contextvar, so it follows the
+request into sync_to_async threads). While one is current:
+
+- every SQL query on any alias is counted and timed by `record_query`, an
+  execute wrapper installed on each new connection (items/receivers.py);
+- `timed(name)` blocks add to named phases; the viewsets time `auth`,
+  `filter`, `serialize`, `save` (model saves, including image uploads) and
+  `render`.
+
+The result, with the response size, is sent as a Server-Timing header when
+ITEMS_SERVER_TIMING is on (by default only under DEBUG, as it shows query
+counts to every client) and, for requests slower than ITEMS_SLOW_REQUEST_MS,
+logged to `items.instrumentation` with the figures in the record's
+`request_timings` attribute. Phases can
+nest (sql inside serialize), so they need not add up to `total`. Outside a
+request the hooks cost a single contextvar lookup.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('items_request_timings', default=None)
+
+
+class RequestTimings:
+    __slots__ = ('start', 'phases', 'queries')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases = {}
+        self.queries = 0
+
+    def add(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def as_dict(self, total, response_size):
+        return {
+            'total_ms': round(total * 1000, 3),
+            'queries': self.queries,
+            **{f'{name}_ms': round(seconds * 1000, 3) for name, seconds in self.phases.items()},
+            'response_bytes': response_size,
+        }
+
+
+def current():
+    return _current.get()
+
+
+@contextmanager
+def timed(name):
+    """Add the time spent in the block to phase `name` of the current request, if any."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+def record_query(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.queries += 1
+        timings.add('sql', time.perf_counter() - start)
+
+
+def install(connection):
+    # connection_created fires again when a persistent connection reconnects
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+def server_timing(timings, total, size=None):
+    entries = [f'total;dur={total * 1000:.1f}']
+    for name, seconds in timings.phases.items():
+        entry = f'{name};dur={seconds * 1000:.1f}'
+        if name == 'sql':
+            entry += f';desc="{timings.queries} queries"'
+        entries.append(entry)
+    if size is not None:
+        entries.append(f'size;desc="{size} bytes"')
+    return ', '.join(entries)
+
+
+def response_size(response):
+    if response.streaming:
+        return None
+    return len(response.content)
+
+
+class InstrumentedViewMixin:
+    """Times authentication, filtering, model saves and response rendering of a DRF view."""
+
+    def perform_authentication(self, request):
+        with timed('auth'):
+            super().perform_authentication(request)
+
+    def filter_queryset(self, queryset):
+        with timed('filter'):
+            return super().filter_queryset(queryset)
+
+    def perform_create(self, serializer):
+        with timed('save'):
+            super().perform_create(serializer)
+
+    def perform_update(self, serializer):
+        with timed('save'):
+            super().perform_update(serializer)
+
+    def perform_destroy(self, instance):
+        with timed('save'):
+            super().perform_destroy(instance)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        timings = _current.get()
+        if timings is not None and not getattr(response, 'is_rendered', True):
+            # Django renders the response right after the view returns it; plain
+            # HttpResponses (the streaming export) have nothing left to render
+            start = time.perf_counter()
+            response.add_post_render_callback(lambda response: timings.add('render', time.perf_counter() - start))
+        return response
+
+
+class RequestTimingMiddleware:
+    """
+    Collect RequestTimings for each request; place it first in MIDDLEWARE so
+    `total` covers the other middleware too.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timings)
+
+    def finish(self, request, response, timings):
+        total = time.perf_counter() - timings.start
+        if getattr(settings, 'ITEMS_SERVER_TIMING', False):
+            response['Server-Timing'] = server_timing(timings, total, response_size(response))
+        slow_ms = getattr(settings, 'ITEMS_SLOW_REQUEST_MS', 1000)
+        if slow_ms is not None and total * 1000 >= slow_ms:
+            figures = timings.as_dict(total, response_size(response))
+            logger.warning(
+                "Slow request %s %s %s: %s", request.method, request.get_full_path(), response.status_code,
+                ' '.join(f'{key}={value}' for key, value in figures.items()),
+                extra={'request_timings': {
+                    'method': request.method, 'path': request.path, 'status': response.status_code, **figures,
+                }},
+            )
+        return response
@@ -0,0 +1,54 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from items import storage
+from items.models import Item, StoredImage
+
+
+class Command(BaseCommand):
+    help = "Delete item image files (and their renditions) that no item references."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help="Directories scanned in parallel.")
+        parser.add_argument('--grace-minutes', type=int, default=60,
+                            help="Keep files modified this recently; their item may not be saved yet.")
+        parser.add_argument('--dry-run', action='store_true')
+        parser.add_argument('--recount', action='store_true', help="Rebuild the reference counts from the items first.")
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            storage.rebuild()
+        # Files whose count dropped to zero but were never collected
+        released = list(StoredImage.objects.filter(references__lte=0).values_list('name', flat=True))
+        if released and not options['dry_run']:
+            storage.collect(released)
+
+        referenced = set(StoredImage.objects.filter(references__gt=0).values_list('name', flat=True))
+        referenced.update(Item.objects.exclude(image='').exclude(image__isnull=True).values_list('image', flat=True))
+        root = os.path.join(settings.MEDIA_ROOT, 'item_images')
+        if not os.path.isdir(root):
+            self.stdout.write(self.style.SUCCESS("No image files."))
+            return
+        with os.scandir(root) as entries:
+            directories = [entry.path for entry in entries if entry.is_dir() and entry.name != 'renditions']
+        older_than = time.time() - options['grace_minutes'] * 60
+
+        def sweep(directory, recursive=True):
+            orphans = storage.unreferenced_files(directory, referenced, older_than, recursive)
+            if not options['dry_run']:
+                for name in orphans:
+                    storage.delete_file(name)
+            return orphans
+
+        # Files directly in item_images/ are the slug names item_image_path gives
+        orphans = sweep(root, recursive=False)
+        with ThreadPoolExecutor(max_workers=max(options['workers'], 1)) as executor:
+            for found in executor.map(sweep, directories):
+                orphans.extend(found)
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Would delete' if options['dry_run'] else 'Deleted'} {len(orphans)} unreferenced files."
+        ))
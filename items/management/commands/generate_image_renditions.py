@@ -0,0 +1,44 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from items import images, versions
+from items.models import Item
+
+
+class Command(BaseCommand):
+    help = "Generate thumbnail and medium renditions for existing item images, in parallel across CPU cores."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Worker processes (default: CPU count).")
+        parser.add_argument('--force', action='store_true', help="Regenerate renditions that are already up to date.")
+
+    def handle(self, *args, **options):
+        names = Item.objects.exclude(image='').exclude(image__isnull=True).values_list('image', flat=True).distinct()
+        jobs = []
+        for name in names:
+            if not default_storage.exists(name):
+                self.stderr.write(f"Missing source image: {name}")
+            elif options['force'] or images.needs_renditions(name):
+                jobs.append(name)
+
+        done = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            futures = {
+                pool.submit(images.render, default_storage.path(name), images.rendition_targets(name)): name
+                for name in jobs
+            }
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                    done += 1
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f"{futures[future]}: {exc}")
+        if done:
+            # Rendition URLs appear in item responses, as in images.generate
+            versions.bump(Item)
+
+        self.stdout.write(self.style.SUCCESS(f"Rendered {done} image(s), {failed} failed, {len(names) - len(jobs)} skipped."))
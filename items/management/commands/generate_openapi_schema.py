@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from items import schema
+
+
+class Command(BaseCommand):
+    help = "Write the OpenAPI schema to ITEMS_OPENAPI_SCHEMA_FILE (or --output) for /openapi.json to serve."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help="Defaults to ITEMS_OPENAPI_SCHEMA_FILE.")
+
+    def handle(self, *args, **options):
+        path = options['output'] or getattr(settings, 'ITEMS_OPENAPI_SCHEMA_FILE', None)
+        if not path:
+            raise CommandError("Set ITEMS_OPENAPI_SCHEMA_FILE or pass --output.")
+        content = schema.generate()
+        with open(path, 'wb') as f:
+            f.write(content)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(content)} bytes to {path}."))
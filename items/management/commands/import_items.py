@@ -0,0 +1,197 @@
+import csv
+import json
+import os
+import sys
+import time
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from items import similarity
+from items.models import Category, Item, Location
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'f'}
+
+
+class RowError(ValueError):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream items from a CSV or NDJSON file into the database. "
+        "Category and location are given by name and created when missing. "
+        "Rows are committed in batches; with --resume an interrupted import "
+        "continues after the last committed batch."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Input file, or - for stdin.")
+        parser.add_argument('--format', choices=['csv', 'ndjson'], help="Input format (default: from the file extension).")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--resume', action='store_true', help="Skip the rows committed by a previous, interrupted run.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        input_format = options['format'] or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+        if path == '-' and options['resume']:
+            raise CommandError("--resume needs a file path, not stdin.")
+        checkpoint_path = None if path == '-' else f'{path}.checkpoint'
+
+        skip = self.read_checkpoint(checkpoint_path) if options['resume'] else 0
+        if skip:
+            self.stdout.write(f"Resuming after row {skip}.")
+
+        self.categories = self.load_names(Category)
+        self.locations = self.load_names(Location)
+        self.stats = {'created': 0, 'duplicates': 0, 'invalid': 0}
+        consumed = skip
+        started = time.perf_counter()
+
+        with self.open_input(path) as stream:
+            rows = islice(self.read_rows(stream, input_format), skip, None)
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                with transaction.atomic():
+                    self.import_batch(batch, first_row=consumed + 1)
+                consumed += len(batch)
+                if checkpoint_path:
+                    self.write_checkpoint(checkpoint_path, consumed)
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f"{consumed} rows read, {self.stats['created']} items created, {(consumed - skip) / elapsed:.0f} rows/s")
+
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {self.stats['created']} items in {elapsed:.1f}s "
+            f"({self.stats['duplicates']} duplicates and {self.stats['invalid']} invalid rows skipped)."
+        ))
+
+    def open_input(self, path):
+        if path == '-':
+            return open(sys.stdin.fileno(), encoding='utf-8', newline='', closefd=False)
+        try:
+            return open(path, encoding='utf-8', newline='')
+        except OSError as exc:
+            raise CommandError(str(exc))
+
+    def read_rows(self, stream, input_format):
+        if input_format == 'csv':
+            yield from csv.DictReader(stream)
+            return
+        for line in stream:
+            line = line.strip()
+            if line:
+                try:
+                    yield json.loads(line)
+                except ValueError as exc:
+                    yield RowError(f"invalid JSON: {exc}")
+
+    def load_names(self, model):
+        # Names are not unique; the oldest row wins, as it would for a lookup by name
+        names = {}
+        for pk, name in model.objects.order_by('-id').values_list('id', 'name'):
+            names[name] = pk
+        return names
+
+    def resolve(self, model, names, wanted):
+        missing = [name for name in dict.fromkeys(wanted) if name not in names]
+        if missing:
+            for obj in model.objects.bulk_create([model(name=name) for name in missing]):
+                names[obj.name] = obj.pk
+
+    def import_batch(self, batch, first_row):
+        parsed = []
+        for number, row in enumerate(batch, start=first_row):
+            try:
+                if isinstance(row, RowError):
+                    raise row
+                parsed.append(self.parse_row(row))
+            except RowError as exc:
+                self.stats['invalid'] += 1
+                self.stderr.write(f"Row {number}: {exc}")
+
+        # Duplicates as the API sees them, ignoring case, accents and spacing
+        existing = set(similarity.exact_matches(row['name'] for row in parsed))
+        fresh = []
+        for row in parsed:
+            name = similarity.duplicate_key(row['name'])
+            if name in existing:
+                self.stats['duplicates'] += 1
+                continue
+            existing.add(name)
+            fresh.append(row)
+
+        self.resolve(Category, self.categories, [row['category'] for row in fresh])
+        self.resolve(Location, self.locations, [row['location'] for row in fresh])
+        Item.objects.bulk_create([
+            Item(
+                name=row['name'], description=row['description'], quantity=row['quantity'],
+                price=row['price'], is_available=row['is_available'], barcode=row['barcode'],
+                category_id=self.categories[row['category']], location_id=self.locations[row['location']],
+            )
+            for row in fresh
+        ])
+        self.stats['created'] += len(fresh)
+
+    def parse_row(self, row):
+        if not isinstance(row, dict):
+            raise RowError("expected an object")
+        values = {key: ('' if value is None else str(value).strip()) for key, value in row.items() if key}
+        for field in ('name', 'category', 'location'):
+            if not values.get(field):
+                raise RowError(f"missing {field}")
+        if len(values['name']) > 100:
+            raise RowError("name is longer than 100 characters")
+        try:
+            quantity = int(values.get('quantity') or 1)
+        except ValueError:
+            raise RowError(f"invalid quantity {values['quantity']!r}")
+        price = None
+        if values.get('price'):
+            try:
+                price = Decimal(values['price'])
+            except InvalidOperation:
+                raise RowError(f"invalid price {values['price']!r}")
+            if not price.is_finite() or abs(price) >= 10 ** 8:
+                raise RowError(f"invalid price {values['price']!r}")
+            price = price.quantize(Decimal('0.01'))
+        if quantity < 0 or (price is not None and price < 0):
+            raise RowError("quantity and price cannot be negative")
+        available = values.get('is_available', '').lower()
+        if available and available not in TRUE_VALUES | FALSE_VALUES:
+            raise RowError(f"invalid is_available {values['is_available']!r}")
+        return {
+            'name': values['name'],
+            'description': values.get('description', ''),
+            'quantity': quantity,
+            'price': price,
+            'category': values['category'],
+            'location': values['location'],
+            'is_available': available not in FALSE_VALUES,
+            'barcode': values.get('barcode') or None,
+        }
+
+    def read_checkpoint(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)['rows']
+        except FileNotFoundError:
+            return 0
+        except (ValueError, KeyError) as exc:
+            raise CommandError(f"Unreadable checkpoint {path}: {exc}")
+
+    def write_checkpoint(self, path, rows):
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'rows': rows}, f)
+        os.replace(tmp_path, path)
@@ -0,0 +1,17 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from items import sync
+
+
+class Command(BaseCommand):
+    help = "Delete sync tombstones older than --days; clients with older checkpoints must sync again from 0."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90)
+
+    def handle(self, *args, **options):
+        count = sync.prune_tombstones(timezone.now() - timedelta(days=options['days']))
+        self.stdout.write(self.style.SUCCESS(f"Pruned {count} tombstones."))
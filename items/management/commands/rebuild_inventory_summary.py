@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from items import summaries
+from items.models import InventorySummary
+
+
+class Command(BaseCommand):
+    help = "Recompute the per category/location inventory totals from the items table."
+
+    def handle(self, *args, **options):
+        summaries.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {InventorySummary.objects.count()} summary rows."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from items import similarity
+
+
+class Command(BaseCommand):
+    help = "Rebuild the near-duplicate name index for items from the items table."
+
+    def handle(self, *args, **options):
+        similarity.rebuild()
+        self.stdout.write(self.style.SUCCESS("Name index rebuilt."))
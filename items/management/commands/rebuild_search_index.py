@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from items import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index for items from the items table."
+
+    def handle(self, *args, **options):
+        if not search.is_supported(connection):
+            raise CommandError("Full-text search index requires SQLite.")
+        search.install_search_index(connection)
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt."))
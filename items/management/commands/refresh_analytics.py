@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from items import analytics
+
+
+class Command(BaseCommand):
+    help = "Recompute the whole-inventory analytics snapshots, for every grouping and period."
+
+    def handle(self, *args, **options):
+        for group_by in (None, *analytics.GROUPS):
+            for period in analytics.PERIODS:
+                analytics.refresh(group_by, period)
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {(len(analytics.GROUPS) + 1) * len(analytics.PERIODS)} snapshots."))
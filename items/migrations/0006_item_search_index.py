@@ -0,0 +1,24 @@
+from django.db import migrations
+
+from items import search
+
+
+def install(apps, schema_editor):
+    if search.is_supported(schema_editor.connection):
+        search.install_search_index(schema_editor.connection)
+
+
+def uninstall(apps, schema_editor):
+    if search.is_supported(schema_editor.connection):
+        search.drop_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0005_alter_item_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.13 on 2026-10-18 13:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0006_item_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['date_added', 'id'], name='item_date_added_id_idx'),
+        ),
+    ]
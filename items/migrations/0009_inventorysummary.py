@@ -0,0 +1,50 @@
+# Generated by Django 4.2.13 on 2026-10-18 13:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+from collections import defaultdict
+
+
+def populate(apps, schema_editor):
+    Item = apps.get_model('items', 'Item')
+    InventorySummary = apps.get_model('items', 'InventorySummary')
+    totals = defaultdict(lambda: [0, 0, 0])
+    rows = Item.objects.order_by().values_list('category_id', 'location_id', 'quantity', 'price').iterator()
+    for category_id, location_id, quantity, price in rows:
+        total = totals[category_id, location_id]
+        total[0] += 1
+        total[1] += quantity
+        total[2] += 0 if price is None else int(quantity * price * 100)
+    InventorySummary.objects.bulk_create(
+        InventorySummary(
+            category_id=category_id, location_id=location_id,
+            item_count=count, total_quantity=quantity, total_value_cents=cents,
+        )
+        for (category_id, location_id), (count, quantity, cents) in totals.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0008_item_barcode_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventorySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_count', models.IntegerField(default=0)),
+                ('total_quantity', models.BigIntegerField(default=0)),
+                ('total_value_cents', models.BigIntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='items.category')),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='items.location')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='inventorysummary',
+            constraint=models.UniqueConstraint(fields=('category', 'location'), name='inventory_summary_category_location'),
+        ),
+        migrations.RunPython(populate, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.2.13 on 2026-10-18 14:10
+
+from django.db import migrations, models
+from django.db.models import F, Max
+
+from items import search
+
+
+def number_existing_rows(apps, schema_editor):
+    # Distinct revisions for the current rows, in one UPDATE per table
+    ModelVersion = apps.get_model('items', 'ModelVersion')
+    offset = 0
+    for name in ('Category', 'Location', 'Item'):
+        model = apps.get_model('items', name)
+        model.objects.update(revision=F('id') + offset)
+        offset += model.objects.aggregate(last=Max('id'))['last'] or 0
+    ModelVersion.objects.update_or_create(model='items.sync', defaults={'version': offset})
+
+
+def reinstall_search_index(apps, schema_editor):
+    # Adding the column rebuilt items_item and dropped the FTS triggers
+    if search.is_supported(schema_editor.connection):
+        search.install_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0010_modelversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100)),
+                ('object_id', models.BigIntegerField()),
+                ('revision', models.BigIntegerField(unique=True)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='revision',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='revision',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='revision',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(number_existing_rows, migrations.RunPython.noop),
+        migrations.RunPython(reinstall_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.13 on 2026-10-18 14:18
+
+from django.db import migrations, models
+from django.db.models import Count
+import items.models
+import items.storage
+
+
+def count_references(apps, schema_editor):
+    Item = apps.get_model('items', 'Item')
+    StoredImage = apps.get_model('items', 'StoredImage')
+    StoredImage.objects.bulk_create(
+        StoredImage(name=row['image'], references=row['references'])
+        for row in Item.objects.exclude(image='').exclude(image__isnull=True)
+        .order_by().values('image').annotate(references=Count('id'))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0012_imageupload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredImage',
+            fields=[
+                ('name', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('references', models.IntegerField(default=0)),
+            ],
+        ),
+        # Storage is not a column; skip SQLite's table rebuild (and losing the FTS triggers)
+        migrations.SeparateDatabaseAndState(state_operations=[
+            migrations.AlterField(
+                model_name='item',
+                name='image',
+                field=models.ImageField(blank=True, null=True, storage=items.storage.ItemImageStorage(), upload_to=items.models.item_image_path),
+            ),
+        ]),
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+    ]
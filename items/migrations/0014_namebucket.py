@@ -0,0 +1,38 @@
+# Generated by Django 4.2.13 on 2026-10-18 14:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from items import similarity
+
+
+def index_existing_names(apps, schema_editor):
+    Item = apps.get_model('items', 'Item')
+    NameBucket = apps.get_model('items', 'NameBucket')
+    rows = Item.objects.order_by().values_list('id', 'name').iterator(chunk_size=2000)
+    NameBucket.objects.bulk_create(
+        (NameBucket(item_id=pk, bucket=bucket) for pk, name in rows for bucket in set(similarity.buckets(name))),
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0013_storedimage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NameBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.BigIntegerField()),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='name_buckets', to='items.item')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['bucket', 'item'], name='namebucket_bucket_item_idx')],
+            },
+        ),
+        migrations.RunPython(index_existing_names, migrations.RunPython.noop),
+    ]
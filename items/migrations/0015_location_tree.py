@@ -0,0 +1,36 @@
+# Generated by Django 4.2.13 on 2026-10-18 15:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models.functions import Cast, Concat
+
+
+def set_root_paths(apps, schema_editor):
+    # Every existing location is a root
+    Location = apps.get_model('items', 'Location')
+    Location.objects.update(path=Concat(Cast('id', models.CharField()), models.Value('/')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0014_namebucket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='location',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='children', to='items.location'),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='path',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='location',
+            index=models.Index(fields=['path'], name='location_path_idx'),
+        ),
+        migrations.RunPython(set_root_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.13 on 2026-10-18 16:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0015_location_tree'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['category', 'price', 'quantity', 'date_added'], name='item_category_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['location', 'price', 'quantity', 'date_added'], name='item_location_price_idx'),
+        ),
+    ]
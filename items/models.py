@@ -1,8 +1,16 @@
 # items/models.py
 import os
-from django.db import models
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connections, models, router, transaction
+from django.db.models.functions import Concat, Substr
 from django.utils.text import slugify
 
+from .signals import items_bulk_deleted, items_bulk_saved
+from .storage import ItemImageStorage
+
 # Define the path to upload the item images
 def item_image_path(instance, filename):
     # Get the file extension
@@ -13,27 +21,213 @@ def item_image_path(instance, filename):
     return f'item_images/{slug}.{ext}'
 
 
-class Category(models.Model):
+# ModelVersion counter that stamps every Item, Category and Location write, see items.sync
+SYNC_REVISION = 'items.sync'
+
+
+class SyncTrackedModel(models.Model):
+    """
+    A model whose rows carry the sync revision of their last write.
+
+    Every save takes the next value of the global SYNC_REVISION counter in
+    the same transaction as the row, so a row's revision only grows and a
+    client that has seen revision N has seen every earlier write. Deletes
+    are recorded as Tombstones by items.receivers. Writes that bypass save(),
+    such as queryset.update(), are not tracked.
+    """
+    revision = models.BigIntegerField(default=0, db_index=True, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            self.revision = ModelVersion.advance(SYNC_REVISION, using=using)
+            if kwargs.get('update_fields'):
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'revision'}
+            super().save(*args, **kwargs)
+
+
+class SyncTrackedQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        # As QuerySet.bulk_create does, so self.db is the write alias
+        self._for_write = True
+        with transaction.atomic(using=self.db, savepoint=False):
+            set_revisions(objs, self.db)
+            objs = super().bulk_create(objs, *args, **kwargs)
+            # post_save is not sent; receivers bump the model version on this instead
+            items_bulk_saved.send(sender=self.model, items=objs, created=True)
+        return objs
+
+
+class Category(SyncTrackedModel):
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True)
 
+    objects = SyncTrackedQuerySet.as_manager()
+
     class Meta:
         ordering = ['name']  # Add this line
 
     def __str__(self):
         return self.name
 
-class Location(models.Model):
+# Sorts after every character of a path (digits and '/'), so the paths under
+# 'P' are exactly those in ['P', 'P' + PATH_END)
+PATH_END = ':'
+
+
+class LocationQuerySet(SyncTrackedQuerySet):
+    def subtree(self, pk):
+        """The location `pk` and every location under it, as one range scan on the path index."""
+        path = Location.objects.filter(pk=pk).order_by().values('path')
+        end = path.values(end=Concat('path', models.Value(PATH_END)))
+        return self.filter(path__gte=models.Subquery(path), path__lt=models.Subquery(end))
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        self._for_write = True
+        with transaction.atomic(using=self.db, savepoint=False):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            # Parents are saved rows already, so one query has every parent path
+            parents = dict(self.filter(pk__in={obj.parent_id for obj in objs}).values_list('id', 'path'))
+            for obj in objs:
+                obj.path = f'{parents.get(obj.parent_id, "")}{obj.pk}/'
+            super().bulk_update(objs, ['path'])
+        return objs
+
+
+class Location(SyncTrackedModel):
+    """
+    A place items are kept, nested building > room > shelf > bin.
+
+    `path` is the materialized path of the location: the ids from its root
+    down to itself, each followed by '/', e.g. '3/17/42/'. Everything under
+    a location has its path as a prefix, so a subtree is one range scan on
+    the path index (LocationQuerySet.subtree). Saving a location under a new
+    parent rewrites the paths of its whole subtree in a single UPDATE.
+    Writes that bypass save() and bulk_create(), such as queryset.update(parent=...),
+    leave the paths stale.
+    """
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True)
+    parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='children')
+    path = models.CharField(max_length=255, editable=False, default='')
+
+    objects = LocationQuerySet.as_manager()
 
     class Meta:
         ordering = ['name']  # Add this line
+        indexes = [
+            models.Index(fields=['path'], name='location_path_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
-class Item(models.Model):
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            # From the database, in case the parent has moved since it was loaded
+            parent_path = ''
+            if self.parent_id is not None:
+                parent_path = Location.objects.using(using).values_list('path', flat=True).get(pk=self.parent_id)
+            old_path = self.path
+            if old_path and parent_path.startswith(old_path):
+                raise ValueError(f"Cannot move {self} under itself or one of its descendants.")
+            super().save(*args, **kwargs)
+            self.path = f'{parent_path}{self.pk}/'
+            if self.path != old_path:
+                Location.objects.using(using).filter(pk=self.pk).update(path=self.path)
+                if old_path:
+                    self.move_descendants(old_path, using)
+
+    def move_descendants(self, old_path, using):
+        descendants = Location.objects.using(using).filter(path__gt=old_path, path__lt=old_path + PATH_END)
+        low, high = descendants.aggregate(models.Min('id'), models.Max('id')).values()
+        if low is None:
+            return
+        # Descendants keep their parent but not their path, so sync clients must see
+        # them again. Offsetting ids gives each a revision of its own without loading
+        # the rows; the counter skips the ids outside the subtree.
+        last = ModelVersion.advance(SYNC_REVISION, high - low + 1, using=using)
+        descendants.update(
+            path=Concat(models.Value(self.path), Substr('path', len(old_path) + 1)),
+            revision=models.F('id') + (last - high),
+        )
+
+def set_revisions(objs, using):
+    # One counter update for the whole batch; each row still gets its own revision
+    if objs:
+        last = ModelVersion.advance(SYNC_REVISION, len(objs), using=using)
+        for revision, obj in enumerate(objs, last - len(objs) + 1):
+            obj.revision = revision
+
+class ItemQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        # As QuerySet.bulk_create does, so self.db is the write alias
+        self._for_write = True
+        with transaction.atomic(using=self.db, savepoint=False):
+            set_revisions(objs, self.db)
+            objs = super().bulk_create(objs, *args, **kwargs)
+            items_bulk_saved.send(sender=self.model, items=objs, created=True)
+        for obj in objs:
+            obj._loaded_values = obj.current_values()
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        self._for_write = True
+        with transaction.atomic(using=self.db, savepoint=False):
+            # Receivers compare against the stored values. Read them here, in the write
+            # transaction: what the instances remember from loading may be stale.
+            stored = {
+                values['id']: values
+                for values in self.filter(pk__in=[obj.pk for obj in objs])
+                .values(*(field.attname for field in self.model._meta.concrete_fields))
+            }
+            for obj in objs:
+                obj._loaded_values = stored.get(obj.pk, {})
+            set_revisions(objs, self.db)
+            rows = super().bulk_update(objs, [*fields, 'revision'], *args, **kwargs)
+            items_bulk_saved.send(sender=self.model, items=objs, created=False, update_fields=frozenset(fields))
+        for obj in objs:
+            obj._loaded_values = obj.current_values()
+        return rows
+
+    def delete(self):
+        """
+        Delete the items as one set, without a pre_delete and post_delete per
+        item: receivers get a single items_bulk_deleted instead. The rows
+        referencing the items go first, as the cascade would have them.
+        """
+        if self.query.is_sliced:
+            raise TypeError("Cannot use 'limit' or 'offset' with delete().")
+        self._for_write = True
+        deleted = Counter()
+        with transaction.atomic(using=self.db, savepoint=False):
+            # Read in the write transaction, so receivers see the rows as they are deleted
+            items = list(self.model._base_manager.using(self.db).filter(pk__in=self.order_by().values('pk')))
+            pks = [item.pk for item in items]
+            batch_size = connections[self.db].ops.bulk_batch_size(['pk'], pks)
+            for start in range(0, len(pks), batch_size):
+                batch = pks[start:start + batch_size]
+                # Image uploads have receivers of their own, so through their collector
+                deleted.update(ImageUpload.objects.using(self.db).filter(item__in=batch).delete()[1])
+                deleted[NameBucket._meta.label] += NameBucket.objects.using(self.db).filter(item__in=batch)._raw_delete(self.db)
+                deleted[self.model._meta.label] += self.model._base_manager.using(self.db).filter(pk__in=batch)._raw_delete(self.db)
+            if items:
+                items_bulk_deleted.send(sender=self.model, items=items, using=self.db)
+        deleted = {label: count for label, count in deleted.items() if count}
+        return sum(deleted.values()), deleted
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+class Item(SyncTrackedModel):
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True)
     quantity = models.IntegerField(default=1)
@@ -42,19 +236,163 @@ class Item(models.Model):
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
     location = models.ForeignKey(Location, on_delete=models.CASCADE)
     is_available = models.BooleanField(default=True)
-    image = models.ImageField(upload_to=item_image_path, null=True, blank=True)
+    image = models.ImageField(upload_to=item_image_path, storage=ItemImageStorage(), null=True, blank=True)
     barcode = models.CharField(max_length=100, blank=True, null=True)
 
+    objects = ItemQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Backs keyset pagination on (date_added, id), see items.pagination
+            models.Index(fields=['date_added', 'id'], name='item_date_added_id_idx'),
+            models.Index(fields=['barcode'], name='item_barcode_idx'),
+            # Cover the columns items.analytics reads, in per-group price order
+            models.Index(fields=['category', 'price', 'quantity', 'date_added'], name='item_category_price_idx'),
+            models.Index(fields=['location', 'price', 'quantity', 'date_added'], name='item_location_price_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored values so signal handlers can tell what changed
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def current_values(self):
+        return {field.attname: getattr(self, field.attname) for field in self._meta.concrete_fields}
+
     def __str__(self):
         return self.name
     
     def save(self, *args, **kwargs):
-        if self.image:
-            # If an image already exists, delete it
-            try:
-                this = Item.objects.get(id=self.id)
-                if this.image != self.image:
-                    this.image.delete(save=False)
-            except:
-                pass  # when new photo then we do nothing, normal case
-        super(Item, self).save(*args, **kwargs)
+        # Keep the item row and what post_save receivers write in one transaction;
+        # they also release the old image, see items.storage
+        with transaction.atomic(using=kwargs.get('using')):
+            super(Item, self).save(*args, **kwargs)
+        self._loaded_values = self.current_values()
+
+class InventorySummary(models.Model):
+    """
+    Running totals for the items in one (category, location) pair.
+
+    Kept current by the receivers in items.receivers; per-category and
+    per-location totals are sums over these rows. Rebuild with
+    `manage.py rebuild_inventory_summary` after writes that bypass the ORM.
+    """
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    location = models.ForeignKey(Location, on_delete=models.CASCADE)
+    item_count = models.IntegerField(default=0)
+    total_quantity = models.BigIntegerField(default=0)
+    # Sum of quantity * price, in cents so increments stay exact on SQLite
+    total_value_cents = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['category', 'location'], name='inventory_summary_category_location'),
+        ]
+
+    def __str__(self):
+        return f'{self.category} @ {self.location}'
+
+class ModelVersion(models.Model):
+    """
+    Change counter per model, bumped on every write by items.receivers.
+
+    Read endpoints derive their ETag and response cache key from these
+    counters, see items.versions.
+    """
+    model = models.CharField(max_length=100, primary_key=True)
+    version = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.model} v{self.version}'
+
+    @classmethod
+    def advance(cls, model, by=1, using=DEFAULT_DB_ALIAS):
+        """Add `by` to the counter named `model` and return its new value."""
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {cls._meta.db_table} SET version = version + %s WHERE model = %s RETURNING version',
+                [by, model],
+            )
+            row = cursor.fetchone()
+        if row is not None:
+            return row[0]
+        try:
+            with transaction.atomic(using=using):
+                cls.objects.using(using).create(model=model, version=by)
+        except IntegrityError:
+            return cls.advance(model, by, using)
+        return by
+
+class Tombstone(models.Model):
+    """
+    A deleted Item, Category or Location, kept so delta sync can report it.
+
+    `revision` comes from the same counter as the rows' revisions. Prune old
+    tombstones with `manage.py prune_tombstones`.
+    """
+    model = models.CharField(max_length=100)
+    object_id = models.BigIntegerField()
+    revision = models.BigIntegerField(unique=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.model} {self.object_id} deleted at r{self.revision}'
+
+    @classmethod
+    def record(cls, instance, using=DEFAULT_DB_ALIAS):
+        return cls.objects.using(using).create(
+            model=instance._meta.label_lower, object_id=instance.pk,
+            revision=ModelVersion.advance(SYNC_REVISION, using=using),
+        )
+
+    @classmethod
+    def record_many(cls, instances, using=DEFAULT_DB_ALIAS):
+        # One counter update and one bulk insert, as set_revisions does for saves
+        instances = list(instances)
+        if not instances:
+            return []
+        last = ModelVersion.advance(SYNC_REVISION, len(instances), using=using)
+        return cls.objects.using(using).bulk_create(
+            cls(model=instance._meta.label_lower, object_id=instance.pk, revision=revision)
+            for revision, instance in enumerate(instances, last - len(instances) + 1)
+        )
+
+class StoredImage(models.Model):
+    """
+    The number of items using an image file, kept by items.receivers.
+
+    Files whose count drops to zero are deleted, see items.storage. Recount
+    with `manage.py collect_images --recount` after writes that bypass the ORM.
+    """
+    name = models.CharField(max_length=255, primary_key=True)
+    references = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.name} x{self.references}'
+
+class NameBucket(models.Model):
+    """An LSH bucket an item's name falls in, see items.similarity."""
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='name_buckets')
+    bucket = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            # Covers the candidate lookup, which never reads the table itself
+            models.Index(fields=['bucket', 'item'], name='namebucket_bucket_item_idx'),
+        ]
+
+class ImageUpload(models.Model):
+    """An image being uploaded to an item in chunks, see items.uploads."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='image_uploads')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    # Bytes stored so far; the next chunk must start here
+    offset = models.BigIntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.filename} for {self.item_id} ({self.offset}/{self.size})'
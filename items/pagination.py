@@ -0,0 +1,183 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import InvalidPage, Paginator
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KnownCountPaginator(Paginator):
+    """A Paginator given the object count, for callers that have counted the rows already."""
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        # Shadows the cached_property, so no COUNT query is run
+        self.count = count
+
+
+class ItemCursorPagination(CursorPagination):
+    """
+    Keyset pagination for items, opted into with `?pagination=cursor`.
+
+    Pages are keyed on (ordering field, id) instead of OFFSET, and no COUNT
+    query is run, so fetching page 1000 costs the same as fetching page 1.
+    The ordering field comes from `?ordering=` (first field only) and
+    defaults to `-date_added`, which is backed by the (date_added, id) index.
+    Pages only move forward: each response carries a `next` link.
+    """
+    ordering = '-date_added'
+    opt_in_query_param = 'pagination'
+    opt_in_value = 'cursor'
+
+    @classmethod
+    def requested(cls, request):
+        return request is not None and request.query_params.get(cls.opt_in_query_param) == cls.opt_in_value
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request, view)
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request, view)
+        return self.set_page([row async for row in queryset])
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """The unevaluated query for the requested page, plus one row to detect a next page."""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        self.order_by = self.get_ordering(request, queryset, view)[0]
+        self.field_name = self.order_by.lstrip('-')
+        self.descending = self.order_by.startswith('-')
+        try:
+            self.field = queryset.model._meta.get_field(self.field_name)
+        except FieldDoesNotExist:
+            raise NotFound(self.invalid_cursor_message)
+
+        queryset = queryset.order_by(*self.get_keyset_ordering())
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            queryset = queryset.filter(self.get_keyset_filter(*cursor))
+
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results):
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        self.display_page_controls = self.has_next
+        return self.page
+
+    def get_keyset_ordering(self):
+        if not self.field.null:
+            return (self.order_by, '-id' if self.descending else 'id')
+        # Pin NULL placement so the keyset filter below is valid on every backend
+        if self.descending:
+            return (F(self.field_name).desc(nulls_last=True), '-id')
+        return (F(self.field_name).asc(nulls_first=True), 'id')
+
+    def get_keyset_filter(self, value, pk):
+        """
+        Rows strictly after (value, pk) in the keyset ordering.
+
+        The `<=`/`>=` guard on the ordering field lets the database seek into
+        the index instead of scanning from the start.
+        """
+        name = self.field_name
+        if self.descending:
+            if value is None:
+                return Q(**{f'{name}__isnull': True, 'id__lt': pk})
+            after = Q(**{f'{name}__lte': value}) & (Q(**{f'{name}__lt': value}) | Q(id__lt=pk))
+            if self.field.null:
+                after |= Q(**{f'{name}__isnull': True})
+            return after
+        if value is None:
+            return Q(**{f'{name}__isnull': True, 'id__gt': pk}) | Q(**{f'{name}__isnull': False})
+        return Q(**{f'{name}__gte': value}) & (Q(**{f'{name}__gt': value}) | Q(id__gt=pk))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            if cursor['o'] != self.order_by:
+                raise ValueError
+            value = None if cursor['v'] is None else self.field.to_python(cursor['v'])
+            return value, int(cursor['id'])
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, instance):
+        # Rows are model instances or values() dicts
+        if isinstance(instance, dict):
+            value, pk = instance[self.field_name], instance['id']
+        else:
+            value, pk = getattr(instance, self.field_name), instance.id
+        if value is not None:
+            value = value.isoformat() if hasattr(value, 'isoformat') else str(value)
+        cursor = {'o': self.order_by, 'v': value, 'id': pk}
+        encoded = urlsafe_b64encode(json.dumps(cursor, separators=(',', ':')).encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.page[-1])
+
+    def get_previous_link(self):
+        return None
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {
+                    'type': 'string',
+                    'nullable': True,
+                    'format': 'uri',
+                },
+                'results': schema,
+            },
+        }
+
+
+async def apaginate_queryset(paginator, queryset, request, view=None):
+    """
+    Async counterpart of `paginator.paginate_queryset()`, for the async read views.
+
+    Handles ItemCursorPagination and page-number pagination, running the
+    COUNT and the page query through the async ORM.
+    """
+    if isinstance(paginator, ItemCursorPagination):
+        return await paginator.apaginate_queryset(queryset, request, view)
+    if not isinstance(paginator, PageNumberPagination):
+        raise TypeError(f"{type(paginator).__name__} has no async pagination support")
+
+    page_size = paginator.get_page_size(request)
+    if not page_size:
+        return None
+    django_paginator = paginator.django_paginator_class(queryset, page_size)
+    # Paginator.count is a cached_property; filling it in skips the blocking COUNT
+    django_paginator.count = await queryset.acount()
+    page_number = paginator.get_page_number(request, django_paginator)
+    try:
+        paginator.page = django_paginator.page(page_number)
+    except InvalidPage as exc:
+        raise NotFound(paginator.invalid_page_message.format(page_number=page_number, message=str(exc)))
+    paginator.page.object_list = [row async for row in paginator.page.object_list]
+    if django_paginator.num_pages > 1 and paginator.template is not None:
+        paginator.display_page_controls = True
+    paginator.request = request
+    return list(paginator.page)
@@ -0,0 +1,201 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import authentication, barcodes, db, images, instrumentation, similarity, storage, summaries, uploads, versions
+from .models import Category, ImageUpload, Item, Location, Tombstone
+from .signals import items_bulk_deleted, items_bulk_saved
+
+
+@receiver(post_save, sender=Item)
+@receiver(post_delete, sender=Item)
+def invalidate_barcode_cache(sender, instance, **kwargs):
+    invalidate_barcodes([instance])
+
+
+@receiver(items_bulk_saved, sender=Item)
+@receiver(items_bulk_deleted, sender=Item)
+def invalidate_barcode_cache_bulk(sender, items, **kwargs):
+    invalidate_barcodes(items)
+
+
+def invalidate_barcodes(items):
+    # The codes, old and new, are taken now, before _loaded_values moves on
+    codes = barcodes.changed_codes(items)
+    barcodes.invalidate_codes(codes)
+    # A lookup before the commit may have read the old row and cached it since
+    transaction.on_commit(lambda: barcodes.invalidate_codes(codes))
+
+
+def image_name(value):
+    return getattr(value, 'name', value) or ''
+
+
+@receiver(post_save, sender=Item)
+def refresh_image_renditions(sender, instance, **kwargs):
+    new_name = instance.image.name or ''
+    # Also covers a replacement upload reusing the old file name; content
+    # addressed files that are already stored keep their renditions
+    if new_name and images.needs_renditions(new_name):
+        transaction.on_commit(lambda: images.schedule(new_name))
+
+
+@receiver(pre_save, sender=Item)
+@receiver(pre_delete, sender=Item)
+def remember_stored_image(sender, instance, **kwargs):
+    # From the row, inside the write transaction: releasing the name a stale
+    # instance remembers would drop a reference another write already dropped
+    instance._stored_image = None
+    if instance.pk is not None:
+        instance._stored_image = Item.objects.filter(pk=instance.pk).values_list('image', flat=True).first()
+
+
+@receiver(post_save, sender=Item)
+def update_image_references(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    old_name = '' if created else image_name(getattr(instance, '_stored_image', None))
+    new_name = instance.image.name or ''
+    if old_name != new_name:
+        storage.apply_changes(added=[new_name], removed=[old_name])
+
+
+@receiver(post_delete, sender=Item)
+def release_image_reference(sender, instance, **kwargs):
+    # Nothing to release when the row was gone already
+    storage.apply_changes(removed=[image_name(getattr(instance, '_stored_image', None))])
+
+
+@receiver(items_bulk_saved, sender=Item)
+def update_image_references_bulk(sender, items, created, update_fields=None, **kwargs):
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    added, removed = [], []
+    for item in items:
+        # bulk_update read _loaded_values from the rows in its transaction; an
+        # item without them was deleted since it was loaded and not updated
+        if not created and not item._loaded_values:
+            continue
+        old_name = '' if created else image_name(item._loaded_values.get('image'))
+        if old_name != (item.image.name or ''):
+            added.append(item.image.name)
+            removed.append(old_name)
+    storage.apply_changes(added=added, removed=removed)
+
+
+@receiver(items_bulk_deleted, sender=Item)
+def release_image_references_bulk(sender, items, **kwargs):
+    storage.apply_changes(removed=[item.image.name for item in items])
+
+
+@receiver(post_save, sender=Item)
+def index_item_name(sender, instance, created, **kwargs):
+    if created or getattr(instance, '_loaded_values', {}).get('name') != instance.name:
+        similarity.index([instance], created=created)
+
+
+@receiver(items_bulk_saved, sender=Item)
+def index_item_names_bulk(sender, items, created, **kwargs):
+    similarity.index(
+        (item for item in items if created or getattr(item, '_loaded_values', {}).get('name') != item.name),
+        created=created,
+    )
+
+
+@receiver(pre_save, sender=Item)
+@receiver(pre_delete, sender=Item)
+def remember_summary_values(sender, instance, **kwargs):
+    # Inside the write transaction, so no other write can change the row before ours
+    if instance.pk is not None:
+        instance._summary_values = summaries.stored_values([instance]).get(instance.pk)
+
+
+@receiver(post_save, sender=Item)
+def update_inventory_summary(sender, instance, created, update_fields=None, **kwargs):
+    old = None if created else getattr(instance, '_summary_values', None)
+    new = summaries.saved_values(instance, old, update_fields)
+    summaries.apply_changes(added=[new], removed=[old] if old else [])
+
+
+@receiver(post_delete, sender=Item)
+def remove_from_inventory_summary(sender, instance, **kwargs):
+    # None when the row was gone already, e.g. deleted through another instance
+    old = getattr(instance, '_summary_values', None)
+    if old:
+        summaries.apply_changes(removed=[old])
+
+
+@receiver(items_bulk_saved, sender=Item)
+def update_inventory_summary_bulk(sender, items, created, update_fields=None, **kwargs):
+    if created:
+        summaries.apply_changes(added=[summaries.tracked_values(item) for item in items])
+        return
+    # Rows deleted since the instances were loaded are not updated
+    stored = [(item, summaries.loaded_values(item)) for item in items if item._loaded_values]
+    summaries.apply_changes(
+        added=[summaries.saved_values(item, old, update_fields) for item, old in stored],
+        removed=[old for _, old in stored],
+    )
+
+
+@receiver(items_bulk_deleted, sender=Item)
+def remove_from_inventory_summary_bulk(sender, items, **kwargs):
+    # The items were read in the delete's transaction, so their values are the stored ones
+    summaries.apply_changes(removed=[summaries.tracked_values(item) for item in items])
+
+
+@receiver(post_save, sender=Item)
+@receiver(post_delete, sender=Item)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def bump_version(sender, **kwargs):
+    versions.bump(sender)
+
+
+@receiver(items_bulk_saved, sender=Item)
+@receiver(items_bulk_saved, sender=Category)
+@receiver(items_bulk_saved, sender=Location)
+@receiver(items_bulk_deleted, sender=Item)
+def bump_version_bulk(sender, **kwargs):
+    versions.bump(sender)
+
+
+@receiver(post_delete, sender=Item)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Location)
+def record_tombstone(sender, instance, using, **kwargs):
+    Tombstone.record(instance, using=using)
+
+
+@receiver(items_bulk_deleted, sender=Item)
+def record_tombstones_bulk(sender, items, using, **kwargs):
+    Tombstone.record_many(items, using=using)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_auth_user_cache(sender, instance, **kwargs):
+    authentication.invalidate([instance])
+    # A request that read the old row before the commit may have cached it since
+    transaction.on_commit(lambda: authentication.invalidate([instance]))
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    db.apply_sqlite_pragmas(connection)
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    instrumentation.install(connection)
+
+
+@receiver(post_delete, sender=ImageUpload)
+def discard_partial_upload(sender, instance, **kwargs):
+    # The path now, the instance loses its pk once the delete is done
+    path = uploads.temp_path(instance)
+    transaction.on_commit(lambda: uploads.discard(path))
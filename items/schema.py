@@ -0,0 +1,90 @@
+"""
+The OpenAPI schema, generated once and served as a static document.
+
+drf_yasg used to rebuild the whole schema for every /swagger/ and /redoc/
+request, and importing it (with ruamel.yaml and its renderers) at URLconf
+load slowed every worker's start. Here the schema is either read from
+ITEMS_OPENAPI_SCHEMA_FILE, written at build time by
+`manage.py generate_openapi_schema`, or generated on the first request and
+kept for the life of the process. It is served from /openapi.json with an
+ETag, so clients revalidate with a 304.
+
+drf_yasg is only imported when the schema is generated or a UI page is
+rendered. The UI pages load the document from /openapi.json (SPEC_URL in
+SWAGGER_SETTINGS/REDOC_SETTINGS) instead of generating it themselves.
+"""
+import hashlib
+import threading
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import quote_etag
+from django.utils.http import parse_etags
+
+TITLE = "Items API"
+VERSION = 'v1'
+DESCRIPTION = "API for managing items, categories, and locations"
+
+_lock = threading.Lock()
+_document = None
+_ui_views = {}
+
+
+def generate():
+    """Build the schema of every endpoint and encode it as JSON."""
+    from drf_yasg import openapi
+    from drf_yasg.codecs import OpenAPICodecJson
+    from drf_yasg.generators import OpenAPISchemaGenerator
+
+    generator = OpenAPISchemaGenerator(openapi.Info(title=TITLE, default_version=VERSION, description=DESCRIPTION))
+    return OpenAPICodecJson(validators=[]).encode(generator.get_schema(request=None, public=True))
+
+
+def load():
+    path = getattr(settings, 'ITEMS_OPENAPI_SCHEMA_FILE', None)
+    if path:
+        with open(path, 'rb') as f:
+            return f.read()
+    return generate()
+
+
+def document():
+    """The schema as (JSON bytes, ETag), loaded once per process."""
+    global _document
+    if _document is None:
+        with _lock:
+            if _document is None:
+                content = load()
+                _document = content, quote_etag(hashlib.sha256(content).hexdigest()[:32])
+    return _document
+
+
+def reset():
+    global _document
+    _document = None
+
+
+def schema_view(request):
+    content, etag = document()
+    headers = {'ETag': etag, 'Cache-Control': 'public, no-cache'}
+    if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+        return HttpResponseNotModified(headers=headers)
+    return HttpResponse(content, content_type='application/json', headers=headers)
+
+
+def ui_view(renderer):
+    """The drf_yasg `renderer` page, built on its first request."""
+    def view(request, *args, **kwargs):
+        if renderer not in _ui_views:
+            from drf_yasg import openapi
+            from drf_yasg.views import get_schema_view
+            from rest_framework import permissions
+
+            schema_view = get_schema_view(
+                openapi.Info(title=TITLE, default_version=VERSION, description=DESCRIPTION),
+                public=True,
+                permission_classes=[permissions.AllowAny],
+            )
+            _ui_views[renderer] = schema_view.with_ui(renderer, cache_timeout=0)
+        return _ui_views[renderer](request, *args, **kwargs)
+    return view
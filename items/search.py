@@ -0,0 +1,81 @@
+"""
+SQLite FTS5 index over Item.name and Item.description.
+
+The index is an external-content FTS5 table kept in sync with items_item by
+triggers, so every write path (Item.save, bulk_create/bulk_update, queryset
+deletes, the admin) updates it without any Python-side hooks.
+
+SQLite drops triggers together with their table, and Django's SQLite schema
+editor rebuilds items_item for some field alterations. Migrations that do so
+must call `install_search_index` again afterwards.
+"""
+import re
+
+FTS_TABLE = 'items_item_fts'
+
+CREATE_SQL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, description,
+        content='items_item', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON items_item BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON items_item BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, description ON items_item BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+]
+
+DROP_SQL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+REBUILD_SQL = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+
+JOIN_SQL = f"{FTS_TABLE}.rowid = items_item.id"
+MATCH_SQL = f"{FTS_TABLE} MATCH %s"
+# Column weights: a hit in the name counts ten times one in the description
+RANK_SQL = f"bm25({FTS_TABLE}, 10.0, 1.0)"
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def is_supported(connection):
+    return connection.vendor == 'sqlite'
+
+
+def install_search_index(connection):
+    with connection.cursor() as cursor:
+        for sql in CREATE_SQL:
+            cursor.execute(sql)
+        cursor.execute(REBUILD_SQL)
+
+
+def drop_search_index(connection):
+    with connection.cursor() as cursor:
+        for sql in DROP_SQL:
+            cursor.execute(sql)
+
+
+def rebuild_search_index(connection):
+    with connection.cursor() as cursor:
+        cursor.execute(REBUILD_SQL)
+
+
+def build_match_query(terms):
+    """
+    Turn search terms into an FTS5 query where every word must match as a prefix.
+
+    Words are quoted so FTS5 operators in user input are treated as text.
+    Returns an empty string when the terms contain no searchable words.
+    """
+    tokens = [token for term in terms for token in TOKEN_RE.findall(term)]
+    return ' AND '.join(f'"{token}"*' for token in tokens)
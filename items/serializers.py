@@ -1,6 +1,5 @@
 # from rest_framework import serializers
 # from .models import Item, Category, Location
-
 # class ItemSerializer(serializers.ModelSerializer):
 #     class Meta:
 #         model = Item
@@ -15,22 +14,235 @@
 #         if value and value < 0:
 #             raise serializers.ValidationError("Price cannot be negative.")
 #         return value
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from django.utils.functional import cached_property
 from rest_framework import serializers
-from .models import Item, Category, Location
+from .models import Item, Category, Location, ImageUpload
+from . import images, similarity
+
+TWO_PLACES = Decimal('0.01')
+
+class BatchPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Resolves primary keys from the objects preloaded by ItemListSerializer,
+    falling back to the usual per-row query outside of bulk writes.
+    """
+
+    def to_internal_value(self, data):
+        related_objects = getattr(self.root, 'related_objects', None)
+        if related_objects is not None and not isinstance(data, bool):
+            try:
+                obj = related_objects[self.field_name].get(int(data))
+            except (KeyError, TypeError, ValueError):
+                obj = None
+            if obj is not None:
+                return obj
+        return super().to_internal_value(data)
+
+class ItemListSerializer(serializers.ListSerializer):
+    """
+    Bulk create and partial update for items.
+
+    Rows are validated individually, then the duplicate-name check runs once
+    for the whole batch instead of once per row. Errors come back as a list
+    aligned with the submitted rows.
+    """
+
+    @cached_property
+    def instance_map(self):
+        # For updates, load every referenced item in a single query
+        ids = []
+        for row in self.initial_data:
+            try:
+                ids.append(int(row['id']))
+            except (KeyError, TypeError, ValueError):
+                pass
+        return self.instance.in_bulk(ids)
+
+    def row_instance(self, row):
+        try:
+            return self.instance_map.get(int(row['id']))
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def run_child_validation(self, data):
+        if self.instance is not None:
+            instance = self.row_instance(data) if isinstance(data, dict) else None
+            if instance is None:
+                raise serializers.ValidationError({'id': ["Item not found."]})
+            self.child.instance = instance
+            self.child.initial_data = data
+        return super().run_child_validation(data)
+
+    def preload_related(self, data):
+        # One query per related model for the whole batch instead of one per row
+        self.related_objects = {}
+        for field_name in ('category', 'location'):
+            ids = set()
+            for row in data:
+                try:
+                    ids.add(int(row[field_name]))
+                except (KeyError, TypeError, ValueError):
+                    pass
+            model = Item._meta.get_field(field_name).related_model
+            self.related_objects[field_name] = model.objects.in_bulk(ids)
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self.preload_related(data)
+        validated = super().to_internal_value(data)
+        instances = [self.row_instance(row) for row in data] if self.instance is not None else [None] * len(validated)
+        # Names are compared by similarity.duplicate_key, so case, accents and spacing do not make a new name
+        taken = similarity.exact_matches(attrs['name'] for attrs in validated if 'name' in attrs)
+        errors = []
+        seen = set()
+        for attrs, instance in zip(validated, instances):
+            if 'name' not in attrs:
+                errors.append({})
+                continue
+            name = similarity.duplicate_key(attrs['name'])
+            if name in seen or taken.get(name, getattr(instance, 'id', None)) != getattr(instance, 'id', None):
+                errors.append({'name': ["An item with this name already exists."]})
+            else:
+                errors.append({})
+            seen.add(name)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return validated
+
+    def create(self, validated_data):
+        return Item.objects.bulk_create([Item(**attrs) for attrs in validated_data])
+
+    def update(self, instance, validated_data):
+        items = []
+        fields = set()
+        for row, attrs in zip(self.initial_data, validated_data):
+            item = self.row_instance(row)
+            for attr, value in attrs.items():
+                setattr(item, attr, value)
+                fields.add(attr)
+            items.append(item)
+        if fields:
+            Item.objects.bulk_update(items, sorted(fields))
+        return items
 
 class ItemSerializer(serializers.ModelSerializer):
+    serializer_related_field = BatchPrimaryKeyRelatedField
+    image_thumbnail = serializers.SerializerMethodField()
+    image_medium = serializers.SerializerMethodField()
+
     class Meta:
         model = Item
-        fields = ['id', 'name', 'description', 'quantity', 'date_added', 'price', 'category', 'location', 'is_available', 'image', 'barcode']
+        fields = ['id', 'name', 'description', 'quantity', 'date_added', 'price', 'category', 'location', 'is_available', 'image', 'barcode', 'image_thumbnail', 'image_medium']
+        list_serializer_class = ItemListSerializer
+
+    def get_image_thumbnail(self, obj):
+        return self.absolute_url(images.rendition_url(obj.image.name, 'thumbnail'))
+
+    def get_image_medium(self, obj):
+        return self.absolute_url(images.rendition_url(obj.image.name, 'medium'))
+
+    def absolute_url(self, url):
+        request = self.context.get('request')
+        if url is None or request is None:
+            return url
+        return request.build_absolute_uri(url)
 
     def validate(self, data):
+        # Bulk writes check duplicate names once per batch in ItemListSerializer
+        if isinstance(self.parent, ItemListSerializer):
+            return data
         # If we're creating a new item or updating the name, check for duplicates
         if self.instance is None or 'name' in data:
             name = data.get('name', self.instance.name if self.instance else None)
-            if Item.objects.filter(name=name).exclude(id=getattr(self.instance, 'id', None)).exists():
+            # Indexed, and also catches names differing only in case, accents or spacing
+            found = similarity.exact_matches([name]).get(similarity.duplicate_key(name))
+            if found is not None and found != getattr(self.instance, 'id', None):
                 raise serializers.ValidationError("An item with this name already exists.")
         return data
 
+class ItemValuesSerializer:
+    """
+    Renders Item `values()` rows exactly as ItemSerializer renders instances.
+
+    Skips ModelSerializer's per-field machinery: each requested field maps to
+    the database columns it needs and a plain function over the row. Backs the
+    item read endpoints, where `fields` comes from `?fields=`, and the export.
+
+    Fields named in `expand` are inlined as the related object, rendered like
+    CategorySerializer/LocationSerializer, from columns joined into the same
+    query rather than one lookup per row.
+    """
+    default_fields = ItemSerializer.Meta.fields
+    expandable_fields = ['category', 'location']
+
+    def __init__(self, fields=None, request=None, expand=()):
+        fields = fields or self.default_fields
+        unknown = [name for name in fields if name not in self.default_fields]
+        if unknown:
+            raise serializers.ValidationError({'fields': [f"Unknown field(s): {', '.join(unknown)}."]})
+        unknown = [name for name in expand if name not in self.expandable_fields]
+        if unknown:
+            raise serializers.ValidationError({'expand': [f"Cannot expand: {', '.join(unknown)}."]})
+        self.base_url = request.build_absolute_uri('/')[:-1] if request is not None else ''
+        self.timezone = timezone.get_current_timezone()
+        self.fields = fields
+        self.encoders = [(name, *self.get_encoder(name)) for name in fields if name not in expand]
+        self.expanded = [(name, self.get_related_fields(name)) for name in fields if name in expand]
+
+    @property
+    def columns(self):
+        columns = {column for _, column, _ in self.encoders}
+        for name, related_fields in self.expanded:
+            columns.update(f'{name}__{field}' for field in related_fields)
+        return columns
+
+    def get_related_fields(self, name):
+        serializer_class = {'category': CategorySerializer, 'location': LocationSerializer}[name]
+        return serializer_class.Meta.fields
+
+    def get_encoder(self, name):
+        if name in ('category', 'location'):
+            return f'{name}_id', None
+        if name == 'date_added':
+            return name, self.encode_datetime
+        if name == 'price':
+            return name, self.encode_decimal
+        if name == 'image':
+            return name, self.encode_image
+        if name in ('image_thumbnail', 'image_medium'):
+            rendition = name.split('_', 1)[1]
+            return 'image', lambda value: self.encode_url(images.rendition_url(value, rendition))
+        return name, None
+
+    def encode_datetime(self, value):
+        value = value.astimezone(self.timezone).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+    def encode_decimal(self, value):
+        return None if value is None else '{:f}'.format(value.quantize(TWO_PLACES))
+
+    def encode_image(self, value):
+        return self.encode_url(default_storage.url(value)) if value else None
+
+    def encode_url(self, url):
+        return None if url is None else self.base_url + url
+
+    def to_representation(self, row):
+        data = {
+            name: row[column] if encode is None else encode(row[column])
+            for name, column, encode in self.encoders
+        }
+        if not self.expanded:
+            return data
+        for name, related_fields in self.expanded:
+            data[name] = {field: row[f'{name}__{field}'] for field in related_fields}
+        return {name: data[name] for name in self.fields}
+
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
@@ -39,4 +251,37 @@ class CategorySerializer(serializers.ModelSerializer):
 class LocationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Location
-        fields = ['id','name','description',]
+        fields = ['id','name','description','parent','path',]
+
+    def validate_parent(self, value):
+        if value is not None and self.instance is not None and value.path.startswith(self.instance.path):
+            raise serializers.ValidationError("A location cannot be moved under itself or one of its descendants.")
+        return value
+
+class ItemBulkDeleteSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+
+    def validate_ids(self, value):
+        existing = set(Item.objects.filter(id__in=value).values_list('id', flat=True))
+        errors = {index: ["Item not found."] for index, pk in enumerate(value) if pk not in existing}
+        if errors:
+            raise serializers.ValidationError(errors)
+        return value
+
+class BarcodeBatchSerializer(serializers.Serializer):
+    barcodes = serializers.ListField(child=serializers.CharField(max_length=100), allow_empty=False, max_length=1000)
+
+class ImageUploadSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ImageUpload
+        fields = ['id', 'filename', 'size', 'offset', 'created']
+        read_only_fields = ['id', 'offset', 'created']
+
+    def validate_size(self, value):
+        limit = getattr(settings, 'ITEMS_IMAGE_UPLOAD_MAX_SIZE', 50 * 1024 * 1024)
+        if not 0 < value <= limit:
+            raise serializers.ValidationError(f"Size must be between 1 and {limit} bytes.")
+        return value
+
+class ImageUploadCompleteSerializer(serializers.Serializer):
+    sha256 = serializers.RegexField(r'^[0-9a-fA-F]{64}$')
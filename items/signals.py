@@ -0,0 +1,13 @@
+from django.dispatch import Signal
+
+# Sent by ItemQuerySet.bulk_create and bulk_update, and by bulk_create of
+# Category and Location (SyncTrackedQuerySet), which bypass post_save.
+# Arguments: "items" - the created or updated instances,
+#            "created" - True for bulk_create, False for bulk_update,
+#            "update_fields" - the fields bulk_update wrote; not sent by bulk_create.
+items_bulk_saved = Signal()
+
+# Sent by ItemQuerySet.delete, which deletes without a post_delete per item.
+# Arguments: "items" - the deleted instances, read in the delete's transaction,
+#            "using" - the database alias.
+items_bulk_deleted = Signal()
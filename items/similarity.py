@@ -0,0 +1,160 @@
+"""
+Near-duplicate detection for item names.
+
+Names are compared by the Jaccard similarity of their character trigrams,
+taken per word as pg_trgm does, after normalization: accents stripped, case
+folded, punctuation dropped and whitespace collapsed. "Mentos Gum" and
+"mentos  gum!" normalize to the same name; "Mentos Gums" scores 0.77.
+
+Scoring a name against every item would read the whole table, so each name
+is also summarised by a MinHash signature of BANDS * ROWS values, split into
+BANDS bands (locality-sensitive hashing). Each band hashes to a bucket
+stored in NameBucket, and only items sharing a bucket with the query are
+scored. Two names with similarity s share a bucket with probability
+1 - (1 - s**ROWS)**BANDS: 0.95 at 0.6, 0.99 at 0.7, while unrelated names
+(s < 0.1) almost never do. One more bucket per item is the hash of the
+normalized name itself, so exact duplicates take a single index lookup.
+
+Buckets are written by receivers on Item saves and bulk saves and go with
+the item through the foreign key cascade. Writes that bypass the receivers
+(QuerySet.update(name=...), raw SQL) need `manage.py rebuild_name_index`.
+"""
+import hashlib
+import re
+import struct
+import unicodedata
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Item, NameBucket
+
+BANDS = 12
+ROWS = 3
+# Candidates scored per lookup, those sharing the most buckets first
+MAX_CANDIDATES = 200
+
+_EXACT_BAND = BANDS
+# One 32-bit hash per signature value, all cut from a single SHAKE-128 digest
+_HASHES = struct.Struct(f'<{BANDS * ROWS}I')
+
+_NON_WORD_RE = re.compile(r'[\W_]+')
+
+
+def default_threshold():
+    return getattr(settings, 'ITEMS_SIMILAR_NAME_THRESHOLD', 0.6)
+
+
+def normalize(name):
+    decomposed = unicodedata.normalize('NFKD', name)
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return _NON_WORD_RE.sub(' ', stripped.casefold()).strip()
+
+
+def duplicate_key(name):
+    """What `name` is compared by for exact duplicates: normalized, or as given if that leaves nothing."""
+    # "!!!" and "???" both normalize to ''; they are different names
+    return normalize(name) or name
+
+
+def trigrams(normalized):
+    grams = set()
+    for word in normalized.split():
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(grams, other):
+    if not grams and not other:
+        return 1.0
+    return len(grams & other) / len(grams | other)
+
+
+def _hash(data):
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'big', signed=True)
+
+
+def signature(grams):
+    hashes = [_HASHES.unpack(hashlib.shake_128(gram.encode()).digest(_HASHES.size)) for gram in grams]
+    return [min(column) for column in zip(*hashes)]
+
+
+def buckets(name):
+    """The buckets `name` falls in: one per band of its signature, plus its exact bucket."""
+    normalized = normalize(name)
+    result = [exact_bucket(normalized)]
+    grams = trigrams(normalized)
+    if grams:
+        values = signature(grams)
+        result.extend(
+            _hash(struct.pack(f'<H{ROWS}I', band, *values[band * ROWS:(band + 1) * ROWS])) for band in range(BANDS)
+        )
+    return result
+
+
+def exact_bucket(normalized):
+    return _hash(struct.pack('<H', _EXACT_BAND) + normalized.encode())
+
+
+def index(items, created=False):
+    """(Re)write the buckets of `items`, which must be saved; new items have none to remove."""
+    items = list(items)
+    if not items:
+        return
+    with transaction.atomic():
+        if not created:
+            NameBucket.objects.filter(item__in=[item.pk for item in items]).delete()
+        NameBucket.objects.bulk_create(
+            NameBucket(item_id=item.pk, bucket=bucket) for item in items for bucket in set(buckets(item.name))
+        )
+
+
+def rebuild(batch_size=2000):
+    """Rewrite every item's buckets from the items table."""
+    with transaction.atomic():
+        NameBucket.objects.all().delete()
+        rows = Item.objects.order_by().values_list('id', 'name').iterator(chunk_size=batch_size)
+        NameBucket.objects.bulk_create(
+            (NameBucket(item_id=pk, bucket=bucket) for pk, name in rows for bucket in set(buckets(name))),
+            batch_size=batch_size,
+        )
+
+
+def exact_matches(names):
+    """Map the duplicate key of each of `names` to the id of an item with that key."""
+    wanted = {duplicate_key(name) for name in names}
+    candidates = NameBucket.objects.filter(
+        bucket__in={exact_bucket(normalize(key)) for key in wanted}
+    ).values_list('item_id', flat=True)
+    found = {}
+    # Buckets are hashes; the names themselves decide
+    for pk, name in Item.objects.filter(pk__in=candidates).order_by('id').values_list('id', 'name'):
+        key = duplicate_key(name)
+        if key in wanted:
+            found.setdefault(key, pk)
+    return found
+
+
+def find(name, threshold=None, limit=10, exclude=None):
+    """
+    Items whose names are at least `threshold` similar to `name`, most
+    similar first, as dicts of id, name and similarity.
+    """
+    threshold = default_threshold() if threshold is None else threshold
+    grams = trigrams(normalize(name))
+    candidates = NameBucket.objects.filter(bucket__in=buckets(name))
+    if exclude is not None:
+        candidates = candidates.exclude(item_id=exclude)
+    candidates = (
+        candidates.values('item_id').annotate(shared=Count('id')).order_by('-shared', 'item_id')
+        .values_list('item_id', flat=True)[:MAX_CANDIDATES]
+    )
+    scored = []
+    for pk, other in Item.objects.filter(pk__in=candidates).values_list('id', 'name'):
+        score = similarity(grams, trigrams(normalize(other)))
+        if score >= threshold:
+            scored.append({'id': pk, 'name': other, 'similarity': round(score, 3)})
+    scored.sort(key=lambda row: (-row['similarity'], row['id']))
+    return scored[:limit]
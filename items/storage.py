@@ -0,0 +1,126 @@
+"""
+Storage and reference counting for Item.image files.
+
+ItemImageStorage is FileSystemStorage under MEDIA_ROOT. With
+ITEMS_CONTENT_ADDRESSED_IMAGES on, it names each file after the SHA-256 of
+its content, item_images/<2 hex>/<sha256>.<ext>, and saving content that
+is already stored writes nothing and returns the existing name. A file's
+URL then always serves the same bytes, so it can be cached forever. Off,
+files keep the item_image_path names.
+
+StoredImage counts the items that point at each file. The counts are kept by
+items.receivers. When a count drops to zero the file and its renditions are
+deleted after the commit, inside a write transaction, so a concurrent upload
+of the same content either sees the file gone and writes it again, or has
+already taken a reference and the file stays. `manage.py collect_images`
+removes files that no row references, e.g. from before this existed.
+"""
+import hashlib
+import os
+import posixpath
+from collections import Counter
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from . import images
+
+
+def content_addressed():
+    return getattr(settings, 'ITEMS_CONTENT_ADDRESSED_IMAGES', False)
+
+
+def content_name(name, content):
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    directory = posixpath.dirname(name)
+    extension = posixpath.splitext(name)[1].lower()
+    sha256 = digest.hexdigest()
+    return posixpath.join(directory, sha256[:2], sha256 + extension)
+
+
+class ItemImageStorage(FileSystemStorage):
+    def save(self, name, content, max_length=None):
+        if not content_addressed():
+            return super().save(name, content, max_length)
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = content_name(name, content)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
+
+
+def apply_changes(added=(), removed=()):
+    """Take a reference on each name in `added` and drop one on each in `removed`."""
+    from .models import StoredImage
+    deltas = Counter(name for name in added if name)
+    deltas.subtract(name for name in removed if name)
+    released = []
+    for name, delta in deltas.items():
+        if delta == 0:
+            continue
+        if not StoredImage.objects.filter(name=name).update(references=F('references') + delta):
+            try:
+                with transaction.atomic():
+                    StoredImage.objects.create(name=name, references=max(delta, 0))
+            except IntegrityError:
+                StoredImage.objects.filter(name=name).update(references=F('references') + delta)
+        if delta < 0:
+            released.append(name)
+    if released:
+        transaction.on_commit(lambda: collect(released))
+
+
+def collect(names):
+    """Delete the files among `names` that no item references any more."""
+    from .models import StoredImage
+    with transaction.atomic():
+        unused = list(StoredImage.objects.filter(name__in=names, references__lte=0).values_list('name', flat=True))
+        for name in unused:
+            delete_file(name)
+        StoredImage.objects.filter(name__in=unused).delete()
+    return unused
+
+
+def delete_file(name):
+    from .models import Item
+    Item._meta.get_field('image').storage.delete(name)
+    images.delete_renditions(name)
+
+
+def rebuild():
+    """Recount every reference from the items table."""
+    from .models import Item, StoredImage
+    with transaction.atomic():
+        StoredImage.objects.all().delete()
+        StoredImage.objects.bulk_create(
+            StoredImage(name=row['image'], references=row['references'])
+            for row in Item.objects.exclude(image='').exclude(image__isnull=True)
+            .order_by().values('image').annotate(references=Count('id'))
+        )
+
+
+def unreferenced_files(directory, referenced, older_than, recursive=True):
+    """
+    Storage names of image files under `directory` (a path inside MEDIA_ROOT)
+    that are not in `referenced` and were last modified before `older_than`
+    (a timestamp), skipping renditions.
+    """
+    root = os.path.join(settings.MEDIA_ROOT, '')
+    found = []
+    for dirpath, dirnames, filenames in os.walk(directory):
+        dirnames[:] = [name for name in dirnames if recursive and name != 'renditions']
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            name = path[len(root):].replace(os.sep, '/')
+            if name not in referenced and os.path.getmtime(path) < older_than:
+                found.append(name)
+    return found
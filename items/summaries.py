@@ -0,0 +1,164 @@
+"""
+Incremental maintenance of InventorySummary.
+
+Every item contributes (1, quantity, quantity * price) to the row for its
+(category, location). Writes turn into per-row deltas that are applied with
+UPDATE ... SET x = x + delta, so a save touches one or two summary rows no
+matter how big the inventory is.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+
+from .models import InventorySummary, Item
+
+TRACKED_FIELDS = ('category_id', 'location_id', 'quantity', 'price')
+
+_quantity_field = Item._meta.get_field('quantity')
+_price_field = Item._meta.get_field('price')
+
+
+def tracked_values(item):
+    return {field: getattr(item, field) for field in TRACKED_FIELDS}
+
+
+def stored_values(items):
+    """
+    Tracked values as they are stored in the database, by primary key.
+
+    Read from the rows, not from what the instances remember from loading:
+    another write may have changed the row since, and subtracting the
+    remembered values would then subtract them twice. Call it inside the
+    write transaction, before the write.
+    """
+    rows = Item.objects.filter(pk__in=[item.pk for item in items]).values('pk', *TRACKED_FIELDS)
+    return {row.pop('pk'): row for row in rows}
+
+
+def loaded_values(item):
+    """Tracked values of an item as ItemQuerySet.bulk_update read them in its transaction."""
+    return {field: item._loaded_values[field] for field in TRACKED_FIELDS}
+
+
+def saved_values(item, stored, update_fields=None):
+    """
+    Tracked values of `item` once saved: the fields in `update_fields` (all
+    of them if None) from the instance, the others as `stored` in the row.
+    """
+    if update_fields is None or not stored:
+        return tracked_values(item)
+    written = {Item._meta.get_field(name).attname for name in update_fields}
+    return {field: getattr(item, field) if field in written else stored[field] for field in TRACKED_FIELDS}
+
+
+def add(deltas, values, sign):
+    quantity = _quantity_field.to_python(values['quantity'])
+    price = _price_field.to_python(values['price'])
+    cents = 0 if price is None else int(quantity * price * 100)
+    delta = deltas[values['category_id'], values['location_id']]
+    delta[0] += sign
+    delta[1] += sign * quantity
+    delta[2] += sign * cents
+
+
+def apply_changes(added=(), removed=()):
+    """Add the contribution of each `added` and subtract each `removed` tracked-values dict."""
+    deltas = defaultdict(lambda: [0, 0, 0])
+    for values in removed:
+        add(deltas, values, -1)
+    for values in added:
+        add(deltas, values, 1)
+
+    for (category_id, location_id), (count, quantity, cents) in deltas.items():
+        if not (count or quantity or cents):
+            continue
+        rows = InventorySummary.objects.filter(category_id=category_id, location_id=location_id)
+        changes = {
+            'item_count': F('item_count') + count,
+            'total_quantity': F('total_quantity') + quantity,
+            'total_value_cents': F('total_value_cents') + cents,
+        }
+        if rows.update(**changes) or count <= 0:
+            continue
+        try:
+            with transaction.atomic():
+                InventorySummary.objects.create(
+                    category_id=category_id, location_id=location_id,
+                    item_count=count, total_quantity=quantity, total_value_cents=cents,
+                )
+        except IntegrityError:
+            # Another writer created the row first
+            rows.update(**changes)
+
+
+def rebuild():
+    """Recompute every summary row from the items table."""
+    totals = defaultdict(lambda: [0, 0, 0])
+    rows = Item.objects.order_by().values_list(*TRACKED_FIELDS).iterator(chunk_size=5000)
+    for category_id, location_id, quantity, price in rows:
+        total = totals[category_id, location_id]
+        total[0] += 1
+        total[1] += quantity
+        total[2] += 0 if price is None else int(quantity * price * 100)
+    with transaction.atomic():
+        InventorySummary.objects.all().delete()
+        InventorySummary.objects.bulk_create(
+            InventorySummary(
+                category_id=category_id, location_id=location_id,
+                item_count=count, total_quantity=quantity, total_value_cents=cents,
+            )
+            for (category_id, location_id), (count, quantity, cents) in totals.items()
+        )
+
+
+def as_value(cents):
+    return str((Decimal(cents) / 100).quantize(Decimal('0.01')))
+
+
+def grouped(field):
+    """Totals per category or per location, summed over the summary rows."""
+    rows = (
+        InventorySummary.objects.filter(item_count__gt=0)
+        .values(field, f'{field}__name')
+        .annotate(count=Sum('item_count'), total_quantity=Sum('total_quantity'), total_value_cents=Sum('total_value_cents'))
+        .order_by(f'{field}__name', field)
+    )
+    result = []
+    for row in rows:
+        row['total_value'] = as_value(row.pop('total_value_cents'))
+        result.append(row)
+    return result
+
+
+def overall():
+    """Totals over the whole inventory, summed over the summary rows."""
+    row = InventorySummary.objects.aggregate(
+        count=Sum('item_count'), total_quantity=Sum('total_quantity'), total_value_cents=Sum('total_value_cents'),
+    )
+    return {
+        'count': row['count'] or 0,
+        'total_quantity': row['total_quantity'] or 0,
+        'total_value': as_value(row['total_value_cents'] or 0),
+    }
+
+
+def matrix():
+    rows = (
+        InventorySummary.objects.filter(item_count__gt=0)
+        .values('category', 'category__name', 'location', 'location__name', 'item_count', 'total_quantity', 'total_value_cents')
+        .order_by('category__name', 'location__name', 'category', 'location')
+    )
+    return [
+        {
+            'category': row['category'],
+            'category__name': row['category__name'],
+            'location': row['location'],
+            'location__name': row['location__name'],
+            'count': row['item_count'],
+            'total_quantity': row['total_quantity'],
+            'total_value': as_value(row['total_value_cents']),
+        }
+        for row in rows
+    ]
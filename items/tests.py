@@ -1,17 +1,51 @@
 from django.urls import reverse
 from django.utils.text import slugify
-from rest_framework import status
+from rest_framework import serializers, status
 from rest_framework.test import APITestCase
-from items.models import Category, Location, Item
+from items.models import Category, Location, Item, InventorySummary, Tombstone, ImageUpload, StoredImage, NameBucket, ModelVersion, SYNC_REVISION
 
 from rest_framework.test import APIClient
 from rest_framework.authtoken.models import Token
 from django.contrib.auth.models import User
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import AsyncClient, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import resolve
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from items import analytics, authentication, barcodes, images, instrumentation, schema, similarity, summaries, sync, throttling, uploads
+from items.cache import LRUCache
+from items.pagination import ItemCursorPagination
+from items.serializers import ItemSerializer, ItemValuesSerializer
 from django.core.files.uploadedfile import SimpleUploadedFile
 
+import asyncio
+import csv
+import hashlib
+import json
+import os
+import sqlite3
 import tempfile
+import unittest
+from datetime import timedelta
+from unittest import mock
+from io import BytesIO, StringIO
 from PIL import Image
 
+def setUpModule():
+    # Throttle counters live in a file shared across processes; keep them per run
+    throttle_dir = tempfile.TemporaryDirectory()
+    throttle_db = override_settings(ITEMS_THROTTLE_DB=os.path.join(throttle_dir.name, 'throttle.sqlite3'))
+    throttle_db.enable()
+    unittest.addModuleCleanup(throttle_dir.cleanup)
+    unittest.addModuleCleanup(throttle_db.disable)
+
 class CategoryTests(APITestCase):
     def setUp(self):
         self.user = User.objects.create_user(username='testuser', password='12345')
@@ -156,3 +190,1639 @@ class ItemTests(APITestCase):
         response = self.client.delete(url)
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(Item.objects.count(), 0)
+
+class ItemBulkTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='12345')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(RefreshToken.for_user(self.user).access_token))
+        self.category = Category.objects.create(name="Test Category")
+        self.location = Location.objects.create(name="Test Location")
+        self.url = reverse('item-bulk')
+
+    def row(self, name, **extra):
+        return {'name': name, 'category': self.category.id, 'location': self.location.id, **extra}
+
+    def test_bulk_create(self):
+        rows = [self.row(f"Item {i}", quantity=i) for i in range(5)]
+        response = self.client.post(self.url, rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 5)
+        self.assertEqual(Item.objects.count(), 5)
+        self.assertTrue(all(row['id'] for row in response.data))
+
+    def test_bulk_create_reports_errors_per_row(self):
+        Item.objects.create(name="Existing", category=self.category, location=self.location)
+        rows = [self.row("Fresh"), self.row("Existing"), self.row("Twice"), self.row("Twice")]
+        response = self.client.post(self.url, rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([bool(error) for error in response.data], [False, True, False, True])
+        self.assertEqual(Item.objects.count(), 1)
+
+    def test_bulk_create_checks_duplicates_once(self):
+        rows = [self.row(f"Item {i}") for i in range(20)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        selects = [q for q in queries if 'FROM "items_item"' in q['sql'] and q['sql'].startswith('SELECT')]
+        self.assertEqual(len(selects), 1)
+
+    def test_bulk_partial_update(self):
+        first = Item.objects.create(name="First", category=self.category, location=self.location)
+        second = Item.objects.create(name="Second", category=self.category, location=self.location)
+        rows = [{'id': first.id, 'quantity': 7}, {'id': second.id, 'name': 'Renamed'}]
+        response = self.client.patch(self.url, rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.quantity, 7)
+        self.assertEqual(first.name, 'First')
+        self.assertEqual(second.name, 'Renamed')
+
+    def test_bulk_partial_update_unknown_id(self):
+        item = Item.objects.create(name="First", category=self.category, location=self.location)
+        rows = [{'id': item.id, 'quantity': 3}, {'id': 999999, 'quantity': 4}]
+        response = self.client.patch(self.url, rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('id', response.data[1])
+        item.refresh_from_db()
+        self.assertEqual(item.quantity, 1)
+
+    def test_bulk_delete(self):
+        items = [Item.objects.create(name=f"Item {i}", category=self.category, location=self.location) for i in range(3)]
+        response = self.client.delete(self.url, {'ids': [items[0].id, items[1].id]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['deleted'], 2)
+        self.assertEqual(list(Item.objects.values_list('id', flat=True)), [items[2].id])
+
+    def test_bulk_delete_unknown_id(self):
+        item = Item.objects.create(name="Item", category=self.category, location=self.location)
+        response = self.client.delete(self.url, {'ids': [item.id, 999999]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Item.objects.count(), 1)
+
+    def delete_queries(self, count):
+        items = Item.objects.bulk_create(
+            Item(name=f"Batch {count} {i}", quantity=2, price='1.50', category=self.category, location=self.location)
+            for i in range(count)
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.delete(self.url, {'ids': [item.id for item in items]}, format='json')
+        self.assertEqual(response.data['deleted'], count)
+        return len(queries)
+
+    def test_bulk_delete_queries_do_not_grow_with_the_items(self):
+        self.delete_queries(1)  # caches the user
+        # Existence check, savepoint, item rows, uploads, name buckets, items,
+        # summary, item version, sync revisions, tombstones, release
+        self.assertEqual((self.delete_queries(2), self.delete_queries(50)), (11, 11))
+
+    def test_bulk_delete_as_a_set(self):
+        items = [Item.objects.create(name=f"Item {i}", quantity=2, price='1.50', barcode=f"CODE{i}",
+                                     category=self.category, location=self.location) for i in range(3)]
+        upload = ImageUpload.objects.create(item=items[0], user=self.user, filename='a.png', size=10)
+        self.assertEqual(barcodes.lookup(['CODE0'])['CODE0'], items[0])
+        revision = ModelVersion.objects.get(model=SYNC_REVISION).version
+        with CaptureQueriesContext(connection) as queries:
+            deleted, per_model = Item.objects.filter(pk__in=[items[0].pk, items[1].pk]).delete()
+        self.assertEqual((deleted, per_model['items.Item'], per_model['items.ImageUpload']), (sum(per_model.values()), 2, 1))
+        self.assertFalse(ImageUpload.objects.filter(pk=upload.pk).exists())
+        self.assertIsNone(barcodes.lookup(['CODE0'])['CODE0'])
+        self.assertEqual(
+            sorted(Tombstone.objects.filter(model='items.item').values_list('object_id', 'revision')),
+            [(items[0].pk, revision + 1), (items[1].pk, revision + 2)],
+        )
+        summary = InventorySummary.objects.get(category=self.category, location=self.location)
+        self.assertEqual((summary.item_count, summary.total_quantity, summary.total_value_cents), (1, 2, 300))
+        self.assertEqual(sum('INSERT INTO "items_tombstone"' in q['sql'] for q in queries), 1)
+
+class ItemSearchTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='12345')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(RefreshToken.for_user(self.user).access_token))
+        self.category = Category.objects.create(name="Test Category")
+        self.location = Location.objects.create(name="Test Location")
+        self.url = reverse('item-list')
+
+    def create(self, name, description=''):
+        return Item.objects.create(name=name, description=description, category=self.category, location=self.location)
+
+    def search(self, term, **params):
+        response = self.client.get(self.url, {'search': term, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row['name'] for row in response.data['results']]
+
+    def test_prefix_match(self):
+        self.create("Mentos Gum")
+        self.create("Pipe Tobacco")
+        self.assertEqual(self.search("ment"), ["Mentos Gum"])
+
+    def test_all_words_must_match(self):
+        self.create("Mentos Gum")
+        self.create("Bubble Gum")
+        self.assertEqual(self.search("gum bub"), ["Bubble Gum"])
+
+    def test_name_hits_rank_above_description_hits(self):
+        self.create("Lighter", description="Works with a pipe")
+        self.create("Pipe Tobacco")
+        self.assertEqual(self.search("pipe"), ["Pipe Tobacco", "Lighter"])
+
+    def test_explicit_ordering_wins(self):
+        self.create("Pipe Tobacco")
+        self.create("Lighter", description="Works with a pipe")
+        self.assertEqual(self.search("pipe", ordering='name'), ["Lighter", "Pipe Tobacco"])
+
+    def test_index_follows_updates_and_deletes(self):
+        item = self.create("Cappy Juice")
+        item.name = "Orange Juice"
+        item.save()
+        self.assertEqual(self.search("cappy"), [])
+        self.assertEqual(self.search("orange"), ["Orange Juice"])
+        item.delete()
+        self.assertEqual(self.search("orange"), [])
+
+    def test_operators_are_treated_as_text(self):
+        self.create("Mentos Gum")
+        self.assertEqual(self.search('gum" OR "x'), [])
+        self.assertEqual(self.search('mentos NEAR'), [])
+
+class ItemCursorPaginationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='12345')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(RefreshToken.for_user(self.user).access_token))
+        self.category = Category.objects.create(name="Test Category")
+        self.other_category = Category.objects.create(name="Other Category")
+        self.location = Location.objects.create(name="Test Location")
+        for i in range(25):
+            Item.objects.create(
+                name=f"Item {i:02}", category=self.category if i % 3 else self.other_category,
+                location=self.location, price=None if i % 4 == 0 else f"{i % 5}.00",
+            )
+
+    def walk(self, **params):
+        url = reverse('item-list')
+        params = {'pagination': 'cursor', **params}
+        ids = []
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            ids.extend(row['id'] for row in response.data['results'])
+            url, params = response.data['next'], None
+        return ids
+
+    def test_default_ordering(self):
+        expected = list(Item.objects.order_by('-date_added', '-id').values_list('id', flat=True))
+        self.assertEqual(self.walk(), expected)
+
+    def test_with_filters(self):
+        expected = list(Item.objects.filter(category=self.category).order_by('-date_added', '-id').values_list('id', flat=True))
+        self.assertEqual(self.walk(category=self.category.id), expected)
+
+    def test_ordering_on_nullable_field_with_ties(self):
+        expected = list(Item.objects.order_by(F('price').asc(nulls_first=True), 'id').values_list('id', flat=True))
+        self.assertEqual(self.walk(ordering='price'), expected)
+        expected = list(Item.objects.order_by(F('price').desc(nulls_last=True), '-id').values_list('id', flat=True))
+        self.assertEqual(self.walk(ordering='-price'), expected)
+
+    def test_no_count_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('item-list'), {'pagination': 'cursor'})
+        self.assertFalse(any('COUNT(' in q['sql'] for q in queries))
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('item-list'), {'pagination': 'cursor', 'cursor': 'garbage'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_page_number_pagination_is_default(self):
+        response = self.client.get(reverse('item-list'))
+        self.assertEqual(response.data['count'], 25)
+
+class LRUCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 0
+        self.cache = LRUCache(maxsize=2, ttl=10, timer=lambda: self.now)
+
+    def test_evicts_least_recently_used(self):
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        self.cache.get('a')
+        self.cache.set('c', 3)
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(len(self.cache), 2)
+
+    def test_entries_expire(self):
+        self.cache.set('a', 1)
+        self.now = 10
+        self.assertIsNone(self.cache.get('a'))
+
+    def test_stale_fill_is_dropped(self):
+        generation = self.cache.generation
+        self.cache.delete('a')
+        self.cache.set('a', 'stale', generation=generation)
+        self.assertIsNone(self.cache.get('a'))
+
+class ItemBarcodeTests(APITestCase):
+    def setUp(self):
+        barcodes.cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='12345')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(RefreshToken.for_user(self.user).access_token))
+        self.category = Category.objects.create(name="Test Category")
+        self.location = Location.objects.create(name="Test Location")
+        self.item = Item.objects.create(name="Mentos Gum", barcode="4001", category=self.category, location=self.location)
+
+    def scan(self, code):
+        return self.client.get(reverse('item-by-barcode', kwargs={'code': code}))
+
+    def test_lookup(self):
+        response = self.scan("4001")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['id'], self.item.id)
+        self.assertEqual(self.scan("9999").status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_warm_lookup_skips_database(self):
+        self.scan("4001")
+        with self.assertNumQueries(0):
+            barcodes.lookup(["4001"])
+
+    def test_barcode_change_invalidates_old_and_new_code(self):
+        self.scan("4001")
+        self.scan("4002")
+        item = Item.objects.get(pk=self.item.pk)
+        item.barcode = "4002"
+        item.save()
+        self.assertEqual(self.scan("4001").status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.scan("4002").data['id'], item.id)
+
+    def test_lookup_before_commit_is_dropped_on_commit(self):
+        self.scan("4001")
+        with self.captureOnCommitCallbacks(execute=True):
+            item = Item.objects.get(pk=self.item.pk)
+            item.barcode = "4002"
+            item.save()
+            # A concurrent lookup that read the old row before the commit
+            barcodes.cache.set("4001", self.item, generation=barcodes.cache.generation)
+        self.assertEqual(self.scan("4001").status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_delete_invalidates(self):
+        self.scan("4001")
+        self.item.delete()
+        self.assertEqual(self.scan("4001").status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_bulk_create_invalidates_cached_miss(self):
+        self.scan("5000")
+        Item.objects.bulk_create([Item(name="Pipe", barcode="5000", category=self.category, location=self.location)])
+        self.assertEqual(self.scan("5000").status_code, status.HTTP_200_OK)
+
+    def test_batch_lookup(self):
+        response = self.client.post(reverse('item-by-barcodes'), {'barcodes': ["4001", "9999"]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["4001"]['id'], self.item.id)
+        self.assertIsNone(response.data["9999"])
+
+@override_settings(ITEMS_IMAGE_WORKERS=0)
+class ItemImageRenditionTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_override = override_settings(MEDIA_ROOT=media_root.name)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.user = User.objects.create_user(username='testuser', password='12345')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(RefreshToken.for_user(self.user).access_token))
+        self.category = Category.objects.create(name="Test Category")
+        self.location = Location.objects.create(name="Test Location")
+
+    def upload(self, name='photo.jpg', size=(1600, 1200)):
+        buffer = BytesIO()
+        Image.new('RGB', size, 'red').save(buffer, 'jpeg')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+    def create_item(self):
+        data = {'name': 'Mentos Gum', 'category': self.category.id, 'location': self.location.id, 'image': self.upload()}
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('item-list'), data, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return Item.objects.get(pk=response.data['id'])
+
+    def test_renditions_generated_on_save(self):
+        item = self.create_item()
+        for rendition, size in images.RENDITION_SIZES.items():
+            with Image.open(default_storage.path(images.rendition_name(item.image.name, rendition))) as rendered:
+                self.assertEqual(rendered.format, 'WEBP')
+                self.assertEqual(max(rendered.size), size)
+        response = self.client.get(reverse('item-detail', kwargs={'pk': item.pk}))
+        self.assertTrue(response.data['image_thumbnail'].endswith('mentos-gum.thumbnail.webp'))
+        self.assertTrue(response.data['image_medium'].endswith('mentos-gum.medium.webp'))
+
+    def test_no_renditions_without_image(self):
+        item = Item.objects.create(name="Plain", category=self.category, location=self.location)
+        response = self.client.get(reverse('item-detail', kwargs={'pk': item.pk}))
+        self.assertIsNone(response.data['image_thumbnail'])
+
+    def test_rename_removes_old_renditions(self):
+        item = self.create_item()
+        old_thumbnail = images.rendition_name(item.image.name, 'thumbnail')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                reverse('item-detail', kwargs={'pk': item.pk}),
+                {'name': 'Pipe Tobacco', 'image': self.upload('new.jpg')}, format='multipart',
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        item.refresh_from_db()
+        self.assertFalse(default_storage.exists(old_thumbnail))
+        self.assertTrue(default_storage.exists(images.rendition_name(item.image.name, 'thumbnail')))
+
+    def test_backfill_command(self):
+        item = self.create_item()
+        images.delete_renditions(item.image.name)
+        out = StringIO()
+        call_command('generate_image_renditions', workers=1, stdout=out)
+        self.assertIn("Rendered 1 image(s)", out.getvalue())
+        self.assertTrue(default_storage.exists(images.rendition_name(item.image.name, 'medium')))
+
+    def test_backfill_changes_item_etag(self):
+        item = self.create_item()
+        images.delete_renditions(item.image.name)
+        url = reverse('item-detail', kwargs={'pk': item.pk})
+        response = self.client.get(url)
+        self.assertIsNone(response.data['image_thumbnail'])
+        call_command('generate_image_renditions', workers=1, stdout=StringIO())
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['image_thumbnail'].endswith('mentos-gum.thumbnail.webp'))
+
+class ItemExportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='12345')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(RefreshToken.for_user(self.user).access_token))
+        self.category = Category.objects.create(name="Test Category")
+        self.location = Location.objects.create(name="Test Location")
+        self.first = Item.objects.create(name="Mentos Gum", price='1.50', barcode="4001", category=self.category, location=self.location)
+        self.second = Item.objects.create(name="Pipe, Tobacco", is_available=False, category=self.category, location=self.location)
+        self.url = reverse('item-export')
+
+    def content(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv(self):
+        rows = list(csv.DictReader(StringIO(self.content(self.client.get(self.url)))))
+        self.assertEqual([row['name'] for row in rows], ["Pipe, Tobacco", "Mentos Gum"])
+        self.assertEqual(rows[1]['price'], '1.50')
+        self.assertEqual(rows[0]['price'], '')
+
+    def test_ndjson_matches_serializer(self):
+        lines = self.content(self.client.get(self.url, {'export_format': 'ndjson'})).splitlines()
+        exported = json.loads(lines[1])
+        detail = self.client.get(reverse('item-detail', kwargs={'pk': self.first.pk})).data
+        self.assertEqual(exported, {field: detail[field] for field in exported})
+
+    def test_filters_apply(self):
+        lines = self.content(self.client.get(self.url, {'export_format': 'ndjson', 'is_available': 'false'})).splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], [self.second.id])
+        lines = self.content(self.client.get(self.url, {'export_format': 'ndjson', 'search': 'ment'})).splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], [self.first.id])
+
+    def test_unknown_format(self):
+        response = self.client.get(self.url, {'export_format': 'xlsx'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class ImportItemsCommandTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        Category.objects.create(name="Snacks")
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def run_import(self, path, **options):
+        out, err = StringIO(), StringIO()
+        call_command('import_items', path, stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_csv_import(self):
+        path = self.write('items.csv', (
+            "name,description,quantity,price,category,location,is_available,barcode\n"
+            "Mentos Gum,Mint,3,1.50,Snacks,Kitchen,yes,4001\n"
+            "Pipe Tobacco,,1,,Smoking,Study,no,\n"
+            "Broken,,lots,,Snacks,Kitchen,,\n"
+        ))
+        out, err = self.run_import(path, batch_size=2)
+        self.assertIn("Imported 2 items", out)
+        self.assertIn("Row 3: invalid quantity", err)
+        self.assertEqual(Category.objects.count(), 2)
+        self.assertEqual(Location.objects.count(), 2)
+        gum = Item.objects.get(name="Mentos Gum")
+        self.assertEqual((gum.quantity, str(gum.price), gum.barcode, gum.is_available), (3, '1.50', '4001', True))
+        self.assertEqual(gum.category.name, "Snacks")
+        self.assertFalse(Item.objects.get(name="Pipe Tobacco").is_available)
+        self.assertFalse(os.path.exists(path + '.checkpoint'))
+
+    def test_ndjson_import_skips_duplicates(self):
+        Item.objects.create(name="Mentos Gum", category=Category.objects.get(), location=Location.objects.create(name="Kitchen"))
+        path = self.write('items.ndjson', (
+            '{"name": "Mentos Gum", "category": "Snacks", "location": "Kitchen"}\n'
+            '{"name": "Cappy", "category": "Drinks", "location": "Kitchen", "price": 2}\n'
+            '{"name": "Cappy", "category": "Drinks", "location": "Kitchen"}\n'
+        ))
+        out, _ = self.run_import(path)
+        self.assertIn("Imported 1 items", out)
+        self.assertIn("2 duplicates", out)
+        self.assertEqual(Location.objects.count(), 1)
+
+    def test_resume_after_failure(self):
+        path = self.write('items.csv', "name,category,location\n" + "".join(f"Item {i},Snacks,Kitchen\n" for i in range(5)))
+        original = Item.objects.bulk_create
+        calls = []
+
+        def failing_bulk_create(objs, *args, **kwargs):
+            calls.append(len(objs))
+            if len(calls) == 2:
+                raise RuntimeError("disk full")
+            return original(objs, *args, **kwargs)
+
+        with mock.patch.object(Item.objects, 'bulk_create', failing_bulk_create):
+            with self.assertRaises(RuntimeError):
+                self.run_import(path, batch_size=2)
+        self.assertEqual(Item.objects.count(), 2)
+        with open(path + '.checkpoint') as f:
+            self.assertEqual(json.load(f), {'rows': 2})
+
+        out, _ = self.run_import(path, batch_size=2, resume=True)
+        self.assertIn("Resuming after row 2", out)
+        self.assertEqual(sorted(Item.objects.values_list('name', flat=True)), [f"Item {i}" for i in range(5)])
+
+    def api_client(self):
+        cache.clear()
+        client = APIClient()
+        user = User.objects.create_user(username='testuser', password='12345')
+        client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(RefreshToken.for_user(user).access_token))
+        return client
+
+    def test_import_changes_category_etag(self):
+        client = self.api_client()
+        url = reverse('category-list')
+        etag = client.get(url)['ETag']
+        self.assertEqual(client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        self.run_import(self.write('items.csv', "name,category,location\nCappy,Drinks,Kitchen\n"))
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+
+    def test_imported_categories_and_locations_sync(self):
+        client = self.api_client()
+        self.run_import(self.write('items.csv', "name,category,location\nCappy,Drinks,Kitchen\n"))
+        data = client.get(reverse('sync'), {'since': 0}).data
+        cappy = next(item for item in data['items'] if item['name'] == "Cappy")
+        self.assertIn(cappy['category'], [category['id'] for category in data['categories']])
+        self.assertIn(cappy['location'], [location['id'] for location in data['locations']])
+
+
+class InventorySummaryTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='12345')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(RefreshToken.for_user(self.user).access_token))
+        self.snacks = Category.objects.create(name="Snacks")
+        self.drinks = Category.objects.create(name="Drinks")
+        self.kitchen = Location.objects.create(name="Kitchen")
+        self.pantry = Location.objects.create(name="Pantry")
+
+    def summary(self):
+        return {
+            (row.category_id, row.location_id): (row.item_count, row.total_quantity, row.total_value_cents)
+            for row in InventorySummary.objects.filter(item_count__gt=0)
+        }
+
+    def assertSummaryConsistent(self):
+        incremental = self.summary()
+        summaries.rebuild()
+        self.assertEqual(incremental, self.summary())
+
+    def test_save_and_delete(self):
+        gum = Item.objects.create(name="Gum", quantity=3, price='1.50', category=self.snacks, location=self.kitchen)
+        Item.objects.create(name="Cappy", quantity=2, price=None, category=self.drinks, location=self.kitchen)
+        self.assertEqual(self.summary()[self.snacks.id, self.kitchen.id], (1, 3, 450))
+        gum = Item.objects.get(pk=gum.pk)
+        gum.location = self.pantry
+        gum.quantity = 4
+        gum.save()
+        self.assertEqual(self.summary()[self.snacks.id, self.pantry.id], (1, 4, 600))
+        self.assertNotIn((self.snacks.id, self.kitchen.id), self.summary())
+        gum.delete()
+        self.assertNotIn((self.snacks.id, self.pantry.id), self.summary())
+        self.assertSummaryConsistent()
+
+    def test_stale_instances(self):
+        gum = Item.objects.create(name="Gum", quantity=3, price='1.00', category=self.snacks, location=self.kitchen)
+        first, second = Item.objects.get(pk=gum.pk), Item.objects.get(pk=gum.pk)
+        first.quantity = 5
+        first.save()
+        # Still remembers quantity 3 in the kitchen, which the summary no longer holds
+        second.location = self.pantry
+        second.save()
+        self.assertSummaryConsistent()
+        first, second = Item.objects.get(pk=gum.pk), Item.objects.get(pk=gum.pk)
+        first.quantity = 7
+        Item.objects.bulk_update([first], ['quantity'])
+        second.category = self.drinks
+        Item.objects.bulk_update([second], ['category'])
+        self.assertSummaryConsistent()
+        first.delete()
+        second.delete()
+        self.assertSummaryConsistent()
+        self.assertEqual(self.summary(), {})
+
+    def test_update_without_loaded_values(self):
+        gum = Item.objects.create(name="Gum", quantity=3, price='1.00', category=self.snacks, location=self.kitchen)
+        Item(pk=gum.pk, name="Gum", quantity=5, price='1.00', category=self.snacks, location=self.kitchen,
+             date_added=gum.date_added).save()
+        self.assertEqual(self.summary()[self.snacks.id, self.kitchen.id], (1, 5, 500))
+
+    def test_bulk_endpoints(self):
+        rows = [{'name': f"Item {i}", 'quantity': 2, 'price': '0.25', 'category': self.snacks.id, 'location': self.kitchen.id}
+                for i in range(4)]
+        created = self.client.post(reverse('item-bulk'), rows, format='json').data
+        self.assertEqual(self.summary()[self.snacks.id, self.kitchen.id], (4, 8, 200))
+        self.client.patch(reverse('item-bulk'), [{'id': created[0]['id'], 'category': self.drinks.id}], format='json')
+        self.client.delete(reverse('item-bulk'), {'ids': [created[1]['id']]}, format='json')
+        self.assertEqual(self.summary()[self.snacks.id, self.kitchen.id], (2, 4, 100))
+        self.assertSummaryConsistent()
+
+    def test_grouped_endpoints(self):
+        Item.objects.create(name="Gum", quantity=3, price='1.50', category=self.snacks, location=self.kitchen)
+        Item.objects.create(name="Chips", quantity=1, price='2.00', category=self.snacks, location=self.pantry)
+        Item.objects.create(name="Cappy", quantity=2, category=self.drinks, location=self.kitchen)
+        with self.assertNumQueries(3):  # user, model versions and one summary query
+            response = self.client.get(reverse('item-grouped-by-category'))
+        snacks = next(row for row in response.data if row['category__name'] == "Snacks")
+        self.assertEqual((snacks['count'], snacks['total_quantity'], snacks['total_value']), (2, 4, '6.50'))
+        response = self.client.get(reverse('item-grouped-by-location'))
+        self.assertEqual({row['location__name']: row['count'] for row in response.data}, {"Kitchen": 2, "Pantry": 1})
+        response = self.client.get(reverse('item-category-location-matrix'))
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(response.data[0]['category__name'], "Drinks")
+
+    def test_rebuild_command(self):
+        Item.objects.create(name="Gum", quantity=3, price='1.50', category=self.snacks, location=self.kitchen)
+        Item.objects.update(quantity=10)
+        call_command('rebuild_inventory_summary', stdout=StringIO())
+        self.assertEqual(self.summary()[self.snacks.id, self.kitchen.id], (1, 10, 1500))
+
+class ConditionalResponseTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='12345')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(RefreshToken.for_user(self.user).access_token))
+        self.category = Category.objects.create(name="Test Category")
+        self.location = Location.objects.create(name="Test Location")
+        self.item = Item.objects.create(name="Mentos Gum", category=self.category, location=self.location)
+        self.url = reverse('item-list')
+
+    def item_queries(self, queries):
+        return [q['sql'] for q in queries if '"items_item"' in q['sql']]
+
+    def test_unchanged_poll_returns_304_without_item_queries(self):
+        etag = self.client.get(self.url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.item_queries(queries), [])
+
+    def test_cached_response_skips_item_queries(self):
+        first = self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(self.url)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(self.item_queries(queries), [])
+
+    def test_writes_change_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        self.item.quantity = 5
+        self.item.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['results'][0]['quantity'], 5)
+
+    def test_related_writes_change_grouped_responses(self):
+        url = reverse('item-grouped-by-category')
+        etag = self.client.get(url)['ETag']
+        self.category.name = "Renamed"
+        self.category.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.data[0]['category__name'], "Renamed")
+
+    def test_key_includes_query_string_and_user(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertNotEqual(self.client.get(self.url, {'is_available': 'false'})['ETag'], etag)
+        other = User.objects.create_user(username='other', password='12345')
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(RefreshToken.for_user(other).access_token))
+        self.assertNotEqual(self.client.get(self.url)['ETag'], etag)
+
+    def test_category_detail(self):
+        url = reverse('category-detail', kwargs={'pk': self.category.pk})
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        Location.objects.create(name="Elsewhere")
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+@override_settings(ITEMS_IMAGE_WORKERS=0)
+class ItemValuesSerializerTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media_root.cleanup)
+        media = override_settings(MEDIA_ROOT=self.media_root.name)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.user = User.objects.create_user(username='testuser', password='12345')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(RefreshToken.for_user(self.user).access_token))
+        self.category = Category.objects.create(name="Test Category")
+        self.location = Location.objects.create(name="Test Location")
+        buffer = BytesIO()
+        Image.new('RGB', (400, 300), 'red').save(buffer, 'JPEG')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item = Item.objects.create(
+                name="Mentos Gum", category=self.category, location=self.location, price='1.5',
+                image=SimpleUploadedFile('gum.jpg', buffer.getvalue(), content_type='image/jpeg'),
+            )
+        Item.objects.create(name="Orbit Gum", description="Mint", quantity=3, category=self.category, location=self.location)
+        self.url = reverse('item-list')
+
+    def test_output_matches_item_serializer(self):
+        response = self.client.get(self.url)
+        expected = ItemSerializer(Item.objects.order_by('-date_added'), many=True, context={'request': response.wsgi_request}).data
+        self.assertEqual(json.loads(response.content)['results'], json.loads(json.dumps(expected)))
+        self.assertTrue(response.data['results'][1]['image_thumbnail'].startswith('http://testserver/media/'))
+
+        detail = self.client.get(reverse('item-detail', kwargs={'pk': self.item.pk}))
+        expected = ItemSerializer(self.item, context={'request': detail.wsgi_request}).data
+        self.assertEqual(json.loads(detail.content), json.loads(json.dumps(expected)))
+
+    def test_fields_selects_keys(self):
+        response = self.client.get(self.url, {'fields': 'id, name,quantity'})
+        self.assertEqual(response.data['results'][0], {'id': Item.objects.get(name="Orbit Gum").id, 'name': "Orbit Gum", 'quantity': 3})
+        response = self.client.get(reverse('item-detail', kwargs={'pk': self.item.pk}), {'fields': 'price'})
+        self.assertEqual(response.data, {'price': '1.50'})
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get(self.url, {'fields': 'name,secret'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('fields', response.data)
+
+    def test_fields_with_cursor_pagination_and_search(self):
+        with mock.patch.object(ItemCursorPagination, 'page_size', 1):
+            response = self.client.get(self.url, {'fields': 'name', 'pagination': 'cursor', 'ordering': 'price'})
+            self.assertEqual(response.data['results'], [{'name': "Orbit Gum"}])
+            response = self.client.get(response.data['next'])
+            self.assertEqual(response.data['results'], [{'name': "Mentos Gum"}])
+        response = self.client.get(self.url, {'fields': 'name', 'search': 'mentos'})
+        self.assertEqual(response.data['results'], [{'name': "Mentos Gum"}])
+
+    def test_missing_item_is_404(self):
+        response = self.client.get(reverse('item-detail', kwargs={'pk': 0}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ItemExpandTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='12345')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(RefreshToken.for_user(self.user).access_token))
+        self.url = reverse('item-list')
+
+    def create_items(self, count):
+        for i in range(count):
+            category = Category.objects.create(name=f"Category {Category.objects.count()}", description="Snacks")
+            location = Location.objects.create(name=f"Location {Location.objects.count()}")
+            Item.objects.create(name=f"Item {Item.objects.count()}", category=category, location=location)
+
+    def test_related_objects_are_inlined(self):
+        self.create_items(1)
+        item = Item.objects.get()
+        response = self.client.get(self.url, {'expand': 'category,location'})
+        result = response.data['results'][0]
+        self.assertEqual(list(result), ItemSerializer.Meta.fields)
+        self.assertEqual(result['category'], {'id': item.category_id, 'name': item.category.name, 'description': "Snacks"})
+        location = {'id': item.location_id, 'name': item.location.name, 'description': "", 'parent': None, 'path': item.location.path}
+        self.assertEqual(result['location'], location)
+
+        response = self.client.get(reverse('item-detail', kwargs={'pk': item.pk}), {'expand': 'location', 'fields': 'name,location'})
+        self.assertEqual(response.data, {'name': item.name, 'location': location})
+
+    def test_query_count_is_constant_across_page_sizes(self):
+        counts = []
+        for total in (1, 10):
+            cache.clear()
+            authentication.cache.clear()
+            self.create_items(total - Item.objects.count())
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(self.url, {'expand': 'category,location'})
+            self.assertEqual(len(response.data['results']), total)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_unknown_expansion_is_rejected(self):
+        response = self.client.get(self.url, {'expand': 'owner'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('expand', response.data)
+
+
+@override_settings(ROOT_URLCONF='item_tracker.async_urls')
+class AsyncReadViewTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='12345')
+        self.auth = 'Bearer ' + str(RefreshToken.for_user(self.user).access_token)
+        self.category = Category.objects.create(name="Test Category")
+        self.location = Location.objects.create(name="Test Location")
+        for i in range(12):
+            Item.objects.create(name=f"Item {i:02}", category=self.category, location=self.location, price=f"{i}.00", is_available=i % 2 == 0)
+        self.client.credentials(HTTP_AUTHORIZATION=self.auth)
+
+    def async_get(self, path, data=None, auth=None, headers=None):
+        headers = {'Authorization': auth or self.auth, **(headers or {})}
+        if auth == '':
+            del headers['Authorization']
+
+        async def get():
+            return await AsyncClient().get(path, data, headers=headers)
+        return async_to_sync(get)()
+
+    def assertSameAsSync(self, url, params=None):
+        response = self.async_get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        cache.clear()
+        with override_settings(ROOT_URLCONF='item_tracker.urls'):
+            expected = self.client.get(url, params or {})
+        self.assertEqual(json.loads(response.content), json.loads(expected.content))
+        return response
+
+    @mock.patch.object(throttling.SharedUserRateThrottle, 'THROTTLE_RATES', {'user': '1/min', 'anon': '100/day'})
+    def test_throttle_checked_off_the_event_loop(self):
+        throttling.get_store().clear()
+        self.addCleanup(throttling.get_store().clear)
+        on_loop = []
+        allow_request = throttling.SharedUserRateThrottle.allow_request
+
+        def checking_allow_request(throttle, request, view):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+            return allow_request(throttle, request, view)
+
+        with mock.patch.object(throttling.SharedUserRateThrottle, 'allow_request', checking_allow_request):
+            self.assertEqual(self.async_get('/api/categories/').status_code, status.HTTP_200_OK)
+            self.assertEqual(self.async_get('/api/categories/').status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(on_loop, [False, False])
+
+    def test_routes_resolve_to_async_views(self):
+        for url in ('/api/items/', '/api/items/1/', '/api/categories/', '/api/locations/1/'):
+            self.assertTrue(asyncio.iscoroutinefunction(resolve(url).func), url)
+        self.assertEqual(resolve('/api/items/export/').url_name, 'item-export')
+
+    def test_item_reads_match_sync_views(self):
+        self.assertSameAsSync('/api/items/')
+        self.assertSameAsSync('/api/items/', {'page': 2, 'ordering': 'price'})
+        self.assertSameAsSync('/api/items/', {'is_available': 'true', 'category': self.category.pk})
+        self.assertSameAsSync('/api/items/', {'search': 'item', 'fields': 'id,name', 'expand': 'category'})
+        response = self.assertSameAsSync('/api/items/', {'pagination': 'cursor'})
+        self.assertSameAsSync(json.loads(response.content)['next'])
+        self.assertSameAsSync(f'/api/items/{Item.objects.first().pk}/')
+
+    def test_category_and_location_reads_match_sync_views(self):
+        self.assertSameAsSync('/api/categories/')
+        self.assertSameAsSync(f'/api/locations/{self.location.pk}/')
+
+    def test_conditional_get(self):
+        etag = self.async_get('/api/items/')['ETag']
+        response = self.async_get('/api/items/', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_errors(self):
+        response = self.async_get('/api/items/', auth='')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn('Bearer', response['WWW-Authenticate'])
+        response = self.async_get('/api/items/', auth='Bearer nonsense')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.async_get('/api/items/0/').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.async_get('/api/items/', {'page': 9}).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_asgi_handler_routes_only_reads(self):
+        from item_tracker.asgi import ItemTrackerASGIHandler
+        handler = ItemTrackerASGIHandler()
+        scope = {'type': 'http', 'path': '/api/items/', 'query_string': b'', 'headers': []}
+        request, _ = handler.create_request({**scope, 'method': 'GET'}, BytesIO())
+        self.assertEqual(request.urlconf, 'item_tracker.async_urls')
+        request, _ = handler.create_request({**scope, 'method': 'POST'}, BytesIO())
+        self.assertFalse(hasattr(request, 'urlconf'))
+
+
+class CachedJWTAuthenticationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        authentication.cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='12345')
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(RefreshToken.for_user(self.user).access_token))
+        self.url = reverse('category-list')
+
+    def user_queries(self, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [q['sql'] for q in queries if '"auth_user"' in q['sql']]
+
+    def test_user_is_loaded_once(self):
+        self.assertEqual(len(self.user_queries()), 1)
+        self.assertEqual(self.user_queries({'page': 1}), [])
+
+    def test_deactivation_and_deletion_take_effect(self):
+        self.user_queries()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.user.delete()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @mock.patch.object(jwt_settings, 'CHECK_REVOKE_TOKEN', True, create=True)
+    def test_password_change_revokes_cached_user(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(RefreshToken.for_user(self.user).access_token))
+        self.user_queries()
+        self.user.set_password('changed')
+        self.user.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.data['code'], 'password_changed')
+
+    def test_requests_get_separate_user_objects(self):
+        token = RefreshToken.for_user(self.user).access_token
+        backend = authentication.CachedJWTAuthentication()
+        first, second = backend.get_user(token), backend.get_user(token)
+        self.assertEqual(first, second)
+        self.assertIsNot(first, second)
+
+
+class SharedThrottleTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        throttling.get_store().clear()
+        self.user = User.objects.create_user(username='testuser', password='12345')
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(RefreshToken.for_user(self.user).access_token))
+        self.url = reverse('category-list')
+
+    def test_token_bucket(self):
+        store = throttling.TokenBucketStore(os.path.join(tempfile.mkdtemp(), 'throttle.sqlite3'))
+        self.assertEqual([store.consume('k', 3, 60, 100.0)[0] for _ in range(4)], [True, True, True, False])
+        self.assertEqual(store.consume('k', 3, 60, 100.0), (False, 20.0))
+        # One token back every 20 seconds, never more than the bucket holds
+        self.assertEqual(store.consume('k', 3, 60, 120.0), (True, 0))
+        self.assertFalse(store.consume('k', 3, 60, 120.0)[0])
+        self.assertTrue(store.consume('other', 3, 60, 120.0)[0])
+        self.assertEqual([store.consume('k', 3, 60, 1000.0)[0] for _ in range(4)], [True, True, True, False])
+
+    def test_prune_drops_full_buckets_only(self):
+        store = throttling.TokenBucketStore(os.path.join(tempfile.mkdtemp(), 'throttle.sqlite3'))
+        store.consume('idle', 3, 60, 0.0)
+        store.consume('busy', 3, 60, 50.0)
+        store.prune(10.0)
+        self.assertEqual(store.connection.execute('SELECT key FROM throttle_bucket ORDER BY key').fetchall(), [('busy',), ('idle',)])
+        store.prune(30.0)
+        self.assertEqual(store.connection.execute('SELECT key FROM throttle_bucket').fetchall(), [('busy',)])
+
+    @mock.patch.object(throttling.SharedUserRateThrottle, 'THROTTLE_RATES', {'user': '2/min', 'anon': '100/day'})
+    def test_limit_is_shared_between_store_connections(self):
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+        # A second worker opens its own connection to the same file
+        throttling._stores.clear()
+        self.assertEqual(self.client.get(self.url, {'page': 1}).status_code, status.HTTP_200_OK)
+        response = self.client.get(self.url, {'page': 2})
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '30')
+
+
+@override_settings(ITEMS_SERVER_TIMING=True)
+class RequestTimingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='12345')
+        self.auth = 'Bearer ' + str(RefreshToken.for_user(self.user).access_token)
+        self.client.credentials(HTTP_AUTHORIZATION=self.auth)
+        category = Category.objects.create(name="Test Category")
+        location = Location.objects.create(name="Test Location")
+        for i in range(3):
+            Item.objects.create(name=f"Item {i}", category=category, location=location)
+
+    def phases(self, response):
+        return {entry.split(';')[0]: entry for entry in response['Server-Timing'].split(', ')}
+
+    def test_server_timing_header(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/items/', {'is_available': 'true'})
+        phases = self.phases(response)
+        self.assertEqual(set(phases), {'total', 'sql', 'auth', 'filter', 'serialize', 'render', 'size'})
+        self.assertIn(f'desc="{len(queries)} queries"', phases['sql'])
+        self.assertEqual(phases['size'], f'size;desc="{len(response.content)} bytes"')
+
+    def test_server_timing_off_by_default(self):
+        with override_settings():
+            del settings.ITEMS_SERVER_TIMING
+            response = self.client.get('/api/items/')
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_async_reads_are_timed(self):
+        async def get():
+            return await AsyncClient().get('/api/items/', headers={'Authorization': self.auth})
+        phases = self.phases(async_to_sync(get)())
+        self.assertLessEqual({'total', 'sql', 'auth', 'filter', 'serialize', 'render'}, set(phases))
+
+    def test_slow_request_log(self):
+        with override_settings(ITEMS_SLOW_REQUEST_MS=0), self.assertLogs('items.instrumentation', 'WARNING') as logs:
+            response = self.client.get('/api/items/')
+        record = logs.records[0].request_timings
+        self.assertEqual((record['path'], record['status']), ('/api/items/', 200))
+        self.assertEqual(record['response_bytes'], len(response.content))
+        self.assertGreater(record['queries'], 0)
+        with override_settings(ITEMS_SLOW_REQUEST_MS=None, ITEMS_SERVER_TIMING=False), self.assertNoLogs('items.instrumentation'):
+            response = self.client.get('/api/items/')
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_hooks_are_inert_outside_requests(self):
+        self.assertIsNone(instrumentation.current())
+        with instrumentation.timed('filter'):
+            self.assertEqual(Item.objects.count(), 3)
+
+
+class SyncTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='12345')
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(RefreshToken.for_user(self.user).access_token))
+        self.category = Category.objects.create(name="Test Category")
+        self.location = Location.objects.create(name="Test Location")
+        self.items = [
+            Item.objects.create(name=f"Item {i}", category=self.category, location=self.location) for i in range(3)
+        ]
+        self.url = reverse('sync')
+
+    def sync(self, since=None, **params):
+        if since is not None:
+            params['since'] = since
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_full_sync(self):
+        data = self.sync()
+        self.assertEqual([item['id'] for item in data['items']], [item.id for item in self.items])
+        self.assertEqual(data['items'][0], self.client.get(f'/api/items/{self.items[0].pk}/').data)
+        self.assertEqual(data['categories'], [{'id': self.category.id, 'name': "Test Category", 'description': ''}])
+        self.assertEqual(len(data['locations']), 1)
+        self.assertEqual(data['checkpoint'], Item.objects.get(pk=self.items[-1].pk).revision)
+        self.assertFalse(data['has_more'])
+        self.assertEqual(self.sync(data['checkpoint']), {
+            'checkpoint': data['checkpoint'], 'has_more': False,
+            'items': [], 'categories': [], 'locations': [],
+            'deleted': {'items': [], 'categories': [], 'locations': []},
+        })
+
+    def test_changes_since_checkpoint(self):
+        checkpoint = self.sync()['checkpoint']
+        self.items[0].quantity = 7
+        self.items[0].save(update_fields=['quantity'])
+        self.client.delete(f'/api/items/{self.items[1].pk}/')
+        self.client.patch('/api/items/bulk/', [{'id': self.items[2].pk, 'quantity': 9}], format='json')
+        new = Item.objects.create(name="New", category=self.category, location=self.location)
+        data = self.sync(checkpoint)
+        self.assertEqual([(item['id'], item['quantity']) for item in data['items']], [
+            (self.items[0].pk, 7), (self.items[2].pk, 9), (new.pk, 1),
+        ])
+        self.assertEqual(data['deleted']['items'], [self.items[1].pk])
+        self.assertEqual(data['categories'], [])
+
+    def test_cascaded_deletes_leave_tombstones(self):
+        checkpoint = self.sync()['checkpoint']
+        category_id, item_ids = self.category.pk, [item.pk for item in self.items]
+        self.category.delete()
+        deleted = self.sync(checkpoint)['deleted']
+        self.assertEqual(deleted['categories'], [category_id])
+        self.assertEqual(sorted(deleted['items']), item_ids)
+
+    def test_pages(self):
+        checkpoint = self.sync()['checkpoint']
+        Item.objects.bulk_create(Item(name=f"Bulk {i}", category=self.category, location=self.location) for i in range(5))
+        Location.objects.create(name="Another Location")
+        deleted = self.items[0].pk
+        self.items[0].delete()
+        seen, pages = [], 0
+        while True:
+            data = self.sync(checkpoint, limit=2)
+            pages += 1
+            seen += [item['name'] for item in data['items']] + [location['name'] for location in data['locations']]
+            seen += [f"deleted {pk}" for pk in data['deleted']['items']]
+            checkpoint = data['checkpoint']
+            if not data['has_more']:
+                break
+        self.assertEqual(pages, 4)
+        self.assertEqual(seen, [f"Bulk {i}" for i in range(5)] + ["Another Location", f"deleted {deleted}"])
+
+    def test_queries_do_not_depend_on_inventory_size(self):
+        checkpoint = self.sync()['checkpoint']
+        Item.objects.bulk_create(Item(name=f"Bulk {i}", category=self.category, location=self.location) for i in range(50))
+        serializer = ItemValuesSerializer()
+        with self.assertNumQueries(7):
+            data = sync.changes(checkpoint, 10, serializer)
+        self.assertEqual(len(data['items']), 10)
+
+    def test_expired_checkpoint_and_bad_parameters(self):
+        checkpoint = self.sync()['checkpoint']
+        self.items[0].delete()
+        self.items[1].delete()
+        Tombstone.objects.update(deleted_at=F('deleted_at') - timedelta(days=100))
+        call_command('prune_tombstones', days=90, stdout=StringIO())
+        response = self.client.get(self.url, {'since': checkpoint})
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+        self.assertEqual(len(self.sync(0)['items']), 1)
+        self.assertEqual(self.sync(sync.horizon())['deleted']['items'], [])
+        response = self.client.get(self.url, {'since': '-1', 'limit': '0'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.data), {'since', 'limit'})
+
+
+class ChunkedImageUploadTests(APITestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_override = override_settings(MEDIA_ROOT=media_root.name)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.user = User.objects.create_user(username='testuser', password='12345')
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(RefreshToken.for_user(self.user).access_token))
+        category = Category.objects.create(name="Test Category")
+        location = Location.objects.create(name="Test Location")
+        self.item = Item.objects.create(name="Mentos Gum", category=category, location=location)
+        buffer = BytesIO()
+        Image.new('RGB', (300, 200), 'red').save(buffer, 'PNG')
+        self.data = buffer.getvalue()
+        self.url = f'/api/items/{self.item.pk}/image-uploads/'
+
+    def start(self, data=None):
+        response = self.client.post(self.url, {'filename': 'gum.png', 'size': len(data or self.data)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return f"{self.url}{response.data['id']}/"
+
+    def send(self, url, offset, chunk):
+        return self.client.patch(url, chunk, content_type='application/offset+octet-stream', HTTP_UPLOAD_OFFSET=str(offset))
+
+    def complete(self, url, data=None):
+        return self.client.post(url + 'complete/', {'sha256': hashlib.sha256(data or self.data).hexdigest()}, format='json')
+
+    def test_upload_in_chunks(self):
+        url = self.start()
+        for offset in range(0, len(self.data), 100):
+            response = self.send(url, offset, self.data[offset:offset + 100])
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data['offset'], min(offset + 100, len(self.data)))
+        upload = ImageUpload.objects.get()
+        # Only the header is read; decoding would call load()
+        with mock.patch('PIL.ImageFile.ImageFile.load', side_effect=AssertionError("image decoded")):
+            response = self.complete(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.image.name, 'item_images/mentos-gum.png')
+        with self.item.image.open('rb') as f:
+            self.assertEqual(f.read(), self.data)
+        self.assertTrue(response.data['image'].endswith('/media/item_images/mentos-gum.png'))
+        self.assertFalse(ImageUpload.objects.exists())
+        self.assertFalse(os.path.exists(uploads.temp_path(upload)))
+
+    def test_resume(self):
+        url = self.start()
+        self.send(url, 0, self.data[:100])
+        # A retried chunk, or one past the stored offset, is refused
+        self.assertEqual(self.send(url, 0, self.data[:100]).status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(self.send(url, 200, self.data[200:300]).status_code, status.HTTP_409_CONFLICT)
+        # Bytes from a chunk that was cut off mid-request are overwritten
+        with open(uploads.temp_path(ImageUpload.objects.get()), 'ab') as f:
+            f.write(b'garbage')
+        offset = self.client.get(url).data['offset']
+        self.assertEqual(offset, 100)
+        self.send(url, offset, self.data[offset:])
+        self.assertEqual(self.complete(url).status_code, status.HTTP_200_OK)
+
+    def test_concurrent_chunks_at_one_offset(self):
+        self.start()
+        upload = ImageUpload.objects.get()
+        competing = []
+
+        class Stream(BytesIO):
+            def read(stream, size=-1):
+                # The other request arrives while this one is still writing
+                if not competing:
+                    with self.assertRaises(uploads.OffsetMismatch):
+                        uploads.write_chunk(ImageUpload.objects.get(), 0, BytesIO(b'x' * 100), 100)
+                    competing.append(True)
+                return super().read(size)
+
+        self.assertEqual(uploads.write_chunk(upload, 0, Stream(self.data[:100]), 100), 100)
+        with open(uploads.temp_path(upload), 'rb') as f:
+            self.assertEqual(f.read(), self.data[:100])
+        self.assertEqual(ImageUpload.objects.get().offset, 100)
+
+    def test_short_chunk_keeps_the_offset(self):
+        url = self.start()
+        with self.assertRaises(serializers.ValidationError):
+            uploads.write_chunk(ImageUpload.objects.get(), 0, BytesIO(self.data[:50]), 100)
+        self.assertEqual(self.client.get(url).data['offset'], 0)
+
+    def test_rejected_uploads(self):
+        url = self.start()
+        self.send(url, 0, self.data[:100])
+        self.assertEqual(self.complete(url).status_code, status.HTTP_400_BAD_REQUEST)
+        self.send(url, 100, self.data[100:])
+        response = self.complete(url, b'other data')
+        self.assertEqual(list(response.data), ['sha256'])
+        self.assertEqual(self.send(url, len(self.data), b'x').status_code, status.HTTP_400_BAD_REQUEST)
+
+        url = self.start(b'not an image')
+        self.send(url, 0, b'not an image')
+        self.assertEqual(self.complete(url, b'not an image').status_code, status.HTTP_400_BAD_REQUEST)
+        self.item.refresh_from_db()
+        self.assertFalse(self.item.image)
+
+        with override_settings(ITEMS_IMAGE_UPLOAD_MAX_CHUNK_SIZE=10):
+            self.assertEqual(self.send(url, 0, b'x' * 11).status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        response = self.client.post(self.url, {'filename': 'big.png', 'size': 10 ** 12}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_uploads_are_private_and_cancellable(self):
+        url = self.start()
+        other = User.objects.create_user(username='other', password='12345')
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(RefreshToken.for_user(other).access_token))
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(RefreshToken.for_user(self.user).access_token))
+        path = uploads.temp_path(ImageUpload.objects.get())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.delete(url).status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(os.path.exists(path))
+
+
+class FacetedSearchTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='12345')
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(RefreshToken.for_user(self.user).access_token))
+        self.snacks = Category.objects.create(name="Snacks")
+        self.drinks = Category.objects.create(name="Drinks")
+        self.kitchen = Location.objects.create(name="Kitchen")
+        self.pantry = Location.objects.create(name="Pantry")
+        for name, category, location, price, available in (
+            ("Mentos Gum", self.snacks, self.kitchen, '1.50', True),
+            ("Orbit Gum", self.snacks, self.pantry, '10.00', False),
+            ("Mint Tea", self.drinks, self.kitchen, None, True),
+            ("Cappy Juice", self.drinks, self.kitchen, '75.00', True),
+        ):
+            Item.objects.create(name=name, category=category, location=location, price=price, is_available=available)
+
+    def test_page_and_facets(self):
+        response = self.client.get(reverse('item-faceted'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 4)
+        facet_counts = response.data['facets']
+        self.assertEqual(facet_counts['count'], 4)
+        self.assertEqual(
+            [(row['name'], row['count']) for row in facet_counts['location']], [("Kitchen", 3), ("Pantry", 1)],
+        )
+        self.assertEqual(facet_counts['is_available'], {'true': 3, 'false': 1})
+        self.assertEqual(
+            [(row['min'], row['max'], row['count']) for row in facet_counts['price']],
+            [('0', '10', 1), ('10', '50', 1), ('50', '100', 1), ('100', '500', 0), ('500', None, 0), (None, None, 1)],
+        )
+
+    def test_facets_follow_search_and_filters(self):
+        response = self.client.get(reverse('item-faceted'), {'search': 'gum', 'location': self.kitchen.id})
+        self.assertEqual([row['name'] for row in response.data['results']], ["Mentos Gum"])
+        self.assertEqual(response.data['facets']['category'], [{'id': self.snacks.id, 'name': "Snacks", 'count': 1}])
+        self.assertEqual(response.data['facets']['is_available'], {'true': 1, 'false': 0})
+
+    def test_facets_and_count_in_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('item-faceted'), {'search': 'gum'})
+        self.assertEqual(response.data['count'], 2)
+        item_queries = [q for q in queries if 'items_item' in q['sql']]
+        self.assertEqual(len(item_queries), 2)
+        self.assertFalse(any('COUNT(*) AS "__count"' in q['sql'] for q in item_queries))
+
+
+@override_settings(ITEMS_ANALYTICS_WORKERS=0)
+class AnalyticsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='12345')
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(RefreshToken.for_user(self.user).access_token))
+        self.snacks = Category.objects.create(name="Snacks")
+        self.drinks = Category.objects.create(name="Drinks")
+        self.location = Location.objects.create(name="Kitchen")
+        for n, (category, quantity, price, added) in enumerate((
+            (self.snacks, 2, '1.15', '2024-01-05'),
+            (self.snacks, 4, '3.00', '2024-01-20'),
+            (self.snacks, 1, '10.00', '2024-03-01'),
+            (self.snacks, 7, None, '2024-03-02'),
+            (self.drinks, 3, '2.50', '2024-02-10'),
+        )):
+            item = Item.objects.create(name=f"Item {n}", category=category, location=self.location, quantity=quantity, price=price)
+            Item.objects.filter(pk=item.pk).update(date_added=f'{added}T12:00:00Z')
+
+    def test_totals_percentiles_and_value_over_time(self):
+        response = self.client.get(reverse('item-analytics-report'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        [overall] = response.data['groups']
+        self.assertEqual((overall['count'], overall['total_quantity'], overall['total_value']), (5, 17, '31.80'))
+        self.assertEqual(overall['price'], {'min': '1.15', 'p25': '1.15', 'median': '2.50', 'p75': '3.00', 'p90': '10.00', 'max': '10.00'})
+        self.assertEqual(overall['quantity']['median'], 3)
+        self.assertEqual(
+            [(row['period'], row['count'], row['value'], row['cumulative_value']) for row in overall['value_added']],
+            [('2024-01', 2, '14.30', '14.30'), ('2024-02', 1, '7.50', '21.80'), ('2024-03', 2, '10.00', '31.80')],
+        )
+
+    def test_grouped_and_filtered_in_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('item-analytics-report'), {'group_by': 'category', 'period': 'year', 'is_available': 'true'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        drinks, snacks = response.data['groups']
+        self.assertEqual((drinks['name'], drinks['total_value'], drinks['price']['median']), ('Drinks', '7.50', '2.50'))
+        self.assertEqual((snacks['name'], snacks['count'], snacks['price']['max']), ('Snacks', 4, '10.00'))
+        self.assertEqual(snacks['value_added'], [{'period': '2024', 'count': 4, 'value': '24.30', 'cumulative_value': '24.30'}])
+        self.assertEqual(sum('WITH hits' in query['sql'] for query in queries.captured_queries), 1)
+
+    def test_filtered_cached_until_items_change(self):
+        url = reverse('item-analytics-report') + '?is_available=true'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        Item.objects.create(name="Late", category=self.drinks, location=self.location, quantity=1, price='100.00')
+        [overall] = self.client.get(url).data['groups']
+        self.assertEqual(overall['total_value'], '131.80')
+
+    def test_whole_inventory_served_from_the_summary_and_snapshot(self):
+        url = reverse('item-analytics-report')
+        computed_at = self.client.get(url, {'group_by': 'category'}).data['computed_at']
+        Item.objects.create(name="Late", category=self.drinks, location=self.location, quantity=1, price='100.00')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'group_by': 'category'})
+        self.assertFalse(any('WITH hits' in query['sql'] for query in queries.captured_queries))
+        drinks, snacks = response.data['groups']
+        # Totals are current, the distributions wait for the refresh interval
+        self.assertEqual((drinks['count'], drinks['total_value'], drinks['price']['max']), (2, '107.50', '2.50'))
+        self.assertEqual(response.data['computed_at'], computed_at)
+        with override_settings(ITEMS_ANALYTICS_REFRESH_INTERVAL=0):
+            response = self.client.get(url, {'group_by': 'category'})
+        self.assertEqual(response.data['groups'][0]['price']['max'], '100.00')
+        self.assertGreater(response.data['computed_at'], computed_at)
+
+    @override_settings(ITEMS_ANALYTICS_WORKERS=1)
+    def test_refreshes_off_the_request(self):
+        url = reverse('item-analytics-report')
+        # The mocked executor never runs the refresh that would clear it
+        self.addCleanup(analytics._refreshing.clear)
+        with mock.patch.object(analytics, 'get_executor') as get_executor:
+            first = self.client.get(url).data
+            self.client.get(url)
+        self.assertEqual(get_executor.return_value.submit.call_count, 1)
+        self.assertIsNone(first['computed_at'])
+        self.assertEqual(first['groups'][0]['total_value'], '31.80')
+        self.assertIsNone(first['groups'][0]['price']['median'])
+
+    def test_refresh_command(self):
+        call_command('refresh_analytics', stdout=StringIO())
+        with CaptureQueriesContext(connection) as queries:
+            [overall] = self.client.get(reverse('item-analytics-report'), {'period': 'year'}).data['groups']
+        self.assertFalse(any('WITH hits' in query['sql'] for query in queries.captured_queries))
+        self.assertEqual(overall['price']['median'], '2.50')
+
+    def test_invalid_parameters(self):
+        response = self.client.get(reverse('item-analytics-report'), {'group_by': 'owner', 'period': 'hour'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.data), {'group_by', 'period'})
+
+class LocationTreeTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='12345')
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(RefreshToken.for_user(self.user).access_token))
+        self.category = Category.objects.create(name="Snacks")
+        # Ids 1 and 10, so a plain prefix match on '1' would take both trees
+        self.building = Location.objects.create(id=1, name="Building")
+        self.room = Location.objects.create(name="Room", parent=self.building)
+        self.shelf = Location.objects.create(name="Shelf", parent=self.room)
+        self.other = Location.objects.create(id=10, name="Other building")
+
+    def test_paths_follow_parents(self):
+        self.assertEqual(self.shelf.path, f'1/{self.room.pk}/{self.shelf.pk}/')
+        response = self.client.post(reverse('location-list'), {'name': "Bin", 'parent': self.shelf.pk})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['path'], f'{self.shelf.path}{response.data["id"]}/')
+        [created] = Location.objects.bulk_create([Location(name="Bin 2", parent=self.shelf)])
+        self.assertEqual(Location.objects.get(pk=created.pk).path, f'{self.shelf.path}{created.pk}/')
+
+    def test_subtree_filter_in_one_query(self):
+        for location in (self.building, self.room, self.shelf, self.other):
+            Item.objects.create(name=f"In {location}", category=self.category, location=location)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('item-list'), {'location__subtree': self.building.pk})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual({item['name'] for item in response.data['results']}, {"In Building", "In Room", "In Shelf"})
+        self.assertEqual([q['sql'] for q in queries if '"items_location"' in q['sql'] and '"items_item"' not in q['sql']], [])
+        self.assertEqual({item['name'] for item in self.client.get(reverse('item-list'), {'location__subtree': self.room.pk}).data['results']}, {"In Room", "In Shelf"})
+        self.assertIn('location_path_idx', Location.objects.subtree(self.building.pk).explain())
+
+    def test_move_rewrites_subtree_paths_in_bulk(self):
+        bins = Location.objects.bulk_create(Location(name=f"Bin {n}", parent=self.shelf) for n in range(20))
+        revisions = dict(Location.objects.values_list('id', 'revision'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(reverse('location-detail', kwargs={'pk': self.room.pk}), {'parent': self.other.pk})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertLess(len([q for q in queries if q['sql'].startswith('UPDATE "items_location"')]), 4)
+        moved = Location.objects.in_bulk([self.room.pk, self.shelf.pk, *(location.pk for location in bins)])
+        self.assertEqual(moved[self.shelf.pk].path, f'10/{self.room.pk}/{self.shelf.pk}/')
+        self.assertTrue(all(moved[location.pk].path == f'{moved[self.shelf.pk].path}{location.pk}/' for location in bins))
+        new_revisions = [location.revision for location in moved.values()]
+        self.assertEqual(len(set(new_revisions)), len(new_revisions))
+        self.assertTrue(all(location.revision > revisions[pk] for pk, location in moved.items()))
+        self.assertEqual(Location.objects.subtree(self.building.pk).count(), 1)
+        self.assertEqual(Location.objects.subtree(self.other.pk).count(), 23)
+
+    def test_cannot_move_under_own_subtree(self):
+        response = self.client.patch(reverse('location-detail', kwargs={'pk': self.building.pk}), {'parent': self.shelf.pk})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('parent', response.data)
+        self.building.parent = self.building
+        with self.assertRaises(ValueError):
+            self.building.save()
+
+class OpenAPISchemaTests(APITestCase):
+    def setUp(self):
+        schema.reset()
+        self.addCleanup(schema.reset)
+
+    def test_schema_generated_once_and_revalidated(self):
+        with mock.patch('items.schema.generate', wraps=schema.generate) as generate:
+            response = self.client.get('/openapi.json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIn('/items/similar/', json.loads(response.content)['paths'])
+            etag = response['ETag']
+            response = self.client.get('/openapi.json', HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(response['ETag'], etag)
+        self.assertEqual(generate.call_count, 1)
+
+    def test_prebuilt_schema_file(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'openapi.json')
+        call_command('generate_openapi_schema', output=path, stdout=StringIO())
+        with override_settings(ITEMS_OPENAPI_SCHEMA_FILE=path), \
+                mock.patch('items.schema.generate', side_effect=AssertionError("schema generated")):
+            response = self.client.get('/openapi.json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with open(path, 'rb') as f:
+            self.assertEqual(response.content, f.read())
+
+    def test_ui_pages_load_the_cached_schema(self):
+        for url in ('/swagger/', '/redoc/'):
+            response = self.client.get(url, HTTP_ACCEPT='text/html')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIn(b'/openapi.json', response.content)
+
+
+class SimilarItemTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='12345')
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(RefreshToken.for_user(self.user).access_token))
+        self.category = Category.objects.create(name="Test Category")
+        self.location = Location.objects.create(name="Test Location")
+        self.gum = Item.objects.create(name="Mentos Gum", category=self.category, location=self.location)
+        Item.objects.create(name="Pipe Tobacco", category=self.category, location=self.location)
+
+    def row(self, name):
+        return {'name': name, 'category': self.category.id, 'location': self.location.id}
+
+    def test_normalized_duplicates_rejected(self):
+        for name in ("mentos gum ", "MENTOS  GUM!", "Méntos Gum"):
+            response = self.client.post(reverse('item-list'), self.row(name), format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, name)
+        response = self.client.post(reverse('item-bulk'), [self.row("Cappy"), self.row("cappy")], format='json')
+        self.assertEqual([bool(error) for error in response.data], [False, True])
+        # Renaming an item to its own name in another case is fine
+        response = self.client.patch(reverse('item-detail', kwargs={'pk': self.gum.pk}), {'name': "mentos gum"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_names_without_words_compared_as_given(self):
+        # "!!!" and "???" both normalize to nothing, but are not the same name
+        response = self.client.post(reverse('item-list'), self.row("!!!"), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post(reverse('item-list'), self.row("???"), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post(reverse('item-list'), self.row("!!!"), format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(reverse('item-bulk'), [self.row("..."), self.row("---"), self.row("...")], format='json')
+        self.assertEqual([bool(error) for error in response.data], [False, False, True])
+
+    def test_similar_endpoint(self):
+        Item.objects.create(name="Mentos Gums", category=self.category, location=self.location)
+        response = self.client.get(reverse('item-similar'), {'name': "mentos gum"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['name'] for row in response.data], ["Mentos Gum", "Mentos Gums"])
+        self.assertEqual(response.data[0]['similarity'], 1.0)
+        response = self.client.get(reverse('item-similar'), {'name': "mentos gum", 'threshold': '0.9'})
+        self.assertEqual([row['name'] for row in response.data], ["Mentos Gum"])
+        self.assertEqual(self.client.get(reverse('item-similar'), {'threshold': '2'}).data.keys(), {'name', 'threshold'})
+
+    def test_index_follows_renames_and_deletes(self):
+        self.gum.name = "Orbit Gum"
+        self.gum.save()
+        self.assertEqual(similarity.find("Mentos Gum"), [])
+        self.assertEqual([row['id'] for row in similarity.find("orbit gum")], [self.gum.pk])
+        Item.objects.bulk_update([Item(pk=self.gum.pk, name="Trident Gum")], ['name'])
+        self.assertEqual([row['name'] for row in similarity.find("Trident Gum")], ["Trident Gum"])
+        self.gum.delete()
+        self.assertFalse(NameBucket.objects.filter(bucket__in=similarity.buckets("Trident Gum")).exists())
+
+    def test_create_warns_about_similar_names(self):
+        response = self.client.post(reverse('item-list') + '?warn_similar=true', self.row("Mentos Gums"), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([row['id'] for row in response.data['similar_items']], [self.gum.pk])
+        response = self.client.post(reverse('item-list'), self.row("Mentos Mints"), format='json')
+        self.assertNotIn('similar_items', response.data)
+
+    def test_lookup_reads_only_candidates(self):
+        Item.objects.bulk_create(
+            Item(name=f"Unrelated {n} Widget", category=self.category, location=self.location) for n in range(200)
+        )
+        with CaptureQueriesContext(connection) as queries:
+            similarity.find("Mentos Gum")
+        self.assertEqual(len(queries), 1)
+        self.assertIn('FROM "items_namebucket" U0 WHERE U0."bucket" IN', queries[0]['sql'])
+
+
+@override_settings(ITEMS_CONTENT_ADDRESSED_IMAGES=True)
+class ImageStorageTests(APITestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_override = override_settings(MEDIA_ROOT=media_root.name)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.user = User.objects.create_user(username='testuser', password='12345')
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(RefreshToken.for_user(self.user).access_token))
+        self.category = Category.objects.create(name="Test Category")
+        self.location = Location.objects.create(name="Test Location")
+
+    def upload(self, color='red'):
+        buffer = BytesIO()
+        Image.new('RGB', (40, 30), color).save(buffer, 'PNG')
+        return SimpleUploadedFile('photo.png', buffer.getvalue(), content_type='image/png')
+
+    def create_item(self, name, color='red'):
+        data = {'name': name, 'category': self.category.id, 'location': self.location.id, 'image': self.upload(color)}
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('item-list'), data, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return Item.objects.get(pk=response.data['id'])
+
+    def test_identical_images_share_a_file(self):
+        first = self.create_item("Mentos Gum")
+        second = self.create_item("Pipe Tobacco")
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(first.image.name, r'^item_images/[0-9a-f]{2}/[0-9a-f]{64}\.png$')
+        directory = os.path.dirname(first.image.path)
+        self.assertEqual([name for name in os.listdir(directory) if name != 'renditions'], [os.path.basename(first.image.path)])
+        self.assertEqual(StoredImage.objects.get(name=first.image.name).references, 2)
+
+    def test_file_deleted_with_last_reference(self):
+        first = self.create_item("Mentos Gum")
+        second = self.create_item("Pipe Tobacco")
+        path = first.image.path
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(os.path.exists(path))
+        # Replacing the image releases the shared file too
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                reverse('item-detail', kwargs={'pk': second.pk}), {'image': self.upload('blue')}, format='multipart',
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(StoredImage.objects.filter(name=first.image.name).exists())
+        second.refresh_from_db()
+        self.assertEqual(StoredImage.objects.get(name=second.image.name).references, 1)
+
+    def test_stale_instances_release_the_stored_image(self):
+        first = self.create_item("Mentos Gum")
+        self.create_item("Pipe Tobacco")
+        red = first.image.name
+        stale = [Item.objects.get(pk=first.pk), Item.objects.get(pk=first.pk)]
+        with self.captureOnCommitCallbacks(execute=True):
+            stale[0].image = self.upload('blue')
+            stale[0].save()
+        blue = stale[0].image.name
+        # Still remembers the red file, which the row no longer uses
+        with self.captureOnCommitCallbacks(execute=True):
+            stale[1].image = self.upload('green')
+            stale[1].save()
+        self.assertEqual(StoredImage.objects.get(name=red).references, 1)
+        self.assertTrue(default_storage.exists(red))
+        self.assertFalse(StoredImage.objects.filter(name=blue).exists())
+        self.assertFalse(default_storage.exists(blue))
+        green = stale[1].image.name
+        with self.captureOnCommitCallbacks(execute=True):
+            stale[0].delete()
+            stale[1].delete()
+        self.assertFalse(StoredImage.objects.filter(name=green).exists())
+        self.assertEqual(StoredImage.objects.get(name=red).references, 1)
+        self.assertTrue(default_storage.exists(red))
+
+    def test_collect_images_command(self):
+        item = self.create_item("Mentos Gum")
+        orphan = default_storage.save('item_images/00/orphan.png', self.upload('green'))
+        os.utime(default_storage.path(orphan), (0, 0))
+        StoredImage.objects.all().delete()
+        out = StringIO()
+        call_command('collect_images', recount=True, dry_run=True, stdout=out)
+        self.assertIn("Would delete 1 unreferenced files.", out.getvalue())
+        self.assertTrue(default_storage.exists(orphan))
+        call_command('collect_images', recount=True, workers=2, stdout=out)
+        self.assertFalse(default_storage.exists(orphan))
+        self.assertTrue(default_storage.exists(item.image.name))
+        self.assertEqual(StoredImage.objects.get(name=item.image.name).references, 1)
+
+
+class DatabaseRoutingTests(TransactionTestCase):
+    databases = {'default', 'readonly'}
+
+    def test_reads_use_read_alias_outside_transactions(self):
+        Category.objects.create(name="Test Category")
+        self.assertEqual(Category.objects.get()._state.db, 'readonly')
+        with transaction.atomic():
+            self.assertEqual(Category.objects.get()._state.db, 'default')
+
+    def test_writes_use_default(self):
+        category = Category.objects.get(pk=Category.objects.create(name="Test Category").pk)
+        category.name = "Renamed"
+        category.save()
+        self.assertEqual(category._state.db, 'default')
+        self.assertEqual(Category.objects.get().name, "Renamed")
+
+    def test_transactions_take_the_write_lock_up_front(self):
+        with CaptureQueriesContext(connection) as queries:
+            with transaction.atomic():
+                Category.objects.create(name="Test Category")
+        self.assertEqual(queries[0]['sql'], 'BEGIN IMMEDIATE')
+
+    def test_pragmas_are_applied(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], settings.ITEMS_SQLITE_PRAGMAS['busy_timeout'])
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], settings.ITEMS_SQLITE_PRAGMAS['cache_size'])
+
+    def test_read_only_connection_to_a_file_not_in_wal_mode(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'fresh.sqlite3')
+        fresh = sqlite3.connect(path)
+        fresh.execute('CREATE TABLE t (id INTEGER)')
+        fresh.close()
+        readonly = type(connections['readonly'])(
+            {**connections['readonly'].settings_dict, 'NAME': f'file:{path}?mode=ro', 'OPTIONS': {'uri': True}},
+            alias='readonly',
+        )
+        self.addCleanup(readonly.close)
+        with readonly.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'delete')
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], settings.ITEMS_SQLITE_PRAGMAS['busy_timeout'])
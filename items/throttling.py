@@ -0,0 +1,128 @@
+"""
+Request throttles whose counters are shared by every worker process.
+
+DRF's rate throttles keep a timestamp history per client in the default
+cache, which is per process with LocMemCache. These use a token bucket per
+client instead: one row of (tokens, updated) in a SQLite file
+(ITEMS_THROTTLE_DB) that all workers on the host open. Each check is a single
+atomic UPSERT, so limits hold exactly however many workers there are.
+Requires SQLite 3.35+ for UPDATE ... RETURNING.
+"""
+import sqlite3
+import threading
+
+from django.conf import settings
+from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS throttle_bucket (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL,
+    allowed INTEGER NOT NULL,
+    full_at REAL NOT NULL
+) WITHOUT ROWID
+"""
+
+# Refill since the last check, capped at the bucket size; take a token if one is left
+REFILLED = 'min(:capacity, tokens + max(0, :now - updated) * :rate)'
+CONSUME_SQL = f"""
+INSERT INTO throttle_bucket (key, tokens, updated, allowed, full_at)
+VALUES (:key, :capacity - (:capacity >= 1), :now, :capacity >= 1, :now + (:capacity >= 1) / :rate)
+ON CONFLICT (key) DO UPDATE SET
+    allowed = {REFILLED} >= 1,
+    tokens = {REFILLED} - ({REFILLED} >= 1),
+    full_at = :now + (:capacity - {REFILLED} + ({REFILLED} >= 1)) / :rate,
+    updated = :now
+RETURNING allowed, tokens
+"""
+# A full bucket behaves exactly like a missing row
+PRUNE_SQL = "DELETE FROM throttle_bucket WHERE full_at <= ?"
+
+
+class TokenBucketStore:
+    """
+    Token buckets in a SQLite file, one connection per thread.
+
+    `consume()` refills a client's bucket for the time elapsed since its last
+    request and takes one token if available. Memory is one row per client
+    seen within the last refill period; fully refilled rows are pruned every
+    `prune_interval` checks.
+    """
+    prune_interval = 1000
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        self.checks = 0
+
+    @property
+    def connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(SCHEMA)
+            self.local.connection = connection
+        return connection
+
+    def consume(self, key, capacity, duration, now):
+        """Take a token for `key`; returns (allowed, seconds until the next token)."""
+        rate = capacity / duration
+        params = {'key': key, 'capacity': capacity, 'rate': rate, 'now': now}
+        allowed, tokens = self.connection.execute(CONSUME_SQL, params).fetchone()
+        self.checks += 1
+        if self.checks % self.prune_interval == 0:
+            self.prune(now)
+        return bool(allowed), 0 if allowed else (1 - tokens) / rate
+
+    def prune(self, now):
+        self.connection.execute(PRUNE_SQL, (now,))
+
+    def clear(self):
+        self.connection.execute('DELETE FROM throttle_bucket')
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store():
+    path = str(getattr(settings, 'ITEMS_THROTTLE_DB', settings.BASE_DIR / 'throttle.sqlite3'))
+    store = _stores.get(path)
+    if store is None:
+        with _stores_lock:
+            store = _stores.setdefault(path, TokenBucketStore(path))
+    return store
+
+
+class SharedRateThrottleMixin:
+    """
+    SimpleRateThrottle.allow_request() against the shared TokenBucketStore.
+
+    Rates, scopes and cache keys are the stock DRF ones; a rate of
+    1000/day allows a burst of 1000 requests, then one every 86.4 seconds.
+    """
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        allowed, self.wait_seconds = get_store().consume(self.key, self.num_requests, self.duration, self.timer())
+        return allowed
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class SharedAnonRateThrottle(SharedRateThrottleMixin, AnonRateThrottle):
+    pass
+
+
+class SharedUserRateThrottle(SharedRateThrottleMixin, UserRateThrottle):
+    pass
@@ -0,0 +1,148 @@
+"""
+Chunked, resumable uploads of Item.image.
+
+A client announces an upload (file name, size), sends the bytes as a series
+of chunks, each tagged with the offset it starts at, and finishes with the
+file's SHA-256. Chunks are copied from the request stream to a file under
+ITEMS_IMAGE_UPLOAD_DIR in fixed-size blocks, so memory per request stays
+bounded whatever the chunk or image size. After a dropped connection the
+client asks for the stored offset and continues from there.
+
+On completion the checksum is verified and Pillow reads only the image
+header (format and dimensions, no decoding). The file is then moved into
+storage under the name item_image_path gives it, and the item is saved,
+which replaces the old image and schedules renditions as usual.
+"""
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from PIL import Image, UnidentifiedImageError
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
+
+from .models import ImageUpload
+
+BLOCK_SIZE = 64 * 1024
+
+# Pillow format -> extension of the stored file
+FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+
+
+class OffsetMismatch(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Chunk does not start at the upload's current offset."
+    default_code = 'offset_mismatch'
+
+
+class TemporaryFile(File):
+    """A finished upload; FileSystemStorage moves it into place instead of copying it."""
+
+    def temporary_file_path(self):
+        return self.name
+
+
+def upload_dir():
+    return getattr(settings, 'ITEMS_IMAGE_UPLOAD_DIR', None) or os.path.join(settings.MEDIA_ROOT, 'incomplete_uploads')
+
+
+def max_chunk_size():
+    return getattr(settings, 'ITEMS_IMAGE_UPLOAD_MAX_CHUNK_SIZE', 8 * 1024 * 1024)
+
+
+def temp_path(upload):
+    return os.path.join(upload_dir(), f'{upload.pk}.part')
+
+
+def start(item, user, filename, size):
+    upload = ImageUpload.objects.create(item=item, user=user, filename=filename, size=size)
+    os.makedirs(upload_dir(), exist_ok=True)
+    open(temp_path(upload), 'wb').close()
+    return upload
+
+
+def write_chunk(upload, offset, stream, length):
+    """
+    Store `length` bytes read from `stream` at `offset`, which must be the
+    upload's current offset. Returns the new offset.
+    """
+    if offset + length > upload.size:
+        raise serializers.ValidationError({'detail': "Chunk runs past the announced upload size."})
+    # Claim the range before touching the file: of two requests for the same
+    # offset only one moves the stored offset on, the other gets a conflict
+    if not ImageUpload.objects.filter(pk=upload.pk, offset=offset).update(offset=offset + length):
+        raise OffsetMismatch()
+    try:
+        with open(temp_path(upload), 'r+b') as f:
+            # Bytes past the stored offset are left over from an interrupted chunk
+            f.seek(offset)
+            f.truncate()
+            remaining = length
+            while remaining:
+                block = stream.read(min(BLOCK_SIZE, remaining))
+                if not block:
+                    raise serializers.ValidationError({'detail': "Chunk is shorter than its Content-Length."})
+                f.write(block)
+                remaining -= len(block)
+    except BaseException:
+        # Give the range back so the client can send the chunk again
+        ImageUpload.objects.filter(pk=upload.pk, offset=offset + length).update(offset=offset)
+        raise
+    upload.offset = offset + length
+    return upload.offset
+
+
+def checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def check_image(path):
+    """Format of the image at `path`, from its header only; nothing is decoded."""
+    try:
+        with Image.open(path) as image:
+            image_format, (width, height) = image.format, image.size
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+        raise serializers.ValidationError({'detail': "Upload a valid image."})
+    if image_format not in FORMATS:
+        raise serializers.ValidationError({'detail': f"Unsupported image format {image_format}."})
+    if Image.MAX_IMAGE_PIXELS and width * height > Image.MAX_IMAGE_PIXELS:
+        raise serializers.ValidationError({'detail': "Image dimensions are too large."})
+    return image_format
+
+
+def complete(upload, sha256):
+    """Verify the finished upload and make it the item's image."""
+    if upload.offset != upload.size:
+        raise serializers.ValidationError({'detail': f"Upload is incomplete, {upload.offset} of {upload.size} bytes received."})
+    path = temp_path(upload)
+    if checksum(path) != sha256.lower():
+        raise serializers.ValidationError({'sha256': ["Checksum does not match the uploaded data."]})
+    image_format = check_image(path)
+
+    item = upload.item
+    with transaction.atomic(), open(path, 'rb') as f:
+        # The file name goes through item_image_path like a regular upload
+        item.image.save(f'upload.{FORMATS[image_format]}', TemporaryFile(f, name=path), save=True)
+        upload.delete()
+    return item
+
+
+def discard(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def clear_stale(before):
+    """Drop uploads started before `before` and their partial files."""
+    stale = list(ImageUpload.objects.filter(created__lt=before))
+    for upload in stale:
+        upload.delete()
+    return len(stale)
@@ -0,0 +1,110 @@
+"""
+Per-model change versions and the conditional GET / response caching they drive.
+
+A response of a read endpoint depends only on the request (path, query
+string, user) and on the rows of a few models. Keying ETags and cached
+responses on the current version of those models means no invalidation is
+needed: a write bumps the version, and every key built afterwards is new.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import ModelVersion
+
+
+def bump(*models):
+    for model in models:
+        ModelVersion.advance(model._meta.label_lower)
+
+
+def current(*models):
+    labels = [model._meta.label_lower for model in models]
+    versions = dict(ModelVersion.objects.filter(model__in=labels).values_list('model', 'version'))
+    return [versions.get(label, 0) for label in labels]
+
+
+async def acurrent(*models):
+    labels = [model._meta.label_lower for model in models]
+    versions = {model: version async for model, version in ModelVersion.objects.filter(model__in=labels).values_list('model', 'version')}
+    return [versions.get(label, 0) for label in labels]
+
+
+class ConditionalResponseMixin:
+    """
+    ETag / If-None-Match handling and server-side caching for viewset reads.
+
+    Set `version_models` to the models whose rows appear in the responses and
+    route read handlers through `cached_response`; `list` and `retrieve`, and
+    their async counterparts `alist`/`aretrieve`, are covered here. A matching
+    If-None-Match gets a 304 after a single query on the version table;
+    otherwise cached response data is reused while the versions are unchanged.
+    """
+    version_models = ()
+    response_cache_timeout = getattr(settings, 'ITEMS_RESPONSE_CACHE_TIMEOUT', 300)
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    async def alist(self, request, *args, **kwargs):
+        return await self.acached_response(super().alist, request, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self.acached_response(super().aretrieve, request, *args, **kwargs)
+
+    def get_response_cache_key(self, request, versions):
+        query = sorted((key, value) for key, values in request.query_params.lists() for value in values)
+        # Host and scheme matter because image URLs in responses are absolute
+        fingerprint = repr((
+            request.scheme, request.get_host(), request.path, query,
+            getattr(request.user, 'pk', None), versions,
+        ))
+        return 'items:response:' + hashlib.sha256(fingerprint.encode()).hexdigest()[:32]
+
+    def get_conditional_headers(self, key):
+        return {'ETag': quote_etag(key.rsplit(':', 1)[1]), 'Cache-Control': 'private, no-cache'}
+
+    def not_modified(self, request, headers):
+        if headers['ETag'] in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return None
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        key = self.get_response_cache_key(request, current(*self.version_models))
+        headers = self.get_conditional_headers(key)
+        not_modified = self.not_modified(request, headers)
+        if not_modified is not None:
+            return not_modified
+
+        data = cache.get(key)
+        if data is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            data = response.data
+            cache.set(key, data, self.response_cache_timeout)
+        return Response(data, headers=headers)
+
+    async def acached_response(self, handler, request, *args, **kwargs):
+        """cached_response() for the async read views; `handler` is a coroutine function."""
+        key = self.get_response_cache_key(request, await acurrent(*self.version_models))
+        headers = self.get_conditional_headers(key)
+        not_modified = self.not_modified(request, headers)
+        if not_modified is not None:
+            return not_modified
+
+        data = await cache.aget(key)
+        if data is None:
+            response = await handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            data = response.data
+            await cache.aset(key, data, self.response_cache_timeout)
+        return Response(data, headers=headers)
@@ -1,12 +1,24 @@
 from rest_framework import viewsets
-from .models import Item, Category, Location
-from .serializers import ItemSerializer, CategorySerializer, LocationSerializer
-from rest_framework import viewsets, permissions
+from .models import Item, Category, Location, ImageUpload
+from .serializers import ItemSerializer, CategorySerializer, LocationSerializer, ItemBulkDeleteSerializer, BarcodeBatchSerializer, ItemValuesSerializer, ImageUploadSerializer, ImageUploadCompleteSerializer
+from rest_framework import viewsets, permissions, status
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import OrderingFilter
+from .filters import FullTextSearchFilter, ItemFilterSet
+from .async_views import AsyncReadMixin
+from .instrumentation import InstrumentedViewMixin, timed
+from .pagination import ItemCursorPagination, KnownCountPaginator, apaginate_queryset
+from . import analytics, barcodes, export, facets, similarity, summaries, sync, uploads
+from .versions import ConditionalResponseMixin
 from rest_framework.decorators import action
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
-from django.db.models import Count
+from rest_framework.views import APIView
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from functools import partial
 
 # 4. (Optional) Create a custom token view
 # In your app's views.py
@@ -29,38 +41,349 @@ class CustomTokenObtainPairView(TokenObtainPairView):
 # If you create this custom view, update urls.py to use it:
 # path('api/token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(InstrumentedViewMixin, ConditionalResponseMixin, AsyncReadMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [permissions.IsAuthenticated]
+    version_models = [Category]
 
-class LocationViewSet(viewsets.ModelViewSet):
+class LocationViewSet(InstrumentedViewMixin, ConditionalResponseMixin, AsyncReadMixin, viewsets.ModelViewSet):
     queryset = Location.objects.all()
     serializer_class = LocationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    version_models = [Location]
 
-class ItemViewSet(viewsets.ModelViewSet):
+class ItemViewSet(InstrumentedViewMixin, ConditionalResponseMixin, AsyncReadMixin, viewsets.ModelViewSet):
     queryset = Item.objects.all().order_by('-date_added')
     serializer_class = ItemSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-    filterset_fields = ['category', 'location', 'is_available']
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, OrderingFilter]
+    filterset_class = ItemFilterSet
     search_fields = ['name', 'description']
     ordering_fields = ['name', 'price', 'date_added']
+    version_models = [Item, Category, Location]
+    export_chunk_size = 2000
 
-    def perform_update(self, serializer):
-        instance = self.get_object()
-        # Delete old image if a new one is uploaded
-        if 'image' in self.request.data and instance.image:
-            instance.image.delete()
-        serializer.save()
+    @property
+    def paginator(self):
+        # Keyset pagination is opt-in so existing page-number clients keep working
+        if not hasattr(self, '_paginator') and ItemCursorPagination.requested(getattr(self, 'request', None)):
+            self._paginator = ItemCursorPagination()
+        return super().paginator
+
+    def get_query_list(self, param):
+        value = self.request.query_params.get(param, '')
+        return [name.strip() for name in value.split(',') if name.strip()]
+
+    def get_values_serializer(self):
+        return ItemValuesSerializer(
+            fields=self.get_query_list('fields'), request=self.request, expand=self.get_query_list('expand'),
+        )
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(self.list_values, request)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(self.retrieve_values, request, *args, **kwargs)
+
+    async def alist(self, request, *args, **kwargs):
+        return await self.acached_response(self.alist_values, request)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self.acached_response(self.aretrieve_values, request, *args, **kwargs)
+
+    def get_values_queryset(self, serializer, queryset):
+        columns = serializer.columns | {'id'}
+        if isinstance(self.paginator, ItemCursorPagination):
+            # The cursor is built from the ordering column of the last row
+            columns.add(self.paginator.get_ordering(self.request, queryset, self)[0].lstrip('-'))
+        return queryset.values(*columns)
+
+    def list_values(self, request):
+        """list() over values() rows rendered by ItemValuesSerializer, honouring `?fields=` and `?expand=`."""
+        serializer = self.get_values_serializer()
+        rows = self.get_values_queryset(serializer, self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            with timed('serialize'):
+                data = [serializer.to_representation(row) for row in page]
+            return self.get_paginated_response(data)
+        with timed('serialize'):
+            return Response([serializer.to_representation(row) for row in rows])
+
+    def retrieve_values(self, request, *args, **kwargs):
+        serializer = self.get_values_serializer()
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = get_object_or_404(queryset.values(*serializer.columns), **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        self.check_object_permissions(request, row)
+        with timed('serialize'):
+            return Response(serializer.to_representation(row))
+
+    async def alist_values(self, request):
+        serializer = self.get_values_serializer()
+        rows = self.get_values_queryset(serializer, await self.afilter_queryset(self.get_queryset()))
+        page = await apaginate_queryset(self.paginator, rows, request, self)
+        if page is not None:
+            with timed('serialize'):
+                data = [serializer.to_representation(row) for row in page]
+            return self.get_paginated_response(data)
+        with timed('serialize'):
+            return Response([serializer.to_representation(row) async for row in rows])
+
+    async def aretrieve_values(self, request, *args, **kwargs):
+        serializer = self.get_values_serializer()
+        row = await self.aget_object(self.get_queryset().values(*serializer.columns))
+        with timed('serialize'):
+            return Response(serializer.to_representation(row))
 
     @action(detail=False, methods=['get'])
     def grouped_by_category(self, request):
-        queryset = self.get_queryset().values('category__name').annotate(count=Count('id'))
-        return Response(queryset)
+        return self.cached_response(lambda request: Response(summaries.grouped('category')), request)
 
     @action(detail=False, methods=['get'])
     def grouped_by_location(self, request):
-        queryset = self.get_queryset().values('location__name').annotate(count=Count('id'))
-        return Response(queryset)
+        return self.cached_response(lambda request: Response(summaries.grouped('location')), request)
+
+    @action(detail=False, methods=['get'])
+    def category_location_matrix(self, request):
+        """Item count, total quantity and total value for every (category, location) pair in use."""
+        return self.cached_response(lambda request: Response(summaries.matrix()), request)
+
+    @action(detail=False, methods=['get'], url_path='facets')
+    def faceted(self, request):
+        """
+        A page of items plus facet counts over every match, in one response.
+
+        Takes the list filters, `?search=` and pagination parameters. `facets`
+        holds the match count and the matches per category, location,
+        availability and price bucket (ITEMS_FACET_PRICE_BUCKETS).
+        """
+        return self.cached_response(self.faceted_values, request)
+
+    def faceted_values(self, request):
+        with timed('facets'):
+            counts = facets.counts(self.filter_queryset(self.get_queryset()))
+        if isinstance(self.paginator, PageNumberPagination):
+            # The facet query counted the matches already
+            self.paginator.django_paginator_class = partial(KnownCountPaginator, count=counts['count'])
+        response = self.list_values(request)
+        response.data['facets'] = counts
+        return response
+
+    @action(detail=False, methods=['get'], url_path='analytics')
+    def analytics_report(self, request):
+        """
+        Value, price and quantity statistics for the items matching the list filters.
+
+        `?group_by=category|location` splits them per group, `?period=day|week|month|year`
+        sets the granularity of `value_added` (default month). Without filters the
+        percentiles and `value_added` come from a snapshot refreshed in the background,
+        `computed_at` tells its age. See items/analytics.py.
+        """
+        errors = {}
+        group_by = request.query_params.get('group_by') or None
+        if group_by is not None and group_by not in analytics.GROUPS:
+            errors['group_by'] = [f"Choose one of: {', '.join(analytics.GROUPS)}."]
+        period = request.query_params.get('period', 'month')
+        if period not in analytics.PERIODS:
+            errors['period'] = [f"Choose one of: {', '.join(analytics.PERIODS)}."]
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        if not queryset.query.where:
+            # A few small queries, and not cached so a refreshed snapshot shows before the next write
+            groups, computed_at = analytics.inventory(group_by, period)
+            return Response({'group_by': group_by, 'period': period, 'computed_at': computed_at, 'groups': groups})
+
+        def compute(request):
+            groups = analytics.compute(queryset, group_by, period)
+            return Response({'group_by': group_by, 'period': period, 'computed_at': timezone.now(), 'groups': groups})
+        return self.cached_response(compute, request)
+
+    @action(detail=False, methods=['post', 'patch', 'delete'])
+    def bulk(self, request):
+        """
+        Create (POST), partially update (PATCH) or delete (DELETE) many items in one request.
+
+        POST and PATCH take a list of item objects, PATCH rows must carry an `id`.
+        DELETE takes `{"ids": [...]}`. The whole batch is validated first and
+        written in a single transaction, errors are reported per row.
+        """
+        if request.method == 'DELETE':
+            serializer = ItemBulkDeleteSerializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            ids = set(serializer.validated_data['ids'])
+            with transaction.atomic():
+                # A set-based delete with one items_bulk_deleted, see ItemQuerySet.delete
+                Item.objects.filter(id__in=ids).delete()
+            return Response({'deleted': len(ids)}, status=status.HTTP_200_OK)
+
+        if request.method == 'PATCH':
+            serializer = self.get_serializer(Item.objects.all(), data=request.data, many=True, partial=True)
+            response_status = status.HTTP_200_OK
+        else:
+            serializer = self.get_serializer(data=request.data, many=True)
+            response_status = status.HTTP_201_CREATED
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            serializer.save()
+        return Response(serializer.data, status=response_status)
+
+    @action(detail=False, methods=['get'], url_path=r'by-barcode/(?P<code>[^/]+)')
+    def by_barcode(self, request, code=None):
+        """Resolve a scanned barcode to its item."""
+        item = barcodes.lookup([code])[code]
+        if item is None:
+            return Response({'detail': "No item with this barcode."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(self.get_serializer(item).data)
+
+    @action(detail=False, methods=['post'], url_path='by-barcode')
+    def by_barcodes(self, request):
+        """Resolve many barcodes at once, `{"barcodes": [...]}` -> `{code: item or null}`."""
+        serializer = BarcodeBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        found = barcodes.lookup(serializer.validated_data['barcodes'])
+        return Response({
+            code: None if item is None else self.get_serializer(item).data
+            for code, item in found.items()
+        })
+
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        # Near-duplicates do not block a create; clients that ask are told about them
+        if request.query_params.get('warn_similar') in ('1', 'true'):
+            response.data['similar_items'] = similarity.find(response.data['name'], exclude=response.data['id'])
+        return response
+
+    @action(detail=False, methods=['get'])
+    def similar(self, request):
+        """
+        Items named like `?name=`, most similar first, with their trigram similarity.
+
+        `?threshold=` (0-1) overrides ITEMS_SIMILAR_NAME_THRESHOLD and
+        `?limit=` caps the number of results.
+        """
+        errors = {}
+        name = request.query_params.get('name', '').strip()
+        if not name:
+            errors['name'] = ["This query parameter is required."]
+        try:
+            threshold = float(request.query_params.get('threshold', similarity.default_threshold()))
+        except ValueError:
+            threshold = None
+        if threshold is None or not 0 < threshold <= 1:
+            errors['threshold'] = ["Enter a number greater than 0 and at most 1."]
+        limit = request.query_params.get('limit', '10')
+        if not limit.isdigit() or not 0 < int(limit) <= 100:
+            errors['limit'] = ["Enter a whole number between 1 and 100."]
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        return self.cached_response(
+            lambda request: Response(similarity.find(name, threshold=threshold, limit=int(limit))), request,
+        )
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream every item matching the current filters as CSV or NDJSON (`?export_format=ndjson`).
+
+        Rows are read in chunks straight from the database, so memory use does
+        not grow with the size of the inventory.
+        """
+        export_format = request.query_params.get('export_format', 'csv')
+        if export_format not in export.FORMATS:
+            return Response(
+                {'export_format': [f"Choose one of: {', '.join(export.FORMATS)}."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        encode, content_type = export.FORMATS[export_format]
+        serializer = ItemValuesSerializer(fields=export.FIELDS, request=request)
+        rows = self.filter_queryset(self.get_queryset()).values(*serializer.columns).iterator(chunk_size=self.export_chunk_size)
+        response = StreamingHttpResponse(encode(rows, serializer), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="items.{export_format}"'
+        return response
+
+    @action(detail=True, methods=['post'], url_path='image-uploads')
+    def image_uploads(self, request, pk=None):
+        """
+        Start a chunked, resumable image upload: `{"filename": ..., "size": <bytes>}`.
+
+        Send the bytes to the returned upload with PATCH requests whose
+        `Upload-Offset` header gives the offset the chunk starts at, then POST
+        `{"sha256": ...}` to its `complete/` URL. GET the upload for the
+        stored offset to resume after a failure. See items/uploads.py.
+        """
+        item = self.get_object()
+        serializer = ImageUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = uploads.start(item, request.user, **serializer.validated_data)
+        return Response(ImageUploadSerializer(upload).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['get', 'patch', 'delete'], url_path=r'image-uploads/(?P<upload_id>[0-9a-f-]{36})')
+    def image_upload(self, request, pk=None, upload_id=None):
+        """The state of an upload (GET), its next chunk (PATCH) or its cancellation (DELETE)."""
+        upload = get_object_or_404(ImageUpload, pk=upload_id, item_id=pk, user=request.user)
+        if request.method == 'DELETE':
+            upload.delete()
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        if request.method == 'PATCH':
+            offset = request.headers.get('Upload-Offset', '')
+            if not offset.isdigit():
+                return Response(
+                    {'detail': "Give the offset the chunk starts at in an Upload-Offset header."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            length = request.headers.get('Content-Length', '')
+            if not length.isdigit():
+                return Response({'detail': "Content-Length is required."}, status=status.HTTP_411_LENGTH_REQUIRED)
+            offset, length = int(offset), int(length)
+            if length > uploads.max_chunk_size():
+                return Response(
+                    {'detail': f"Chunks may be at most {uploads.max_chunk_size()} bytes."},
+                    status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                )
+            uploads.write_chunk(upload, offset, request.stream, length)
+        return Response(ImageUploadSerializer(upload).data)
+
+    @action(detail=True, methods=['post'], url_path=r'image-uploads/(?P<upload_id>[0-9a-f-]{36})/complete')
+    def complete_image_upload(self, request, pk=None, upload_id=None):
+        """Verify a finished upload against `{"sha256": ...}` and make it the item's image."""
+        upload = get_object_or_404(ImageUpload.objects.select_related('item'), pk=upload_id, item_id=pk, user=request.user)
+        serializer = ImageUploadCompleteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        item = uploads.complete(upload, serializer.validated_data['sha256'])
+        return Response(self.get_serializer(item).data)
+
+
+class SyncView(InstrumentedViewMixin, APIView):
+    """
+    Changes to items, categories and locations since `?since=<checkpoint>`.
+
+    Start with `since=0` (or no `since`), which returns every current row,
+    then pass the returned `checkpoint` back until `has_more` is false.
+    `?limit=` sets the number of changes per page. A 410 means the checkpoint
+    predates pruned deletions and the client must sync again from 0.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    page_size = 500
+    max_page_size = 5000
+
+    def get(self, request):
+        errors = {}
+        since = self.get_int_param('since', 0, errors)
+        limit = self.get_int_param('limit', self.page_size, errors, minimum=1)
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        serializer = ItemValuesSerializer(request=request)
+        return Response(sync.changes(since, min(limit, self.max_page_size), serializer))
+
+    def get_int_param(self, name, default, errors, minimum=0):
+        value = self.request.query_params.get(name)
+        if value is None:
+            return default
+        if not value.isdigit() or int(value) < minimum:
+            errors[name] = [f"Enter a whole number of at least {minimum}."]
+            return None
+        return int(value)